@@ -1,10 +1,30 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from ic.identity import Identity
 from ic.principal import Principal
 
-from .key_management.encryption import (
-    decrypt_from_cipher_string,
-    encrypt_private_key_as_string,
-)
+from .config import PROVISION_BATCH_SIZE, PROVISION_WORKERS
+from .identity_cache import identity_cache
+from .key_management.encryption import encrypt_private_key_as_string
+
+ProvisionedAccount = namedtuple("ProvisionedAccount", ["principal", "encrypted_key"])
+
+
+def _provision_batch(size: int):
+    """Generates and encrypts `size` keys; runs in a worker process."""
+    accounts = []
+    for _ in range(size):
+        identity = Identity()
+        principal = Principal.self_authenticating(identity.pubkey)
+        accounts.append(
+            ProvisionedAccount(
+                principal.to_str(), encrypt_private_key_as_string(identity.privkey)
+            )
+        )
+    return accounts
 
 
 class Account:
@@ -12,10 +32,8 @@ class Account:
         self.identity = None
         if encrypted_key:
             try:
-                private_key = self._decrypt_private_key(encrypted_key)
+                self.identity, self.principal = identity_cache.load(encrypted_key)
                 self.encrypted_key = encrypted_key
-                self.identity = Identity(privkey=private_key)
-                self.principal = Principal.self_authenticating(self.identity.pubkey)
             except (ValueError, TypeError):
                 pass
 
@@ -23,13 +41,43 @@ class Account:
             self._create_account()
             self._persist_key(self.identity.privkey)
 
+    @classmethod
+    def create_many(
+        cls, n: int, batch_size: int = PROVISION_BATCH_SIZE, workers: int = None
+    ):
+        """
+        Generates `n` new accounts and yields them as lists of
+        `ProvisionedAccount(principal, encrypted_key)`, one list per batch, in
+        a form ready for `bulk_create`.
+
+        Key generation is CPU-bound, so batches are spread over `workers`
+        processes, by default PROVISION_WORKERS or else one per core; 1 keeps
+        everything in this process. Private keys are encrypted inside the
+        workers and never cross the process boundary in plaintext.
+        """
+        sizes = [min(batch_size, n - start) for start in range(0, n, batch_size)]
+        workers = workers or PROVISION_WORKERS or os.cpu_count() or 1
+        if workers == 1 or len(sizes) == 1:
+            for size in sizes:
+                yield _provision_batch(size)
+            return
+
+        # keep a couple of batches per worker queued so results stream at the
+        # consumer's pace instead of piling up in memory
+        pending = deque()
+        sizes = iter(sizes)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for size in islice(sizes, workers * 2):
+                pending.append(executor.submit(_provision_batch, size))
+            while pending:
+                batch = pending.popleft().result()
+                for size in islice(sizes, 1):
+                    pending.append(executor.submit(_provision_batch, size))
+                yield batch
+
     def _create_account(self):
         self.identity = Identity()
         self.principal = Principal.self_authenticating(self.identity.pubkey)
 
     def _persist_key(self, private_key: str):
         self.encrypted_key = encrypt_private_key_as_string(private_key)
-
-    def _decrypt_private_key(self, encrypted_key):
-        private_key = decrypt_from_cipher_string(encrypted_key)
-        return private_key
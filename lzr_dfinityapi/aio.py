@@ -0,0 +1,180 @@
+import asyncio
+import os
+import time
+import weakref
+
+from ic.agent import Agent, sign_request
+from ic.certificate import lookup
+from ic.principal import Principal
+
+from . import metrics
+from .client import NOT_SENT_ERRORS
+from .config import CANISTER_CONCURRENCY_LIMIT, IC_POLL_DELAY
+from .routing import EndpointError
+
+FINAL_STATUSES = ("replied", "done", "rejected")
+
+
+class NotSubmitted(Exception):
+    """An update call that never reached a replica and can safely be sent again."""
+
+
+def _not_submitted(error: Exception) -> bool:
+    if isinstance(error, EndpointError):
+        return not error.sent
+    return isinstance(error, NOT_SENT_ERRORS)
+
+
+class AsyncAgent(Agent):
+    """
+    `ic.agent.Agent` whose `poll_async` sleeps with `asyncio.sleep`.
+
+    The upstream implementation polls through `waiter.wait`, which calls
+    `time.sleep` and stalls the whole event loop for every pending update call.
+
+    Every query and update call is recorded in `metrics` per canister and
+    method, and the wait for an update's consensus as the "ic_poll" phase.
+
+    A submission that certainly never reached a replica, e.g. because the
+    connection was refused, raises `NotSubmitted`; any other failure leaves
+    the outcome of the call unknown.
+
+    `submit_update` and `request_statuses_raw` split an update call in two:
+    the ingress submission, and the status reads of any number of submitted
+    requests with a single `read_state` (see `pipeline.StatusPoller`).
+    """
+
+    def query_raw(self, canister_id, method_name, *args, **kwargs):
+        with metrics.canister_call(canister_id, method_name):
+            return super().query_raw(canister_id, method_name, *args, **kwargs)
+
+    async def query_raw_async(self, canister_id, method_name, *args, **kwargs):
+        with metrics.canister_call(canister_id, method_name):
+            return await super().query_raw_async(
+                canister_id, method_name, *args, **kwargs
+            )
+
+    def update_raw(self, canister_id, method_name, *args, **kwargs):
+        with metrics.canister_call(canister_id, method_name):
+            return super().update_raw(canister_id, method_name, *args, **kwargs)
+
+    async def update_raw_async(self, canister_id, method_name, *args, **kwargs):
+        with metrics.canister_call(canister_id, method_name):
+            return await super().update_raw_async(
+                canister_id, method_name, *args, **kwargs
+            )
+
+    def call_endpoint(self, canister_id, request_id, data):
+        try:
+            return super().call_endpoint(canister_id, request_id, data)
+        except Exception as e:  # noqa: B902
+            if _not_submitted(e):
+                raise NotSubmitted(str(e)) from e
+            raise
+
+    async def call_endpoint_async(self, canister_id, request_id, data):
+        try:
+            return await super().call_endpoint_async(canister_id, request_id, data)
+        except Exception as e:  # noqa: B902
+            if _not_submitted(e):
+                raise NotSubmitted(str(e)) from e
+            raise
+
+    def _signed_call(self, canister_id, method_name, arg):
+        request = {
+            "request_type": "call",
+            "sender": self.identity.sender().bytes,
+            "canister_id": Principal.from_str(canister_id).bytes
+            if isinstance(canister_id, str)
+            else canister_id.bytes,
+            "method_name": method_name,
+            "arg": arg,
+            "ingress_expiry": self.get_expiry_date(),
+            # the expiry has a one second resolution: without a nonce, calls
+            # submitted back to back with the same arguments would share a
+            # request id and the IC would execute only one of them
+            "nonce": os.urandom(8),
+        }
+        return sign_request(request, self.identity)
+
+    def submit_update(self, canister_id, method_name, arg) -> bytes:
+        """Submits an update call without waiting for it, returns its request id."""
+        req_id, data = self._signed_call(canister_id, method_name, arg)
+        with metrics.canister_call(canister_id, f"{method_name}:submit"):
+            self.call_endpoint(canister_id, req_id, data)
+        return req_id
+
+    async def submit_update_async(self, canister_id, method_name, arg) -> bytes:
+        req_id, data = self._signed_call(canister_id, method_name, arg)
+        with metrics.canister_call(canister_id, f"{method_name}:submit"):
+            await self.call_endpoint_async(canister_id, req_id, data)
+        return req_id
+
+    def request_statuses_raw(self, canister_id, req_ids) -> dict:
+        """
+        `{req_id: (status, reply or reject message)}` of requests this agent
+        submitted to `canister_id`, read with one `read_state`. The status is
+        None for requests the replica does not know (yet).
+        """
+        paths = [["request_status".encode(), req_id] for req_id in req_ids]
+        cert = self.read_state_raw(canister_id, paths)
+        statuses = {}
+        for req_id in req_ids:
+            status = lookup(
+                ["request_status".encode(), req_id, "status".encode()], cert
+            )
+            status = status.decode() if status is not None else None
+            value = None
+            if status == "replied":
+                value = lookup(
+                    ["request_status".encode(), req_id, "reply".encode()], cert
+                )
+            elif status == "rejected":
+                value = lookup(
+                    ["request_status".encode(), req_id, "reject_message".encode()],
+                    cert,
+                )
+            statuses[req_id] = (status, value)
+        return statuses
+
+    def poll(self, canister_id, req_id, *args, **kwargs):
+        with metrics.span("ic_poll"):
+            return super().poll(canister_id, req_id, *args, **kwargs)
+
+    async def poll_async(
+        self, canister_id, req_id, delay=IC_POLL_DELAY, timeout=float("inf")
+    ):
+        with metrics.span("ic_poll"):
+            return await self._poll_async(canister_id, req_id, delay, timeout)
+
+    async def _poll_async(self, canister_id, req_id, delay, timeout):
+        deadline = time.monotonic() + timeout
+        status, cert = None, None
+        while True:
+            status, cert = await self.request_status_raw_async(canister_id, req_id)
+            if status in FINAL_STATUSES or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+
+        if status == "replied":
+            path = ["request_status".encode(), req_id, "reply".encode()]
+            return status, lookup(path, cert)
+        elif status == "rejected":
+            path = ["request_status".encode(), req_id, "reject_message".encode()]
+            return status, lookup(path, cert)
+        return status, None
+
+
+_limits = weakref.WeakKeyDictionary()
+
+
+def canister_limit(canister_id: str, limit: int = CANISTER_CONCURRENCY_LIMIT):
+    """
+    Returns the `asyncio.Semaphore` bounding in-flight calls to `canister_id`
+    on the running event loop.
+    """
+    semaphores = _limits.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(canister_id)
+    if semaphore is None:
+        semaphore = semaphores[canister_id] = asyncio.Semaphore(limit)
+    return semaphore
@@ -1,88 +1,49 @@
+import inspect
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial, wraps
 from typing import Union
 
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
 from django.db.models import F
+from django.utils import timezone
 from ic import Identity
-from ic.client import Client
-from web3 import Web3
-from web3.types import Wei
-from ic.agent import Agent
-from ic.candid import encode, Types
 
-from .providers import CreatorTokenCanister
-from .models import BOUGHT, SOLD, Coin, Log, Holder
-from .config import RPC_URL, FACTORY_CANISTER, ORACLE_IDENTITY
-
-
-class ContinuosToken:
-    r = 0.3333  # reserve ratio 1/3
-    m = 0.003  # slope
-    increment_rate = 3  # (n+1)
-
-    @classmethod
-    def _calc_bancor_target_amount(
-        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
-    ):
-        """This is the formula: `x * ((1 + p / rb) ^ (r) - 1)`"""
-        if x < 1 or rb < 1:
-            raise ValueError("Incorrect input parameter")
-
-        if p == 0:
-            return 0
-
-        # ((((p + rb) / rb) ** r) * x) - x
-        term1 = (p + rb) / rb
-        term2 = term1**cls.r
-        term3 = term2 * x
-
-        return term3 - x
-
-    @classmethod
-    def _calc_polynomial_target_amount(cls, x: Union[int, float], p: Union[int, float]):
-        """
-        This is the formula: `(((((3*p)/m) + (x^3)) ^ r) - x)`
-
-        "3" here is n + 1, n is the rate of increase
-        """
-        if p == 0:
-            return 0
-
-        # this is the same as (((n+1) * p) / m) + x ^ (n+1)
-        term1 = 1000 * p + x**cls.increment_rate
-        term2 = term1**cls.r
-        term3 = term2 - x
-
-        return term3
-
-    @classmethod
-    def calc_sale_return(
-        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
-    ):
-        if x < 1 or rb < 1 or p > x:
-            raise ValueError("Incorrect input parameter")
-
-        if p == 0:
-            return 0
-
-        # special case for selling the entire supply
-        if p == x:
-            return rb
-
-        term1 = 1 - p / x
-        term2 = 1 / cls.r
-        term3 = term1**term2
-        term4 = rb * (1 - term3)
-
-        return term4
-
-    @classmethod
-    def calc_purchase_return(
-        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
-    ):
-        if x == 0:
-            return cls._calc_polynomial_target_amount(x, p)
-
-        return cls._calc_bancor_target_amount(x, rb, p)
+from . import candles, coin_stats, config, encoders, metrics, outbox, registry
+from .aio import canister_limit
+from .concurrency import coin_locks
+from .config import (
+    CANDLES_IN_TRADE,
+    CANISTER_OUTBOX,
+    TRADE_CAS_RETRIES,
+    TRADE_CONCURRENCY_MODE,
+    TRADE_SERIALIZE_PER_COIN,
+)
+from .curve import ContinuosToken
+from .models import (
+    BOUGHT,
+    CanisterOperation,
+    Coin,
+    CoinStats,
+    Holder,
+    Log,
+    SOLD,
+)
+from .pagination import keyset_page, Page
+from .providers import CreatorTokenCanister, unwrap_transfer_result
+from .quote_cache import quote_cache
+from .units import to_wei, Wei
+
+
+def _coin_canister(coin: Coin, identity) -> CreatorTokenCanister:
+    return registry.get_canister(
+        CreatorTokenCanister,
+        identity,
+        coin.canister_id,
+        config.RPC_URL,
+        creator_coin="lzr_founder_coin_backend",
+    )
 
 
 def create_coin(user, symbol: str, name: str) -> Coin:
@@ -91,16 +52,11 @@ def create_coin(user, symbol: str, name: str) -> Coin:
             raise ValueError("Token already exists!")
         coin = Coin.objects.create(name=name, symbol=symbol, creator=user)
 
-        client = Client(url=RPC_URL)
-        factory_canister_id = FACTORY_CANISTER
-        oracle_id = Identity(privkey=ORACLE_IDENTITY)
-        agent = Agent(identity=oracle_id, client=client)
+        factory_canister_id = config.FACTORY_CANISTER
+        agent = registry.get_agent(config.ORACLE_IDENTITY, config.RPC_URL)
 
-        params = [
-            {"type": Types.Text, "value": name},
-            {"type": Types.Text, "value": symbol},
-        ]
-        result = agent.update_raw(factory_canister_id, "new_token", encode(params))
+        arg = encoders.NEW_TOKEN_ARGS.encode(name, symbol)
+        result = agent.update_raw(factory_canister_id, "new_token", arg)
 
         coin.canister_id = result[0]["value"]
         coin.save()
@@ -108,99 +64,407 @@ def create_coin(user, symbol: str, name: str) -> Coin:
         return coin
 
 
-def buy_coin(user, coin: Coin, lzr_amount: Union[int, float]):
-    with transaction.atomic():
-        coin_reserve_balance = float(Web3.from_wei(coin.reserve_balance, "ether"))
-        coin_total_supply = float(Web3.from_wei(coin.total_supply, "ether"))
+class TradeConflict(Exception):
+    """The coin kept changing under a compare-and-swap trade."""
+
+
+def _coin_state(coin_pk, lock: bool):
+    queryset = Coin.objects.filter(pk=coin_pk)
+    if lock:
+        queryset = queryset.select_for_update()
+    version, total_supply, reserve_balance = queryset.values_list(
+        "version", "total_supply", "reserve_balance"
+    ).get()
+    return version, int(total_supply), int(reserve_balance)
+
+
+@metrics.timed("coin_state")
+def _update_coin_state(coin: Coin, calculate):
+    """
+    Prices a trade against the current state of `coin` and applies it.
+
+    `calculate(total_supply, reserve_balance)` returns `(supply_delta,
+    reserve_delta, result)`. With TRADE_CONCURRENCY_MODE "lock" the coin row is
+    locked for the rest of the transaction; with "cas" the update only applies
+    if the coin version is unchanged and is otherwise recalculated, up to
+    TRADE_CAS_RETRIES times. Must run inside a transaction.
+    """
+    lock = TRADE_CONCURRENCY_MODE == "lock"
+    for _ in range(TRADE_CAS_RETRIES + 1):
+        version, total_supply, reserve_balance = _coin_state(coin.pk, lock)
+        supply_delta, reserve_delta, result = calculate(
+            total_supply, reserve_balance
+        )
 
-        mint_amount = ContinuosToken.calc_purchase_return(
-            coin_total_supply, coin_reserve_balance, lzr_amount
+        updated = Coin.objects.filter(pk=coin.pk, version=version).update(
+            total_supply=total_supply + supply_delta,
+            reserve_balance=reserve_balance + reserve_delta,
+            version=version + 1,
+            updated_at=timezone.now(),
         )
+        if updated:
+            coin.total_supply = total_supply + supply_delta
+            coin.reserve_balance = reserve_balance + reserve_delta
+            coin.version = version + 1
+            transaction.on_commit(partial(quote_cache.invalidate, coin.pk))
+            return result
+
+    raise TradeConflict(f"Coin {coin.pk} changed {TRADE_CAS_RETRIES + 1} times")
+
+
+@contextmanager
+def _trade_transaction(coin: Coin):
+    """
+    Transaction for a trade on `coin`, queued behind other trades on the same
+    coin in this process when TRADE_SERIALIZE_PER_COIN is set.
+    """
+    if not TRADE_SERIALIZE_PER_COIN or transaction.get_connection().in_atomic_block:
+        # the outer transaction outlives the queue slot, don't pretend otherwise
+        with transaction.atomic():
+            yield
+        return
+
+    with coin_locks.hold(coin.pk), transaction.atomic():
+        yield
+
+
+def _atomic_trade(func):
+    """
+    Runs a `_record_*` function in `_trade_transaction` of its `coin`
+    argument, passed by position or keyword.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        coin = signature.bind(*args, **kwargs).arguments["coin"]
+        with _trade_transaction(coin):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@metrics.timed("holder")
+def _credit_holder(user, coin: Coin, amount_wei: int) -> int:
+    """
+    Adds `amount_wei` to the user's balance, creating the holder row on first
+    buy, and returns the change in the coin's holder count. The unique (coin,
+    user) constraint settles concurrent first buys.
+    """
+    holder = Holder.objects.filter(user=user.pk, coin=coin.pk)
+    balance = holder.select_for_update().values_list("balance", flat=True).first()
+    if balance is None:
+        try:
+            with transaction.atomic():
+                Holder.objects.create(user=user, coin=coin, balance=amount_wei)
+            return 1
+        except IntegrityError:
+            balance = (
+                holder.select_for_update().values_list("balance", flat=True).get()
+            )
+    holder.update(balance=F("balance") + amount_wei, updated_at=timezone.now())
+    return int(balance <= 0)
+
+
+def _log_trade(
+    user, coin: Coin, tx_type: str, amount_wei: Wei, reserve_amount_wei: Wei
+):
+    """Logs a trade with its execution price and folds it into the candles."""
+    price = (
+        candles.execution_price(reserve_amount_wei, amount_wei)
+        if amount_wei
+        else None
+    )
+    with metrics.span("trade_log"):
+        log = Log.objects.create(
+            user=user,
+            coin=coin,
+            amount=amount_wei,
+            reserve_amount=reserve_amount_wei,
+            price=price,
+            tx_type=tx_type,
+        )
+    if CANDLES_IN_TRADE and price is not None:
+        with metrics.span("candles"):
+            candles.record_trade(
+                coin.pk, price, amount_wei, reserve_amount_wei, log.created_at
+            )
+    return log
+
+
+def _record_buy(user, coin: Coin, lzr_amount: Union[int, float]):
+    """
+    Applies a buy to the database and returns `(mint_amount_wei, user_principal,
+    log)`. Must run inside a transaction.
+    """
+    with metrics.span("to_wei"):
+        lzr_amount_wei = to_wei(lzr_amount)
+
+    def calculate(total_supply, reserve_balance):
+        mint_amount_wei = ContinuosToken.calc_purchase_return_wei(
+            total_supply, reserve_balance, lzr_amount_wei
+        )
+        return mint_amount_wei, lzr_amount_wei, mint_amount_wei
+
+    mint_amount_wei = _update_coin_state(coin, calculate)
+    user_principal = user.account_principal
+
+    log = _log_trade(user, coin, BOUGHT, mint_amount_wei, lzr_amount_wei)
+    holder_delta = _credit_holder(user, coin, mint_amount_wei)
+    with metrics.span("coin_stats"):
+        coin_stats.record_trade(coin, holder_delta, lzr_amount_wei)
+
+    return mint_amount_wei, user_principal, log
+
+
+def _revert_holder(coin: Coin, log: Log, amount_wei) -> int:
+    """
+    Adds `amount_wei` back to the trader's balance and returns the change in
+    the coin's holder count. Run after the coin row update, as in trades.
+    """
+    holder = Holder.objects.filter(user=log.user_id, coin=coin.pk)
+    balance = holder.select_for_update().values_list("balance", flat=True).get()
+    holder.update(balance=F("balance") + amount_wei, updated_at=timezone.now())
+    return int(balance + amount_wei > 0) - int(balance > 0)
+
+
+def _forget_trade(coin: Coin, log: Log, holder_delta: int):
+    """Deletes a reverted trade's log and takes it out of candles and stats."""
+    coin.version, coin.total_supply, coin.reserve_balance = _coin_state(
+        coin.pk, lock=False
+    )
+    log.delete()
+    if CANDLES_IN_TRADE and log.price is not None:
+        candles.rebuild_buckets(coin.pk, log.created_at)
+    coin_stats.record_trade(coin, holder_delta, -int(log.reserve_amount))
+    transaction.on_commit(partial(quote_cache.invalidate, coin.pk))
+
+
+def _revert_buy(coin: Coin, log: Log):
+    """Compensates a committed `_record_buy` whose mint failed."""
+    Coin.objects.filter(pk=coin.pk).update(
+        reserve_balance=F("reserve_balance") - log.reserve_amount,
+        total_supply=F("total_supply") - log.amount,
+        version=F("version") + 1,
+    )
+    holder_delta = _revert_holder(coin, log, -log.amount)
+    _forget_trade(coin, log, holder_delta)
+
+
+def _record_sell(user, coin: Coin, coin_amount: Union[int, float]):
+    """
+    Applies a sale to the database and returns `(burn_amount_wei, log)`. Must
+    run inside a transaction.
+    """
+    with metrics.span("to_wei"):
+        coin_amount_wei = to_wei(coin_amount)
+
+    def calculate(total_supply, reserve_balance):
+        burn_amount_wei = ContinuosToken.calc_sale_return_wei(
+            total_supply, reserve_balance, coin_amount_wei
+        )
+        return -coin_amount_wei, -burn_amount_wei, burn_amount_wei
 
-        mint_amount_wei = Web3.to_wei(mint_amount, "ether")
-        user_principal = user.account_principal
+    burn_amount_wei = _update_coin_state(coin, calculate)
 
-        Log.objects.create(
-            user=user, coin=coin, amount=int(mint_amount_wei), tx_type=BOUGHT
+    # the holder row is locked after the coin row, as in buys, so that a buy
+    # and a sale by the same user can't deadlock; raising rolls both back
+    holder = Holder.objects.filter(user=user.pk, coin=coin.pk)
+    with metrics.span("holder"):
+        balance = (
+            holder.select_for_update().values_list("balance", flat=True).first()
         )
-        try:
-            coin_balance_record = Holder.objects.get(user=user.pk, coin=coin.pk)
-        except Holder.DoesNotExist:
-            coin_balance_record = Holder.objects.create(user=user, coin=coin)
+    if balance is None:
+        raise ValueError("You do not have any token to sell")
+    if balance < coin_amount_wei:
+        raise ValueError("You do not have enough token to sell")
 
-        coin_balance_record.balance = F("balance") + int(mint_amount_wei)
-        coin_balance_record.save()
+    log = _log_trade(user, coin, SOLD, coin_amount_wei, burn_amount_wei)
 
-        coin.reserve_balance = F("reserve_balance") + int(Web3.to_wei(lzr_amount, "ether"))
-        coin.total_supply = F("total_supply") + int(Web3.to_wei(mint_amount, "ether"))
-        coin.holders.add(coin_balance_record)
+    with metrics.span("holder"):
+        holder.update(
+            balance=F("balance") - coin_amount_wei, updated_at=timezone.now()
+        )
+    sold_out = 0 < balance <= coin_amount_wei
+    with metrics.span("coin_stats"):
+        coin_stats.record_trade(coin, -int(sold_out), burn_amount_wei)
 
-        coin.save()
+    return burn_amount_wei, log
 
-        coin_balance_record.refresh_from_db()
 
-        client = Client(url=RPC_URL)
-        canister_id = coin.canister_id
-        oracle_id = Identity(privkey=ORACLE_IDENTITY)
-        coin_canister = CreatorTokenCanister(
-            identity=oracle_id,
-            client=client,
-            canister_id=canister_id,
-            creator_coin="lzr_founder_coin_backend",
-        )
+def _revert_sell(coin: Coin, log: Log):
+    """Compensates a committed `_record_sell` whose burn failed."""
+    Coin.objects.filter(pk=coin.pk).update(
+        reserve_balance=F("reserve_balance") + log.reserve_amount,
+        total_supply=F("total_supply") + log.amount,
+        version=F("version") + 1,
+    )
+    holder_delta = _revert_holder(coin, log, log.amount)
+    _forget_trade(coin, log, holder_delta)
 
-        coin_canister.mint(mint_amount_wei, user_principal)
 
+def revert_trade(log: Log):
+    """
+    Undoes the trade of `log` after its canister call failed for good, e.g. a
+    deferred trade the outbox gave up on. Must run inside a transaction.
+    """
+    if log.tx_type == BOUGHT:
+        _revert_buy(log.coin, log)
+    else:
+        _revert_sell(log.coin, log)
 
-def sell_coin(
+
+def _record_deferred_buy(
+    user, coin: Coin, lzr_amount: Union[int, float]
+) -> CanisterOperation:
+    mint_amount_wei, user_principal, log = _record_buy(user, coin, lzr_amount)
+    return outbox.enqueue_mint(coin, mint_amount_wei, user_principal, log)
+
+
+def _record_deferred_sell(
     user, user_identity: Identity, coin: Coin, coin_amount: Union[int, float]
-) -> Wei:
-    with transaction.atomic():
-        coin_reserve_balance = float(Web3.from_wei(coin.reserve_balance, "ether"))
-        coin_total_supply = float(Web3.from_wei(coin.total_supply, "ether"))
+) -> CanisterOperation:
+    burn_amount_wei, log = _record_sell(user, coin, coin_amount)
+    return outbox.enqueue_burn(coin, burn_amount_wei, user_identity, log)
+
+
+@metrics.timed("trade", side="buy")
+def buy_coin(
+    user, coin: Coin, lzr_amount: Union[int, float], defer: bool = CANISTER_OUTBOX
+):
+    """
+    With `defer` the mint is written to the canister outbox in the same
+    transaction and performed later by the outbox dispatcher, and its
+    `CanisterOperation` is returned. The trade is final once the operation is
+    DONE; if it ends FAILED the outbox has reverted the trade.
+    """
+    with _trade_transaction(coin):
+        if defer:
+            return _record_deferred_buy(user, coin, lzr_amount)
+
+        mint_amount_wei, user_principal, _ = _record_buy(user, coin, lzr_amount)
+
+        coin_canister = _coin_canister(coin, config.ORACLE_IDENTITY)
+        unwrap_transfer_result(coin_canister.mint(mint_amount_wei, user_principal))
+
 
-        burn_amount = ContinuosToken.calc_sale_return(
-            coin_total_supply, coin_reserve_balance, coin_amount
+@metrics.timed("trade", side="sell")
+def sell_coin(
+    user,
+    user_identity: Identity,
+    coin: Coin,
+    coin_amount: Union[int, float],
+    defer: bool = CANISTER_OUTBOX,
+) -> Union[Wei, CanisterOperation]:
+    """
+    Returns the LZR in wei to pay out. See `buy_coin` for `defer`: a deferred
+    sell returns its operation instead, and the payout, the operation's
+    `amount`, is only due once it is DONE.
+    """
+    with _trade_transaction(coin):
+        if defer:
+            return _record_deferred_sell(user, user_identity, coin, coin_amount)
+
+        burn_amount_wei, _ = _record_sell(user, coin, coin_amount)
+
+        coin_canister = _coin_canister(coin, user_identity)
+        unwrap_transfer_result(coin_canister.burn(burn_amount_wei))
+
+        return burn_amount_wei
+
+
+async def async_create_coin(user, symbol: str, name: str) -> Coin:
+    """
+    Async variant of `create_coin`. The coin row is committed before the factory
+    call and deleted again if the call fails.
+    """
+    if await Coin.objects.filter(name=name).aexists():
+        raise ValueError("Token already exists!")
+    coin = await Coin.objects.acreate(name=name, symbol=symbol, creator=user)
+
+    agent = registry.get_agent(config.ORACLE_IDENTITY, config.RPC_URL)
+    arg = encoders.NEW_TOKEN_ARGS.encode(name, symbol)
+    try:
+        async with canister_limit(config.FACTORY_CANISTER):
+            result = await agent.update_raw_async(
+                config.FACTORY_CANISTER, "new_token", arg
+            )
+    except Exception:  # noqa: B902
+        await coin.adelete()
+        raise
+
+    coin.canister_id = result[0]["value"]
+    await coin.asave(update_fields=["canister_id", "updated_at"])
+
+    return coin
+
+
+@metrics.timed("trade", side="buy")
+async def async_buy_coin(
+    user, coin: Coin, lzr_amount: Union[int, float], defer: bool = CANISTER_OUTBOX
+):
+    """
+    Async variant of `buy_coin`. The database transaction commits before the
+    mint is awaited, so no connection or row lock is held during consensus; a
+    failed mint is compensated by reverting the recorded trade.
+    """
+    if defer:
+        return await sync_to_async(_atomic_trade(_record_deferred_buy))(
+            user, coin, lzr_amount
         )
-        burn_amount_wei = Web3.to_wei(burn_amount, "ether")
 
-        try:
-            coin_balance_record = Holder.objects.get(user=user.pk, coin=coin.pk)
-        except Holder.DoesNotExist:
-            raise ValueError("You do not have any token to sell")
-
-        if coin_balance_record.balance < int(burn_amount_wei):
-            raise ValueError("You do not have enough token to sell")
-        
-        Log.objects.create(
-            user=user,
-            coin=coin,
-            amount=int(Web3.to_wei(coin_amount, "ether")),
-            tx_type=SOLD,
+    mint_amount_wei, user_principal, log = await sync_to_async(
+        _atomic_trade(_record_buy)
+    )(user, coin, lzr_amount)
+
+    coin_canister = _coin_canister(coin, config.ORACLE_IDENTITY)
+    try:
+        async with canister_limit(coin.canister_id):
+            result = await coin_canister.mint_async(mint_amount_wei, user_principal)
+        unwrap_transfer_result(result)
+    except Exception:  # noqa: B902
+        await sync_to_async(transaction.atomic(_revert_buy))(coin, log)
+        raise
+
+
+@metrics.timed("trade", side="sell")
+async def async_sell_coin(
+    user,
+    user_identity: Identity,
+    coin: Coin,
+    coin_amount: Union[int, float],
+    defer: bool = CANISTER_OUTBOX,
+) -> Union[Wei, CanisterOperation]:
+    """Async variant of `sell_coin`, see `async_buy_coin`."""
+    if defer:
+        return await sync_to_async(_atomic_trade(_record_deferred_sell))(
+            user, user_identity, coin, coin_amount
         )
 
-        coin_balance_record.balance = F("balance") - int(Web3.to_wei(coin_amount, "ether"))
-        coin_balance_record.save()
+    burn_amount_wei, log = await sync_to_async(_atomic_trade(_record_sell))(
+        user, coin, coin_amount
+    )
 
-        coin.reserve_balance = F("reserve_balance") - int(Web3.to_wei(burn_amount, "ether"))
-        coin.total_supply = F("total_supply") - int(Web3.to_wei(coin_amount, "ether"))
+    coin_canister = _coin_canister(coin, user_identity)
+    try:
+        async with canister_limit(coin.canister_id):
+            result = await coin_canister.burn_async(burn_amount_wei)
+        unwrap_transfer_result(result)
+    except Exception:  # noqa: B902
+        await sync_to_async(transaction.atomic(_revert_sell))(coin, log)
+        raise
 
-        coin.save()
+    return burn_amount_wei
 
-        coin_balance_record.refresh_from_db()
 
-        client = Client(url=RPC_URL)
-        canister_id = coin.canister_id
-        coin_canister = CreatorTokenCanister(
-            identity=user_identity,
-            client=client,
-            canister_id=canister_id,
-            creator_coin="lzr_founder_coin_backend",
-        )
+def get_purchase_quote(coin_id: int, lzr_amount: Union[int, float]) -> int:
+    """Coins in wei that buying `lzr_amount` LZR would currently mint."""
+    return quote_cache.purchase_quote(coin_id, to_wei(lzr_amount))
 
-        coin_canister.burn(burn_amount_wei)
 
-        return burn_amount_wei
+def get_sale_quote(coin_id: int, coin_amount: Union[int, float]) -> int:
+    """LZR in wei that selling `coin_amount` coins would currently return."""
+    return quote_cache.sale_quote(coin_id, to_wei(coin_amount))
 
 
 def get_holders(coin_id: int):
@@ -213,3 +477,74 @@ def get_holder_record(coin_id: int, user_id: int):
 
 def get_user_holdings(user_id):
     return Holder.objects.filter(user=user_id, balance__gt=0)
+
+
+HOLDER_ORDERINGS = {
+    "balance": ("balance", "id"),
+    "recent": ("created_at", "id"),
+}
+
+
+def get_holders_page(
+    coin_id: int, cursor: str = None, limit: int = 50, order: str = "balance"
+) -> Page:
+    """
+    A page of the coin's holders, largest balance or most recent first. Pass
+    the returned `next_cursor` to get the following page.
+    """
+    if order not in HOLDER_ORDERINGS:
+        raise ValueError(f"Unknown holder order {order!r}")
+    return keyset_page(get_holders(coin_id), HOLDER_ORDERINGS[order], cursor, limit)
+
+
+def get_user_holdings_page(user_id, cursor: str = None, limit: int = 50) -> Page:
+    """A page of the user's holdings, most recent first."""
+    return keyset_page(
+        get_user_holdings(user_id), HOLDER_ORDERINGS["recent"], cursor, limit
+    )
+
+
+def get_candles(
+    coin_id: int,
+    interval: str,
+    start: datetime = None,
+    end: datetime = None,
+    limit: int = 500,
+):
+    """
+    OHLCV candles of the coin for a chart range, oldest first; `interval` is
+    one of "1m", "1h" or "1d". See `candles.get_candles`.
+    """
+    return candles.get_candles(coin_id, interval, start, end, limit)
+
+
+COIN_ORDERINGS = {
+    "market_cap": ("market_cap", "coin_id"),
+    "holders": ("holder_count", "coin_id"),
+    "volume": ("volume_24h", "coin_id"),
+}
+
+
+def get_coins_page(
+    cursor: str = None, limit: int = 50, order: str = "market_cap"
+) -> Page:
+    """
+    A page of coins with their `CoinStats`, largest market cap, most holders
+    or highest 24h volume first. Items are `CoinStats` with `.coin` loaded.
+    """
+    if order not in COIN_ORDERINGS:
+        raise ValueError(f"Unknown coin order {order!r}")
+    return keyset_page(
+        CoinStats.objects.select_related("coin"),
+        COIN_ORDERINGS[order],
+        cursor,
+        limit,
+    )
+
+
+def iter_holders(coin_id: int, chunk_size: int = 2000):
+    """
+    Streams every current holder of the coin for exports, using a server-side
+    cursor where the database supports one instead of loading the full list.
+    """
+    return get_holders(coin_id).order_by("id").iterator(chunk_size=chunk_size)
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
 
+from .config import CANDID_WARM_ON_READY
+
 
 class LzrDfinityApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "lzr_dfinityapi"
+
+    def ready(self):
+        if CANDID_WARM_ON_READY:
+            from .interfaces import interface_cache
+
+            interface_cache.warm()
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import config, registry
+from .config import (
+    BATCH_MAX_IN_FLIGHT,
+    BATCH_MAX_PENDING,
+    BATCH_MAX_SIZE,
+    BATCH_WINDOW,
+)
+from .providers import CreatorTokenCanister
+from .stats import LatencyRecorder
+
+
+class BatcherFull(Exception):
+    pass
+
+
+class _PendingCall:
+    __slots__ = ("canister_id", "call", "future", "submitted_at")
+
+    def __init__(self, canister_id, call):
+        self.canister_id = canister_id
+        self.call = call
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class CanisterBatcher:
+    """
+    Coalesces canister update calls per canister and submits them concurrently.
+
+    Calls for a canister are released together once `window` seconds have
+    passed since the oldest one was queued or `max_batch_size` calls are
+    waiting, with at most `max_in_flight` outstanding per canister.
+    `submit` blocks (or raises `BatcherFull`) once `max_pending` calls are
+    queued or in flight.
+    """
+
+    def __init__(
+        self,
+        window: float = BATCH_WINDOW,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_in_flight: int = BATCH_MAX_IN_FLIGHT,
+        max_pending: int = BATCH_MAX_PENDING,
+        max_workers: int = None,
+    ):
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.max_in_flight = max_in_flight
+        self.latency = LatencyRecorder()
+        self.batches = 0
+        self.batched_calls = 0
+
+        self._queues = defaultdict(deque)
+        self._in_flight = defaultdict(int)
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max_in_flight * 4,
+            thread_name_prefix="canister-batcher",
+        )
+        self._flushing = False
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="canister-batcher-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, canister_id: str, call, timeout: float = None) -> Future:
+        """
+        Queues `call()` (a blocking canister update) for `canister_id` and
+        returns a future for its result.
+        """
+        if self._closed:
+            raise RuntimeError("Batcher is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise BatcherFull(f"{canister_id}: too many pending canister calls")
+
+        pending = _PendingCall(canister_id, call)
+        with self._cond:
+            self._queues[canister_id].append(pending)
+            self._cond.notify()
+        return pending.future
+
+    def submit_mint(self, canister_id: str, amount: int, principal: str, **kwargs):
+        coin_canister = registry.get_canister(
+            CreatorTokenCanister,
+            config.ORACLE_IDENTITY,
+            canister_id,
+            config.RPC_URL,
+            creator_coin="lzr_founder_coin_backend",
+        )
+        return self.submit(
+            canister_id, lambda: coin_canister.mint(amount, principal), **kwargs
+        )
+
+    def flush(self, timeout: float = None) -> bool:
+        """Releases everything queued and waits until no call is outstanding."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            try:
+                while any(self._queues.values()) or any(self._in_flight.values()):
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing = False
+        return True
+
+    def close(self, timeout: float = None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def report(self) -> dict:
+        report = self.latency.report()
+        with self._cond:
+            report.update(
+                batches=self.batches,
+                avg_batch_size=self.batched_calls / self.batches
+                if self.batches
+                else 0,
+                queued=sum(len(queue) for queue in self._queues.values()),
+                in_flight=sum(self._in_flight.values()),
+            )
+        return report
+
+    def _ready_batch(self, canister_id, queue, now):
+        """Calls of `queue` that may be started now; caller holds the lock."""
+        free = self.max_in_flight - self._in_flight.get(canister_id, 0)
+        if not queue or free <= 0:
+            return []
+        if not (
+            self._flushing
+            or len(queue) >= self.max_batch_size
+            or now - queue[0].submitted_at >= self.window
+        ):
+            return []
+        return [
+            queue.popleft()
+            for _ in range(min(free, self.max_batch_size, len(queue)))
+        ]
+
+    def _next_deadline(self, now):
+        waiting = [
+            queue[0].submitted_at + self.window - now
+            for canister_id, queue in self._queues.items()
+            if queue and self._in_flight.get(canister_id, 0) < self.max_in_flight
+        ]
+        return max(min(waiting), 0) if waiting else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                batches = []
+                for canister_id, queue in list(self._queues.items()):
+                    batch = self._ready_batch(canister_id, queue, now)
+                    if batch:
+                        self._in_flight[canister_id] += len(batch)
+                        batches.append(batch)
+                    if not queue:
+                        # canisters come and go, keep only the ones with work
+                        del self._queues[canister_id]
+                if not batches:
+                    self._cond.wait(self._next_deadline(now))
+                    continue
+                self.batches += len(batches)
+                self.batched_calls += sum(len(batch) for batch in batches)
+
+            for batch in batches:
+                for pending in batch:
+                    self._executor.submit(self._execute, pending)
+
+    def _execute(self, pending: _PendingCall):
+        error = False
+        try:
+            pending.future.set_result(pending.call())
+        except Exception as e:  # noqa: B902
+            error = True
+            pending.future.set_exception(e)
+        finally:
+            self.latency.record(time.monotonic() - pending.submitted_at, error)
+            self._slots.release()
+            with self._cond:
+                self._in_flight[pending.canister_id] -= 1
+                if not self._in_flight[pending.canister_id]:
+                    del self._in_flight[pending.canister_id]
+                self._cond.notify_all()
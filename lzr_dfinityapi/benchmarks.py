@@ -0,0 +1,344 @@
+"""
+Benchmarks of the trade path, run against a `StubReplica` instead of the IC.
+
+    replica = StubReplica(latency=0.2, failure_rate=0.01)
+    with stub_environment(replica) as env:
+        results = run_suites(env, ["curve", "candid", "trade", "mixed"])
+
+Every suite returns `{benchmark: report}` with the `LatencyRecorder` report
+of its operations: count, errors, throughput and p50/p99/max latency in
+seconds. The "trade" and "mixed" suites create a coin and users of their
+own, which are deleted again when the environment closes. `bench_suite`
+runs the suites from the command line and compares them with a baseline.
+"""
+import asyncio
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from ic.candid import decode, encode
+from ic.identity import Identity
+
+from . import api, config, encoders, registry
+from .client import PooledClient
+from .curve import ContinuosToken
+from .models import Coin
+from .providers import CreatorTokenCanister
+from .stats import LatencyRecorder
+from .stub_replica import (
+    serve,
+    StubClient,
+    TRANSACTIONS_RESPONSE,
+    TRANSFER_RESULT,
+)
+
+SUITES = ("curve", "candid", "trade", "mixed")
+
+# supply and reserve of the benchmark coin, priced well below 1 LZR per coin
+COIN_SUPPLY_WEI = 10**20
+COIN_RESERVE_WEI = 10**18
+
+
+class StubEnvironment:
+    """A replica registered as `RPC_URL`, with an oracle identity and a coin."""
+
+    def __init__(self, replica, oracle: Identity):
+        self.replica = replica
+        self.oracle = oracle
+        self._users = []
+        self._coins = []
+
+    def create_coin(self) -> Coin:
+        name = f"bench-suite-{uuid.uuid4().hex[:12]}"
+        coin = Coin.objects.create(
+            name=name,
+            symbol="BENCH",
+            creator=self.create_traders(1)[0][0],
+            total_supply=COIN_SUPPLY_WEI,
+            reserve_balance=COIN_RESERVE_WEI,
+            canister_id=self.replica.create_token(
+                name, "BENCH", self.oracle.sender()
+            ),
+        )
+        self._coins.append(coin)
+        return coin
+
+    def create_traders(self, count: int) -> list:
+        """`[(user, identity)]`, each user's principal being its identity's."""
+        User = get_user_model()
+        traders = []
+        for _ in range(count):
+            identity = Identity()
+            user = User.objects.create(
+                username=f"bench-suite-{uuid.uuid4().hex[:12]}"
+            )
+            user.account_principal = identity.sender().to_str()
+            self._users.append(user)
+            traders.append((user, identity))
+        return traders
+
+    def canister(self, coin: Coin) -> CreatorTokenCanister:
+        return api._coin_canister(coin, self.oracle.privkey)
+
+    def close(self):
+        Coin.objects.filter(pk__in=[coin.pk for coin in self._coins]).delete()
+        get_user_model().objects.filter(
+            pk__in=[user.pk for user in self._users]
+        ).delete()
+
+
+@contextmanager
+def stub_environment(replica, http: bool = False):
+    """
+    Points `RPC_URL` at `replica`, in process or over loopback HTTP, and signs
+    oracle calls with a throwaway identity for the duration of the block.
+    """
+    server = serve(replica) if http else None
+    client = PooledClient(url=server.url) if http else StubClient(replica)
+    oracle = Identity()
+    previous_identity = config.__dict__.get("ORACLE_IDENTITY")
+    registry.clear()
+    registry.register_client(config.RPC_URL, client)
+    config.ORACLE_IDENTITY = oracle.privkey
+    environment = StubEnvironment(replica, oracle)
+    try:
+        yield environment
+    finally:
+        environment.close()
+        registry.clear()
+        if previous_identity is None:
+            del config.ORACLE_IDENTITY
+        else:
+            config.ORACLE_IDENTITY = previous_identity
+        if server is not None:
+            server.shutdown()
+
+
+def _timed(recorder: LatencyRecorder, func, *args):
+    started = time.perf_counter()
+    try:
+        func(*args)
+    except Exception:  # noqa: B902
+        recorder.record(time.perf_counter() - started, error=True)
+    else:
+        recorder.record(time.perf_counter() - started)
+
+
+def _repeat(iterations: int, func, *args) -> dict:
+    recorder = LatencyRecorder()
+    for _ in range(iterations):
+        _timed(recorder, func, *args)
+    return recorder.report()
+
+
+def bench_curve(iterations: int) -> dict:
+    """Purchase and sale returns of the wei curve math."""
+    return {
+        "curve_purchase_return": _repeat(
+            iterations,
+            ContinuosToken.calc_purchase_return_wei,
+            COIN_SUPPLY_WEI,
+            COIN_RESERVE_WEI,
+            10**16,
+        ),
+        "curve_sale_return": _repeat(
+            iterations,
+            ContinuosToken.calc_sale_return_wei,
+            COIN_SUPPLY_WEI,
+            COIN_RESERVE_WEI,
+            10**16,
+        ),
+    }
+
+
+def bench_candid(env: StubEnvironment, iterations: int) -> dict:
+    """
+    Encoding of mint, burn and transfer arguments with `ic.candid.encode` and
+    with the precompiled `encoders`, one at a time and 100 mints per batch,
+    and decoding of their replies and of a 100 transaction `get_transactions`
+    page with the coin canister's own Candid types.
+    """
+    canister = env.canister(env.create_coin())
+    principal = env.oracle.sender().to_str()
+    for _ in range(100):
+        canister.mint(10**15, principal)
+    ledger = env.replica.ledgers[canister.canister_id]
+    transactions = ledger.get_transactions({"start": 0, "length": 100})
+    transfer_reply = encode([{"type": TRANSFER_RESULT, "value": {"Ok": 100}}])
+    transactions_reply = encode(
+        [{"type": TRANSACTIONS_RESPONSE, "value": transactions}]
+    )
+
+    arguments = {
+        "mint": (encoders.MINT_ARGS, (principal, 10**18)),
+        "burn": (
+            encoders.BURN_ARGS,
+            (encoders.burn_args(10**18, time.time_ns(), b"bench"),),
+        ),
+        "transfer": (
+            encoders.TRANSFER_ARGS,
+            (encoders.transfer_args(10**18, principal, 10**4, time.time_ns()),),
+        ),
+    }
+    results = {}
+    for method, (encoder, values) in arguments.items():
+        results[f"candid_encode_{method}"] = _repeat(
+            iterations, encode, encoder.params(*values)
+        )
+        results[f"candid_encode_{method}_precompiled"] = _repeat(
+            iterations, encoder.encode, *values
+        )
+    mints = [(principal, 10**18 + i) for i in range(100)]
+    results["candid_encode_mint_100"] = _repeat(
+        max(iterations // 100, 1),
+        lambda: [encode(encoders.MINT_ARGS.params(*values)) for values in mints],
+    )
+    results["candid_encode_mint_100_precompiled"] = _repeat(
+        max(iterations // 100, 1), encoders.MINT_ARGS.encode_many, mints
+    )
+    return {
+        **results,
+        "candid_decode_transfer_result": _repeat(
+            iterations, decode, transfer_reply, canister.canister.mint.rets
+        ),
+        "candid_decode_transactions_100": _repeat(
+            max(iterations // 100, 1),
+            decode,
+            transactions_reply,
+            canister.canister.get_transactions.rets,
+        ),
+    }
+
+
+def bench_trade(
+    env: StubEnvironment, trades: int, lzr_amount: float, coin_amount: float
+) -> dict:
+    """Sequential non-deferred buys, then sells, by one trader on one coin."""
+    coin = env.create_coin()
+    ((user, identity),) = env.create_traders(1)
+    return {
+        "trade_buy": _repeat(trades, api.buy_coin, user, coin, lzr_amount, False),
+        "trade_sell": _repeat(
+            trades, api.sell_coin, user, identity, coin, coin_amount, False
+        ),
+    }
+
+
+def bench_mixed(
+    env: StubEnvironment,
+    concurrency: int,
+    trades: int,
+    lzr_amount: float,
+    coin_amount: float,
+    sell_ratio: float,
+    seed: int = None,
+) -> dict:
+    """
+    `concurrency` traders on one coin, each making `trades` async buys and
+    sells in random order, `sell_ratio` of them sells; a trader's first trade
+    is always a buy.
+    """
+    coin = env.create_coin()
+    traders = env.create_traders(concurrency)
+    choices = random.Random(seed)
+    plans = [
+        ["buy"]
+        + [
+            "sell" if choices.random() < sell_ratio else "buy"
+            for _ in range(trades - 1)
+        ]
+        for _ in traders
+    ]
+    recorders = {
+        "mixed_all": LatencyRecorder(),
+        "mixed_buy": LatencyRecorder(),
+        "mixed_sell": LatencyRecorder(),
+    }
+
+    async def trader(user, identity, plan):
+        for side in plan:
+            if side == "buy":
+                trade = api.async_buy_coin(user, coin, lzr_amount, False)
+            else:
+                trade = api.async_sell_coin(user, identity, coin, coin_amount, False)
+            started = time.perf_counter()
+            try:
+                await trade
+            except Exception:  # noqa: B902
+                error = True
+            else:
+                error = False
+            elapsed = time.perf_counter() - started
+            recorders[f"mixed_{side}"].record(elapsed, error)
+            recorders["mixed_all"].record(elapsed, error)
+
+    async def run():
+        await asyncio.gather(
+            *(
+                trader(user, identity, plan)
+                for (user, identity), plan in zip(traders, plans)
+            )
+        )
+        await sync_to_async(connections.close_all)()
+
+    asyncio.run(run())
+    return {name: recorder.report() for name, recorder in recorders.items()}
+
+
+def run_suites(env: StubEnvironment, suites, **options) -> dict:
+    """
+    Runs `suites` in order and merges their results. `options` are those of
+    `bench_suite`: iterations, trades, concurrency, amount, sell_amount,
+    sell_ratio and seed.
+    """
+    results = {}
+    for suite in suites:
+        if suite == "curve":
+            results.update(bench_curve(options["iterations"]))
+        elif suite == "candid":
+            results.update(bench_candid(env, options["iterations"]))
+        elif suite == "trade":
+            results.update(
+                bench_trade(
+                    env, options["trades"], options["amount"], options["sell_amount"]
+                )
+            )
+        elif suite == "mixed":
+            results.update(
+                bench_mixed(
+                    env,
+                    options["concurrency"],
+                    options["trades"],
+                    options["amount"],
+                    options["sell_amount"],
+                    options["sell_ratio"],
+                    options.get("seed"),
+                )
+            )
+        else:
+            raise ValueError(f"Unknown benchmark suite {suite!r}")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    `[(benchmark, metric, baseline, current)]` of every benchmark slower than
+    `baseline` by more than `tolerance`, a fraction: lower throughput or a
+    higher p99 latency.
+    """
+    regressions = []
+    for name, report in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if report["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                (name, "throughput", previous["throughput"], report["throughput"])
+            )
+        if report["p99"] > previous["p99"] * (1 + tolerance):
+            regressions.append((name, "p99", previous["p99"], report["p99"]))
+    return regressions
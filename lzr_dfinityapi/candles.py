@@ -0,0 +1,207 @@
+"""
+OHLCV candles of coin trades.
+
+Every trade `Log` carries its execution price, LZR per coin. Candles are
+updated from the trade transaction by `record_trade` when `CANDLES_IN_TRADE`
+is set, and can always be rebuilt exactly from the logs with `rebuild`, which
+the `rollup_candles` command runs, e.g. periodically when trades do not write
+candles themselves.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, localcontext
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .config import CANDLES_INSERT_BATCH_SIZE
+from .models import Candle, Log
+
+INTERVALS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+PRICE_QUANTUM = Decimal(1).scaleb(-18)
+
+
+def execution_price(reserve_amount_wei: int, amount_wei: int) -> Decimal:
+    """LZR paid or returned per coin, to 18 decimal places."""
+    with localcontext() as context:
+        context.prec = 80
+        return (
+            Decimal(int(reserve_amount_wei)) / Decimal(int(amount_wei))
+        ).quantize(PRICE_QUANTUM)
+
+
+def bucket_start(at: datetime, interval: str) -> datetime:
+    """Start of the UTC-aligned `interval` bucket that contains `at`."""
+    seconds = INTERVALS[interval]
+    timestamp = int(at.timestamp())
+    return datetime.fromtimestamp(
+        timestamp - timestamp % seconds, tz=dt_timezone.utc
+    )
+
+
+def record_trade(
+    coin_id: int, price: Decimal, amount_wei: int, reserve_amount_wei: int, at
+):
+    """
+    Folds one trade into the coin's candle of every interval. Must run inside
+    the trade transaction so the candles commit or roll back with it.
+    """
+    price = Value(price, output_field=DecimalField(max_digits=50, decimal_places=18))
+    for interval in INTERVALS:
+        start = bucket_start(at, interval)
+        candle = Candle.objects.filter(coin=coin_id, interval=interval, start=start)
+        fold = {
+            "high": Greatest(F("high"), price),
+            "low": Least(F("low"), price),
+            "close": price,
+            "volume": F("volume") + int(amount_wei),
+            "reserve_volume": F("reserve_volume") + int(reserve_amount_wei),
+            "trades": F("trades") + 1,
+            "updated_at": timezone.now(),
+        }
+        if candle.update(**fold):
+            continue
+        try:
+            with transaction.atomic():
+                Candle.objects.create(
+                    coin_id=coin_id,
+                    interval=interval,
+                    start=start,
+                    open=price.value,
+                    high=price.value,
+                    low=price.value,
+                    close=price.value,
+                    volume=amount_wei,
+                    reserve_volume=reserve_amount_wei,
+                    trades=1,
+                )
+        except IntegrityError:
+            candle.update(**fold)
+
+
+def _fold_log(candle: Candle, log: Log):
+    candle.high = max(candle.high, log.price)
+    candle.low = min(candle.low, log.price)
+    candle.close = log.price
+    candle.volume += log.amount
+    candle.reserve_volume += log.reserve_amount
+    candle.trades += 1
+
+
+def _rebuild_coin(coin_id: int, since: datetime = None) -> int:
+    logs = Log.objects.filter(coin=coin_id, price__isnull=False)
+    candles = Candle.objects.filter(coin=coin_id)
+    if since is not None:
+        # the day bucket holding `since` starts before the shorter ones, so
+        # every candle rebuilt below is complete
+        since = bucket_start(since, "1d")
+        logs = logs.filter(created_at__gte=since)
+        candles = candles.filter(start__gte=since)
+
+    current = {}
+    pending = []
+    written = 0
+    with transaction.atomic():
+        candles.delete()
+        for log in logs.order_by("created_at", "id").iterator(
+            chunk_size=CANDLES_INSERT_BATCH_SIZE
+        ):
+            for interval in INTERVALS:
+                start = bucket_start(log.created_at, interval)
+                candle = current.get(interval)
+                if candle is not None and candle.start == start:
+                    _fold_log(candle, log)
+                    continue
+                candle = current[interval] = Candle(
+                    coin_id=coin_id,
+                    interval=interval,
+                    start=start,
+                    open=log.price,
+                    high=log.price,
+                    low=log.price,
+                    close=log.price,
+                    volume=log.amount,
+                    reserve_volume=log.reserve_amount,
+                    trades=1,
+                )
+                pending.append(candle)
+            if len(pending) >= CANDLES_INSERT_BATCH_SIZE:
+                # only the latest candle of each interval can still change
+                open_candles = list(current.values())
+                complete = [c for c in pending if c not in open_candles]
+                Candle.objects.bulk_create(complete)
+                written += len(complete)
+                pending = open_candles
+        Candle.objects.bulk_create(pending)
+    return written + len(pending)
+
+
+def rebuild(coin_ids=None, since: datetime = None) -> int:
+    """
+    Recomputes candles from the trade logs, for all coins or `coin_ids`, from
+    the day of `since` on or entirely. Returns the number of candles written.
+    """
+    if coin_ids is None:
+        coin_ids = Log.objects.order_by().values_list("coin", flat=True).distinct()
+    return sum(_rebuild_coin(coin_id, since) for coin_id in coin_ids)
+
+
+def rebuild_buckets(coin_id: int, at: datetime):
+    """
+    Recomputes the coin's candle of every interval that contains `at`, e.g.
+    after the trade log of that time was deleted. Other candles are left as
+    they are.
+    """
+    for interval, seconds in INTERVALS.items():
+        start = bucket_start(at, interval)
+        logs = Log.objects.filter(
+            coin=coin_id,
+            price__isnull=False,
+            created_at__gte=start,
+            created_at__lt=start + timedelta(seconds=seconds),
+        ).order_by("created_at", "id")
+        candle = Candle.objects.filter(coin=coin_id, interval=interval, start=start)
+        figures = logs.aggregate(
+            high=Max("price"),
+            low=Min("price"),
+            volume=Sum("amount"),
+            reserve_volume=Sum("reserve_amount"),
+            trades=Count("id"),
+        )
+        if not figures["trades"]:
+            candle.delete()
+            continue
+        figures["open"] = logs.values_list("price", flat=True).first()
+        figures["close"] = logs.values_list("price", flat=True).last()
+        Candle.objects.update_or_create(
+            coin_id=coin_id, interval=interval, start=start, defaults=figures
+        )
+
+
+def get_candles(
+    coin_id: int,
+    interval: str,
+    start: datetime = None,
+    end: datetime = None,
+    limit: int = 500,
+):
+    """
+    Candles of the coin from `start` (inclusive) to `end` (exclusive), oldest
+    first. Without `start` the most recent `limit` candles are returned.
+    Intervals without trades have no candle.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown candle interval {interval!r}")
+    candles = Candle.objects.filter(coin=coin_id, interval=interval)
+    if end is not None:
+        candles = candles.filter(start__lt=end)
+    if start is not None:
+        start = bucket_start(start, interval)
+        return list(candles.filter(start__gte=start).order_by("start")[:limit])
+    return list(reversed(candles.order_by("-start")[:limit]))
@@ -0,0 +1,104 @@
+import asyncio
+import weakref
+
+import httpx
+from ic.client import Client
+
+from .config import (
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT,
+)
+
+CBOR_HEADERS = {"Content-Type": "application/cbor"}
+
+# transport errors raised before any of the request was sent
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class PooledClient(Client):
+    """
+    Drop-in replacement for `ic.client.Client` that keeps a pool of keep-alive
+    HTTP connections instead of opening a new connection for every request.
+    """
+
+    def __init__(
+        self,
+        url="https://ic0.app",
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        timeout=HTTP_TIMEOUT,
+    ):
+        super().__init__(url=url)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._http = httpx.Client(limits=self.limits, timeout=timeout)
+        # httpx.AsyncClient connections belong to the loop that opened them
+        self._async_http = weakref.WeakKeyDictionary()
+
+    def _endpoint(self, canister_id, kind):
+        return f"{self.url}/api/v2/canister/{canister_id}/{kind}"
+
+    def _post(self, canister_id, kind, data) -> httpx.Response:
+        return self._http.post(
+            self._endpoint(canister_id, kind), content=data, headers=CBOR_HEADERS
+        )
+
+    def _get_status(self) -> httpx.Response:
+        return self._http.get(f"{self.url}/api/v2/status")
+
+    def query(self, canister_id, data):
+        return self._post(canister_id, "query", data).content
+
+    def call(self, canister_id, req_id, data):
+        self._post(canister_id, "call", data)
+        return req_id
+
+    def read_state(self, canister_id, data):
+        return self._post(canister_id, "read_state", data).content
+
+    def status(self):
+        return self._get_status().content
+
+    def _get_async_http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        http = self._async_http.get(loop)
+        if http is None:
+            http = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._async_http[loop] = http
+        return http
+
+    async def _post_async(self, canister_id, kind, data) -> httpx.Response:
+        return await self._get_async_http().post(
+            self._endpoint(canister_id, kind), content=data, headers=CBOR_HEADERS
+        )
+
+    async def _get_status_async(self) -> httpx.Response:
+        return await self._get_async_http().get(f"{self.url}/api/v2/status")
+
+    async def query_async(self, canister_id, data):
+        return (await self._post_async(canister_id, "query", data)).content
+
+    async def call_async(self, canister_id, req_id, data):
+        await self._post_async(canister_id, "call", data)
+        return req_id
+
+    async def read_state_async(self, canister_id, data):
+        return (await self._post_async(canister_id, "read_state", data)).content
+
+    async def status_async(self):
+        return (await self._get_status_async()).content
+
+    def close(self):
+        self._http.close()
+
+    async def aclose(self):
+        http = self._async_http.pop(asyncio.get_running_loop(), None)
+        if http is not None:
+            await http.aclose()
@@ -0,0 +1,155 @@
+"""
+Per-coin listing figures: holder count, spot price, market cap and 24h volume.
+
+Trades keep `CoinStats` current in their transaction with `record_trade`.
+The 24h volume only grows between trades, so the trailing edge of the window
+is dropped by `refresh`, which recomputes every figure from the holders, the
+coin and the trade logs, and should run periodically (`refresh_coin_stats`).
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .config import COIN_STATS_BATCH_SIZE
+from .curve import ContinuosToken
+from .models import Coin, CoinStats, Holder, Log
+
+VOLUME_WINDOW = timedelta(hours=24)
+
+FIELDS = ("holder_count", "spot_price", "market_cap", "volume_24h")
+
+StatsDrift = namedtuple("StatsDrift", ["coin_id", "field", "stored", "actual"])
+
+
+def _price_figures(total_supply: int, reserve_balance: int) -> dict:
+    spot_price_wei = ContinuosToken.calc_spot_price_wei(
+        total_supply, reserve_balance
+    )
+    return {
+        "spot_price": Decimal(spot_price_wei).scaleb(-18),
+        "market_cap": ContinuosToken.calc_market_cap_wei(
+            total_supply, reserve_balance
+        ),
+    }
+
+
+def compute(coin_ids) -> dict:
+    """`{coin_id: {field: value}}` of `coin_ids` from scratch."""
+    figures = {}
+    for pk, total_supply, reserve_balance in Coin.objects.filter(
+        pk__in=coin_ids
+    ).values_list("pk", "total_supply", "reserve_balance"):
+        figures[pk] = {
+            "holder_count": 0,
+            "volume_24h": 0,
+            **_price_figures(total_supply, reserve_balance),
+        }
+
+    holder_counts = (
+        Holder.objects.filter(coin__in=figures, balance__gt=0)
+        .order_by()
+        .values_list("coin")
+        .annotate(Count("id"))
+    )
+    for coin_id, holder_count in holder_counts:
+        figures[coin_id]["holder_count"] = holder_count
+
+    volumes = (
+        Log.objects.filter(
+            coin__in=figures, created_at__gte=timezone.now() - VOLUME_WINDOW
+        )
+        .order_by()
+        .values_list("coin")
+        .annotate(Sum("reserve_amount"))
+    )
+    for coin_id, volume in volumes:
+        figures[coin_id]["volume_24h"] = int(volume or 0)
+    return figures
+
+
+def record_trade(coin: Coin, holder_delta: int, reserve_amount_wei: int):
+    """
+    Applies a trade to the coin's stats: `holder_delta` is +1 when the trader
+    became a holder, -1 when they sold out. Must run inside the trade
+    transaction, after the coin and holder updates.
+    """
+    update = {
+        "holder_count": F("holder_count") + holder_delta,
+        "volume_24h": F("volume_24h") + int(reserve_amount_wei),
+        "updated_at": timezone.now(),
+        **_price_figures(coin.total_supply, coin.reserve_balance),
+    }
+    stats = CoinStats.objects.filter(coin=coin.pk)
+    if stats.update(**update):
+        return
+    try:
+        # the first stats of a coin are computed from scratch, which already
+        # includes this trade
+        with transaction.atomic():
+            CoinStats.objects.create(coin=coin, **compute([coin.pk])[coin.pk])
+    except IntegrityError:
+        stats.update(**update)
+
+
+def _refresh_batch(coin_ids, dry_run: bool) -> list:
+    drifts = []
+    with transaction.atomic():
+        # trades wait on the locked rows, so none is counted twice or missed
+        stored = {
+            stats.pk: stats
+            for stats in CoinStats.objects.select_for_update().filter(
+                coin__in=coin_ids
+            )
+        }
+        changed = []
+        now = timezone.now()
+        for coin_id, actual in compute(coin_ids).items():
+            stats = stored[coin_id]
+            for field in FIELDS:
+                if getattr(stats, field) != actual[field]:
+                    drifts.append(
+                        StatsDrift(
+                            coin_id, field, getattr(stats, field), actual[field]
+                        )
+                    )
+                    setattr(stats, field, actual[field])
+                    stats.updated_at = now
+                    changed.append(stats)
+        if changed and not dry_run:
+            CoinStats.objects.bulk_update(set(changed), [*FIELDS, "updated_at"])
+    return drifts
+
+
+def refresh(coin_ids=None, batch_size: int = COIN_STATS_BATCH_SIZE, dry_run=False):
+    """
+    Recomputes the stats of all coins or `coin_ids` and returns every
+    `StatsDrift` found. With `dry_run` the stored stats are left as they are.
+    """
+    coins = Coin.objects.order_by("pk")
+    if coin_ids is not None:
+        coins = coins.filter(pk__in=coin_ids)
+    if not dry_run:
+        CoinStats.objects.bulk_create(
+            [
+                CoinStats(coin_id=pk)
+                for pk in coins.filter(stats=None).values_list("pk", flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+
+    drifts = []
+    last_pk = 0
+    while True:
+        batch = list(
+            coins.filter(pk__gt=last_pk, stats__isnull=False).values_list(
+                "pk", flat=True
+            )[:batch_size]
+        )
+        if not batch:
+            return drifts
+        last_pk = batch[-1]
+        drifts.extend(_refresh_batch(batch, dry_run))
@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+
+
+class _TicketLock:
+    """FIFO lock: waiters are served strictly in arrival order."""
+
+    __slots__ = ("condition", "next_ticket", "serving", "users")
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.next_ticket = 0
+        self.serving = 0
+        self.users = 0
+
+
+class KeyedLocks:
+    """
+    One FIFO queue per key, e.g. per coin, so that trades on a hot coin wait
+    their turn in-process instead of piling up on the database row lock.
+    Idle keys are dropped.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = _TicketLock()
+            lock.users += 1
+
+        with lock.condition:
+            ticket = lock.next_ticket
+            lock.next_ticket += 1
+            while lock.serving != ticket:
+                lock.condition.wait()
+        try:
+            yield
+        finally:
+            with lock.condition:
+                lock.serving += 1
+                lock.condition.notify_all()
+            with self._lock:
+                lock.users -= 1
+                if not lock.users:
+                    del self._locks[key]
+
+    def waiting(self, key) -> int:
+        with self._lock:
+            lock = self._locks.get(key)
+            return lock.users if lock else 0
+
+
+coin_locks = KeyedLocks()
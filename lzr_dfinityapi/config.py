@@ -1,13 +1,165 @@
-from decouple import config
+from decouple import Csv, config
 
 
-CHAIN_ENV = config("CHAIN_ENV")
-DEVELOPMENT_RPC = config("DEVELOPMENT_RPC")
-ORACLE_IDENTITY = config("ORACLE_IDENTITY")
+def _rpc_url():
+    rpc_urls = {
+        "development": config("DEVELOPMENT_RPC") or "http://127.0.0.1:34999",
+        "production": "https://ic0.app",
+    }
+    return rpc_urls[config("CHAIN_ENV") or "development"]
 
-RPC_URLS = {"development": DEVELOPMENT_RPC or "http://127.0.0.1:34999", "production": "https://ic0.app"}
-RPC_URL = RPC_URLS[CHAIN_ENV or "development"]
 
-FACTORY_CANISTER = config("FACTORY_CANISTER")
+# Deployment settings and secrets, read on first access through the module
+# __getattr__ so modules and commands that never reach a replica, sign or
+# create coins import without them. Use `config.RPC_URL` at call time rather
+# than importing the name.
+_LAZY = {
+    "CHAIN_ENV": lambda: config("CHAIN_ENV"),
+    "DEVELOPMENT_RPC": lambda: config("DEVELOPMENT_RPC"),
+    "RPC_URL": _rpc_url,
+    "CANDID_FOLDER": lambda: config("CANDID_FOLDER"),
+    "ORACLE_IDENTITY": lambda: config("ORACLE_IDENTITY"),
+    "FACTORY_CANISTER": lambda: config("FACTORY_CANISTER"),
+}
 
-CANDID_FOLDER = config("CANDID_FOLDER")
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = _LAZY[name]()
+    return value
+
+
+# Agent / canister client registry
+AGENT_REGISTRY_SIZE = config("AGENT_REGISTRY_SIZE", default=256, cast=int)
+HTTP_MAX_CONNECTIONS = config("HTTP_MAX_CONNECTIONS", default=100, cast=int)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = config(
+    "HTTP_MAX_KEEPALIVE_CONNECTIONS", default=20, cast=int
+)
+HTTP_KEEPALIVE_EXPIRY = config("HTTP_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+HTTP_TIMEOUT = config("HTTP_TIMEOUT", default=30.0, cast=float)
+
+# Candid interfaces
+CANDID_PRECOMPILED_FOLDER = config("CANDID_PRECOMPILED_FOLDER", default="")
+CANDID_WARM_ON_READY = config("CANDID_WARM_ON_READY", default=False, cast=bool)
+
+# Async API
+IC_POLL_DELAY = config("IC_POLL_DELAY", default=1.0, cast=float)
+CANISTER_CONCURRENCY_LIMIT = config(
+    "CANISTER_CONCURRENCY_LIMIT", default=8, cast=int
+)
+
+# Canister outbox
+CANISTER_OUTBOX = config("CANISTER_OUTBOX", default=False, cast=bool)
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=10, cast=int)
+OUTBOX_RETRY_DELAY = config("OUTBOX_RETRY_DELAY", default=2.0, cast=float)
+OUTBOX_MAX_RETRY_DELAY = config("OUTBOX_MAX_RETRY_DELAY", default=300.0, cast=float)
+OUTBOX_LEASE_TIMEOUT = config("OUTBOX_LEASE_TIMEOUT", default=600.0, cast=float)
+
+# Canister call batching
+BATCH_WINDOW = config("BATCH_WINDOW", default=0.05, cast=float)
+BATCH_MAX_SIZE = config("BATCH_MAX_SIZE", default=50, cast=int)
+BATCH_MAX_IN_FLIGHT = config("BATCH_MAX_IN_FLIGHT", default=8, cast=int)
+BATCH_MAX_PENDING = config("BATCH_MAX_PENDING", default=1000, cast=int)
+
+# Quote cache
+QUOTE_CACHE_BACKEND = config("QUOTE_CACHE_BACKEND", default="django")
+QUOTE_CACHE_ALIAS = config("QUOTE_CACHE_ALIAS", default="default")
+QUOTE_CACHE_SIZE = config("QUOTE_CACHE_SIZE", default=10000, cast=int)
+QUOTE_CACHE_TTL = config("QUOTE_CACHE_TTL", default=60.0, cast=float)
+QUOTE_AMOUNT_BUCKET_WEI = config("QUOTE_AMOUNT_BUCKET_WEI", default=1, cast=int)
+
+# Trade concurrency
+TRADE_CONCURRENCY_MODE = config("TRADE_CONCURRENCY_MODE", default="lock")
+TRADE_CAS_RETRIES = config("TRADE_CAS_RETRIES", default=10, cast=int)
+TRADE_SERIALIZE_PER_COIN = config(
+    "TRADE_SERIALIZE_PER_COIN", default=True, cast=bool
+)
+
+# Ledger indexer
+LEDGER_PAGE_SIZE = config("LEDGER_PAGE_SIZE", default=2000, cast=int)
+LEDGER_INSERT_BATCH_SIZE = config("LEDGER_INSERT_BATCH_SIZE", default=1000, cast=int)
+
+# Reconciliation
+RECONCILE_CONCURRENCY = config("RECONCILE_CONCURRENCY", default=256, cast=int)
+RECONCILE_COIN_CONCURRENCY = config(
+    "RECONCILE_COIN_CONCURRENCY", default=32, cast=int
+)
+RECONCILE_CHUNK_SIZE = config("RECONCILE_CHUNK_SIZE", default=500, cast=int)
+
+# ICRC-1 metadata cache
+METADATA_CACHE_BACKEND = config("METADATA_CACHE_BACKEND", default="locmem")
+# symbol, name, decimals, standards and minting account are fixed at deployment
+METADATA_CACHE_TTL = config("METADATA_CACHE_TTL", default=86400.0, cast=float)
+# the fee and the metadata map can be changed by the controller
+METADATA_FEE_TTL = config("METADATA_FEE_TTL", default=300.0, cast=float)
+METADATA_FETCH_WORKERS = config("METADATA_FETCH_WORKERS", default=16, cast=int)
+
+# Decrypted identity cache
+IDENTITY_CACHE = config("IDENTITY_CACHE", default=False, cast=bool)
+IDENTITY_CACHE_SIZE = config("IDENTITY_CACHE_SIZE", default=1000, cast=int)
+IDENTITY_CACHE_TTL = config("IDENTITY_CACHE_TTL", default=300.0, cast=float)
+
+# Private key encryption: "local" stores the AES key next to the ciphertext,
+# "envelope" encrypts with KMS-wrapped data keys
+KEY_ENCRYPTION_MODE = config("KEY_ENCRYPTION_MODE", default="local")
+ENVELOPE_KMS = config("ENVELOPE_KMS", default="aws")
+ENVELOPE_KMS_KEY_ID = config("ENVELOPE_KMS_KEY_ID", default="")
+ENVELOPE_LOCAL_MASTER_KEY = config("ENVELOPE_LOCAL_MASTER_KEY", default="")
+# tests only: lets ENVELOPE_KMS=local use a random master key per process
+ENVELOPE_LOCAL_EPHEMERAL = config(
+    "ENVELOPE_LOCAL_EPHEMERAL", default=False, cast=bool
+)
+ENVELOPE_DATA_KEY_TTL = config("ENVELOPE_DATA_KEY_TTL", default=300.0, cast=float)
+ENVELOPE_DATA_KEY_MAX_USES = config(
+    "ENVELOPE_DATA_KEY_MAX_USES", default=10000, cast=int
+)
+ENVELOPE_DECRYPT_CACHE_SIZE = config(
+    "ENVELOPE_DECRYPT_CACHE_SIZE", default=1000, cast=int
+)
+
+# Bulk account provisioning
+PROVISION_BATCH_SIZE = config("PROVISION_BATCH_SIZE", default=500, cast=int)
+PROVISION_WORKERS = config("PROVISION_WORKERS", default=0, cast=int)
+
+# Price candles
+# off by default: rollup_candles builds them outside of the trade transaction
+CANDLES_IN_TRADE = config("CANDLES_IN_TRADE", default=False, cast=bool)
+CANDLES_INSERT_BATCH_SIZE = config(
+    "CANDLES_INSERT_BATCH_SIZE", default=1000, cast=int
+)
+
+# Coin stats
+COIN_STATS_BATCH_SIZE = config("COIN_STATS_BATCH_SIZE", default=500, cast=int)
+
+# Metrics
+METRICS_SINK = config("METRICS_SINK", default="noop")
+METRICS_BUCKETS = config(
+    "METRICS_BUCKETS",
+    default="0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30",
+    cast=Csv(float),
+)
+
+# Boundary node routing: with RPC_ENDPOINTS set, clients for RPC_URL spread
+# requests over these nodes instead
+RPC_ENDPOINTS = config("RPC_ENDPOINTS", default="", cast=Csv())
+ROUTING_LATENCY_WINDOW = config("ROUTING_LATENCY_WINDOW", default=200, cast=int)
+ROUTING_HEDGED_METHODS = config(
+    "ROUTING_HEDGED_METHODS",
+    default="icrc1_balance_of,icrc1_total_supply,get_transactions",
+    cast=Csv(),
+)
+ROUTING_HEDGE_PERCENTILE = config(
+    "ROUTING_HEDGE_PERCENTILE", default=95.0, cast=float
+)
+ROUTING_HEDGE_MIN_DELAY = config("ROUTING_HEDGE_MIN_DELAY", default=0.02, cast=float)
+ROUTING_FAILURE_THRESHOLD = config("ROUTING_FAILURE_THRESHOLD", default=5, cast=int)
+ROUTING_OPEN_SECONDS = config("ROUTING_OPEN_SECONDS", default=30.0, cast=float)
+ROUTING_HEDGE_WORKERS = config("ROUTING_HEDGE_WORKERS", default=16, cast=int)
+
+# Split-phase update calls
+PIPELINE_POLL_INTERVAL = config("PIPELINE_POLL_INTERVAL", default=0.5, cast=float)
+PIPELINE_MAX_PATHS = config("PIPELINE_MAX_PATHS", default=100, cast=int)
+PIPELINE_TIMEOUT = config("PIPELINE_TIMEOUT", default=300.0, cast=float)
+PIPELINE_POLL_WORKERS = config("PIPELINE_POLL_WORKERS", default=8, cast=int)
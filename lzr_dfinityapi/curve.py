@@ -0,0 +1,194 @@
+import random
+from decimal import Decimal, localcontext
+from typing import Union
+
+from .fixedpoint import FIXED_1, power, PRECISION
+
+WEI = 10**18
+
+# significant digits of the Decimal reference the wei curve is checked against
+REFERENCE_PRECISION = 80
+
+
+class ContinuosToken:
+    """
+    Bancor curve for a coin with supply, followed by a polynomial curve to
+    bootstrap an empty supply.
+
+    The `calc_*` methods work on floats in ether units. The `*_wei` methods
+    are the exact integer equivalents used for trades: they work directly on
+    wei balances and always round in favour of the reserve.
+    """
+
+    r = 0.3333  # reserve ratio 1/3
+    m = 0.003  # slope
+    increment_rate = 3  # (n+1)
+
+    # `r` as the exact fraction r_n / r_d for the fixed-point engine
+    r_n = 3333
+    r_d = 10000
+    # (n + 1) / m
+    polynomial_factor = 1000
+
+    @classmethod
+    def _calc_bancor_target_amount(
+        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
+    ):
+        """This is the formula: `x * ((1 + p / rb) ^ (r) - 1)`"""
+        if x < 1 or rb < 1:
+            raise ValueError("Incorrect input parameter")
+
+        if p == 0:
+            return 0
+
+        # ((((p + rb) / rb) ** r) * x) - x
+        term1 = (p + rb) / rb
+        term2 = term1**cls.r
+        term3 = term2 * x
+
+        return term3 - x
+
+    @classmethod
+    def _calc_polynomial_target_amount(
+        cls, x: Union[int, float], p: Union[int, float]
+    ):
+        """
+        This is the formula: `(((((3*p)/m) + (x^3)) ^ r) - x)`
+
+        "3" here is n + 1, n is the rate of increase
+        """
+        if p == 0:
+            return 0
+
+        # this is the same as (((n+1) * p) / m) + x ^ (n+1)
+        term1 = 1000 * p + x**cls.increment_rate
+        term2 = term1**cls.r
+        term3 = term2 - x
+
+        return term3
+
+    @classmethod
+    def calc_sale_return(
+        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
+    ):
+        if x < 1 or rb < 1 or p > x:
+            raise ValueError("Incorrect input parameter")
+
+        if p == 0:
+            return 0
+
+        # special case for selling the entire supply
+        if p == x:
+            return rb
+
+        term1 = 1 - p / x
+        term2 = 1 / cls.r
+        term3 = term1**term2
+        term4 = rb * (1 - term3)
+
+        return term4
+
+    @classmethod
+    def calc_purchase_return(
+        cls, x: Union[int, float], rb: Union[int, float], p: Union[int, float]
+    ):
+        if x == 0:
+            return cls._calc_polynomial_target_amount(x, p)
+
+        return cls._calc_bancor_target_amount(x, rb, p)
+
+    @classmethod
+    def _calc_bancor_target_amount_wei(cls, x: int, rb: int, p: int) -> int:
+        """`x * ((1 + p / rb) ^ (r) - 1)` in wei, rounded down."""
+        if x < WEI or rb < WEI:
+            raise ValueError("Incorrect input parameter")
+
+        if p == 0:
+            return 0
+
+        result = power(p + rb, rb, cls.r_n, cls.r_d)
+        return max(((x * result) >> PRECISION) - x, 0)
+
+    @classmethod
+    def _calc_polynomial_target_amount_wei(cls, x: int, p: int) -> int:
+        """`((1000 * p + x^3) ^ r) - x` in wei, rounded down."""
+        if p == 0:
+            return 0
+
+        # scaled to wei^3 so that the base is the exact fraction base_n / WEI^3
+        base_n = cls.polynomial_factor * p * WEI**2 + x**cls.increment_rate
+        result = power(base_n, WEI**3, cls.r_n, cls.r_d)
+        return max(((WEI * result) >> PRECISION) - x, 0)
+
+    @classmethod
+    def calc_sale_return_wei(cls, x: int, rb: int, p: int) -> int:
+        """`rb * (1 - (1 - p / x) ^ (1 / r))` in wei, rounded down."""
+        x, rb, p = int(x), int(rb), int(p)
+        if x < WEI or rb < WEI or p > x:
+            raise ValueError("Incorrect input parameter")
+
+        if p == 0:
+            return 0
+
+        # special case for selling the entire supply
+        if p == x:
+            return rb
+
+        # rb * (1 - 1 / (x / (x - p)) ^ (1 / r)), the divisor rounded down
+        result = power(x, x - p, cls.r_d, cls.r_n)
+        return rb - -(-(rb * FIXED_1) // result)
+
+    @classmethod
+    def calc_spot_price_wei(cls, x: int, rb: int) -> int:
+        """`rb / (r * x)`, LZR wei per whole coin, rounded down."""
+        x, rb = int(x), int(rb)
+        if x == 0:
+            # the polynomial curve `m * x^n` starts at zero
+            return 0
+
+        return rb * cls.r_d * WEI // (cls.r_n * x)
+
+    @classmethod
+    def calc_market_cap_wei(cls, x: int, rb: int) -> int:
+        """Spot price times supply, `rb / r` in wei, rounded down."""
+        if int(x) == 0:
+            return 0
+
+        return int(rb) * cls.r_d // cls.r_n
+
+    @classmethod
+    def calc_purchase_return_wei(cls, x: int, rb: int, p: int) -> int:
+        x, rb, p = int(x), int(rb), int(p)
+        if x == 0:
+            return cls._calc_polynomial_target_amount_wei(x, p)
+
+        return cls._calc_bancor_target_amount_wei(x, rb, p)
+
+
+def reference_purchase_return(x: int, rb: int, p: int) -> Decimal:
+    """`calc_purchase_return_wei` at `REFERENCE_PRECISION`, without rounding."""
+    with localcontext() as ctx:
+        ctx.prec = REFERENCE_PRECISION
+        r = Decimal(ContinuosToken.r_n) / ContinuosToken.r_d
+        if x == 0:
+            base = (ContinuosToken.polynomial_factor * Decimal(p) / WEI) ** r
+            return base * WEI
+        return Decimal(x) * ((1 + Decimal(p) / Decimal(rb)) ** r - 1)
+
+
+def reference_sale_return(x: int, rb: int, p: int) -> Decimal:
+    """`calc_sale_return_wei` at `REFERENCE_PRECISION`, without rounding."""
+    with localcontext() as ctx:
+        ctx.prec = REFERENCE_PRECISION
+        if p == x:
+            return Decimal(rb)
+        inverse_r = Decimal(ContinuosToken.r_d) / ContinuosToken.r_n
+        return Decimal(rb) * (1 - (1 - Decimal(p) / Decimal(x)) ** inverse_r)
+
+
+def random_state(rng: random.Random):
+    """Supply/reserve/amount in wei across ~1 to ~1e12 ether."""
+    x = rng.randint(WEI, 10 ** rng.randint(19, 30))
+    rb = rng.randint(WEI, 10 ** rng.randint(19, 30))
+    p = rng.randint(1, 10 ** rng.randint(1, 30))
+    return x, rb, p
@@ -0,0 +1,125 @@
+"""
+Candid argument encoders that serialize their type table once.
+
+`ic.candid.encode` builds and serializes the type table of its arguments on
+every call, although the types of a method never change. An
+`ArgumentEncoder` does that once for a method's argument types, and each
+call then only checks and serializes the values:
+
+    arg = MINT_ARGS.encode(principal, amount)
+    args = MINT_ARGS.encode_many([(principal, amount), ...])
+
+The output is byte for byte what `encode` returns for the same types and
+values. The encoders of the coin, ledger and factory methods the app calls
+are defined below.
+"""
+import leb128
+from ic.candid import prefix, Types, TypeTable
+
+
+class ArgumentEncoder:
+    """Encodes argument lists of fixed Candid `types`."""
+
+    def __init__(self, types):
+        self.types = tuple(types)
+        table = TypeTable()
+        for candid_type in self.types:
+            candid_type.buildTypeTable(table)
+        self.header = b"".join(
+            [
+                prefix.encode(),
+                table.encode(),
+                leb128.u.encode(len(self.types)),
+                *(candid_type.encodeType(table) for candid_type in self.types),
+            ]
+        )
+
+    def params(self, *values) -> list:
+        """The `ic.candid.encode` parameters of `values`."""
+        return [
+            {"type": candid_type, "value": value}
+            for candid_type, value in zip(self.types, values)
+        ]
+
+    def encode(self, *values) -> bytes:
+        if len(values) != len(self.types):
+            raise ValueError("Wrong number of message arguments")
+        parts = [self.header]
+        for candid_type, value in zip(self.types, values):
+            if not candid_type.covariant(value):
+                raise TypeError(
+                    "Invalid {} argument: {}".format(candid_type.display(), value)
+                )
+            parts.append(candid_type.encodeValue(value))
+        return b"".join(parts)
+
+    def encode_many(self, argument_sets) -> list:
+        """Encodes every tuple of values in `argument_sets`, e.g. a bulk dispatch."""
+        encode = self.encode
+        return [encode(*values) for values in argument_sets]
+
+
+BLOB = Types.Vec(Types.Nat8)
+ACCOUNT = Types.Record({"owner": Types.Principal, "subaccount": Types.Opt(BLOB)})
+
+BURN_ARG = Types.Record(
+    {
+        "amount": Types.Nat,
+        "created_at_time": Types.Opt(Types.Nat64),
+        "from_subaccount": Types.Opt(BLOB),
+        "memo": Types.Opt(BLOB),
+    }
+)
+TRANSFER_ARG = Types.Record(
+    {
+        "amount": Types.Nat,
+        "created_at_time": Types.Opt(Types.Nat64),
+        "fee": Types.Opt(Types.Nat),
+        "from_subaccount": Types.Opt(BLOB),
+        "memo": Types.Opt(BLOB),
+        "to": ACCOUNT,
+    }
+)
+GET_TRANSACTIONS_REQUEST = Types.Record({"start": Types.Nat, "length": Types.Nat})
+
+NO_ARGS = ArgumentEncoder([])
+NEW_TOKEN_ARGS = ArgumentEncoder([Types.Text, Types.Text])
+MINT_ARGS = ArgumentEncoder([Types.Principal, Types.Nat])
+BURN_ARGS = ArgumentEncoder([BURN_ARG])
+TRANSFER_ARGS = ArgumentEncoder([TRANSFER_ARG])
+ACCOUNT_ARGS = ArgumentEncoder([ACCOUNT])
+GET_TRANSACTIONS_ARGS = ArgumentEncoder([GET_TRANSACTIONS_REQUEST])
+
+
+def _optional(value) -> list:
+    return [] if value is None else [value]
+
+
+def account(principal: str, subaccount: bytes = None) -> dict:
+    return {"owner": principal, "subaccount": _optional(subaccount)}
+
+
+def burn_args(amount: int, created_at_time: int = None, memo: bytes = None) -> dict:
+    return {
+        "amount": amount,
+        "created_at_time": _optional(created_at_time),
+        "from_subaccount": [],
+        "memo": _optional(memo),
+    }
+
+
+def transfer_args(
+    amount: int,
+    principal: str,
+    fee: int = None,
+    created_at_time: int = None,
+    memo: bytes = None,
+) -> dict:
+    return {
+        "amount": amount,
+        "created_at_time": _optional(created_at_time),
+        "fee": _optional(fee),
+        "from_subaccount": [],
+        "memo": _optional(memo),
+        "to": account(principal),
+    }
@@ -0,0 +1,123 @@
+"""
+Integer fixed-point `ln`, `exp` and `power` in the style of Bancor's
+`BancorFormula.power()`.
+
+Numbers are integers scaled by `FIXED_1 = 2 ** PRECISION`. The log/exp tables
+of `e ** (2 ** -i)` are computed once at import with guard bits, after which
+every operation is a handful of integer multiplications and shifts.
+"""
+
+PRECISION = 127
+FIXED_1 = 1 << PRECISION
+
+TABLE_SIZE = 16
+# bounds of the accumulated truncation error of `power`: an absolute part in
+# units of 2 ** -PRECISION and a relative part of 2 ** -POWER_ERROR_BITS, which
+# covers the log error amplified by the exponent and by `exp`
+POWER_ERROR_MARGIN = 1 << 16
+POWER_ERROR_BITS = 96
+
+_GUARD_BITS = 32
+
+
+def _exp_series(x: int, one: int) -> int:
+    """e ** (x / one) by Taylor series, for 0 <= x <= one."""
+    result, term, n = one, one, 1
+    while term:
+        term = term * x // (one * n)
+        result += term
+        n += 1
+    return result
+
+
+def _ln2(one: int) -> int:
+    # ln(2) = 2 * atanh(1/3)
+    result, term, n = 0, one // 3, 1
+    while term:
+        result += term // n
+        term //= 9
+        n += 2
+    return 2 * result
+
+
+def _build_tables():
+    one = FIXED_1 << _GUARD_BITS
+    exp_table = []
+    for i in range(1, TABLE_SIZE + 1):
+        exponent = one >> i
+        exp_table.append(
+            (exponent >> _GUARD_BITS, _exp_series(exponent, one) >> _GUARD_BITS)
+        )
+    return _ln2(one) >> _GUARD_BITS, tuple(exp_table)
+
+
+# EXP_TABLE holds (2 ** -i, e ** (2 ** -i)) pairs for i = 1..TABLE_SIZE
+LN2, EXP_TABLE = _build_tables()
+
+
+def ln(x: int) -> int:
+    """Natural logarithm of a fixed-point `x >= FIXED_1`, rounded down."""
+    if x < FIXED_1:
+        raise ValueError("ln is only defined for x >= 1")
+
+    result = 0
+    shift = x.bit_length() - 1 - PRECISION
+    if shift:
+        x >>= shift
+        result += shift * LN2
+
+    for exponent, exp_value in EXP_TABLE:
+        if x >= exp_value:
+            x = (x << PRECISION) // exp_value
+            result += exponent
+
+    # ln(x) = 2 * atanh((x - 1) / (x + 1)), x < e ** (2 ** -TABLE_SIZE) here
+    y = ((x - FIXED_1) << PRECISION) // (x + FIXED_1)
+    y_squared = (y * y) >> PRECISION
+    term, n, series = y, 1, 0
+    while term:
+        series += term // n
+        term = (term * y_squared) >> PRECISION
+        n += 2
+    return result + 2 * series
+
+
+def exp(x: int) -> int:
+    """e ** x for a fixed-point `x >= 0`, rounded down."""
+    if x < 0:
+        raise ValueError("exp is only defined for x >= 0")
+
+    shift, x = divmod(x, LN2)
+    result = FIXED_1
+    for exponent, exp_value in EXP_TABLE:
+        if x >= exponent:
+            x -= exponent
+            result = (result * exp_value) >> PRECISION
+
+    result = (result * _exp_series(x, FIXED_1)) >> PRECISION
+    return result << shift
+
+
+def power(base_n: int, base_d: int, exp_n: int, exp_d: int, round_up=False) -> int:
+    """
+    `(base_n / base_d) ** (exp_n / exp_d)` as a fixed-point integer.
+
+    The result is rounded down, or up with `round_up`, widened by the error
+    bounds above so that the direction of rounding is guaranteed.
+    """
+    if base_n <= 0 or base_d <= 0 or exp_n < 0 or exp_d <= 0:
+        raise ValueError("Incorrect input parameter")
+
+    if base_n < base_d:
+        # x ** e = 1 / (1 / x) ** e, round the inverse the opposite way
+        inverse = power(base_d, base_n, exp_n, exp_d, not round_up)
+        if round_up:
+            return -(-(FIXED_1 << PRECISION) // inverse)
+        return (FIXED_1 << PRECISION) // inverse
+
+    log_base = ln((base_n << PRECISION) // base_d)
+    result = exp(log_base * exp_n // exp_d)
+    margin = (result >> POWER_ERROR_BITS) + POWER_ERROR_MARGIN
+    if round_up:
+        return result + margin
+    return max(result - margin, 0)
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from ic.identity import Identity
+from ic.principal import Principal
+
+from .config import IDENTITY_CACHE, IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL
+from .key_management.encryption import decrypt_to_buffer, zeroize
+
+CachedIdentity = namedtuple(
+    "CachedIdentity", ["identity", "principal", "expires_at"]
+)
+
+
+def load_identity(encrypted_key: str):
+    """
+    Decrypts `encrypted_key` and returns `(identity, principal)`. The plaintext
+    buffer is wiped as soon as the identity is built. Raises `ValueError` or
+    `TypeError` for a key that does not decrypt.
+    """
+    buffer = decrypt_to_buffer(encrypted_key)
+    if buffer is None:
+        raise TypeError("Malformed encrypted key")
+    try:
+        identity = Identity(privkey=buffer.decode("ascii"))
+    finally:
+        zeroize(buffer)
+    return identity, Principal.self_authenticating(identity.pubkey)
+
+
+class IdentityCache:
+    """
+    Size- and time-bounded LRU of decrypted identities, keyed by the sha256 of
+    the encrypted key so plaintext keys never serve as dictionary keys.
+
+    Decrypting a key and setting up its signing key costs far more than a
+    lookup, and every sell needs the seller's identity. Entries are dropped
+    after `ttl` seconds, when the cache is full, or through `evict`/`clear`.
+    `Identity` keeps its key in immutable strings, so eviction can only drop
+    the references; the decryption buffers are wiped in `load_identity`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = IDENTITY_CACHE_SIZE,
+        ttl: float = IDENTITY_CACHE_TTL,
+        enabled: bool = IDENTITY_CACHE,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encrypted_key: str) -> str:
+        return hashlib.sha256(encrypted_key.encode()).hexdigest()
+
+    def get(self, encrypted_key: str):
+        key = self.key(encrypted_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.identity, entry.principal
+
+    def put(self, encrypted_key: str, identity: Identity, principal: Principal):
+        key = self.key(encrypted_key)
+        entry = CachedIdentity(identity, principal, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def load(self, encrypted_key: str):
+        """`load_identity` through the cache when it is enabled."""
+        if not self.enabled:
+            return load_identity(encrypted_key)
+        cached = self.get(encrypted_key)
+        if cached is not None:
+            return cached
+        identity, principal = load_identity(encrypted_key)
+        self.put(encrypted_key, identity, principal)
+        return identity, principal
+
+    def evict(self, encrypted_key: str) -> bool:
+        with self._lock:
+            evicted = self._entries.pop(self.key(encrypted_key), None) is not None
+            self.evictions += int(evicted)
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+identity_cache = IdentityCache()
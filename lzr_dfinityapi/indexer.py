@@ -0,0 +1,166 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import config, registry
+from .config import (
+    LEDGER_INSERT_BATCH_SIZE,
+    LEDGER_PAGE_SIZE,
+)
+from .models import Coin, LedgerSyncState, LedgerTransaction
+from .providers import CreatorTokenCanister
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("mint", "burn", "transfer")
+
+
+class LedgerGap(Exception):
+    """The ledger or its archives returned blocks with indices missing."""
+
+
+def get_ledger_canister(canister_id: str) -> CreatorTokenCanister:
+    return registry.get_canister(
+        CreatorTokenCanister,
+        config.ORACLE_IDENTITY,
+        canister_id,
+        config.RPC_URL,
+        creator_coin="lzr_founder_coin_backend",
+    )
+
+
+def _owner(account) -> str:
+    return account["owner"].to_str() if account else ""
+
+
+def _opt(value):
+    return value[0] if value else None
+
+
+def transaction_row(canister_id: str, tx) -> LedgerTransaction:
+    """Maps a decoded candid `Transaction` to an unsaved `LedgerTransaction`."""
+    operation = next(_opt(tx[name]) for name in OPERATIONS if tx[name])
+    memo = _opt(operation["memo"])
+    return LedgerTransaction(
+        canister_id=canister_id,
+        index=tx["index"],
+        kind=tx["kind"],
+        amount=operation["amount"],
+        from_owner=_owner(operation.get("from")),
+        to_owner=_owner(operation.get("to")),
+        fee=_opt(operation.get("fee")),
+        memo=None if memo is None else bytes(memo),
+        created_at_time=_opt(operation["created_at_time"]),
+        timestamp=tx["timestamp"],
+    )
+
+
+def fetch_transactions(canister, start: int, length: int):
+    """
+    Ledger transactions `[start, start + length)` and the current log length.
+
+    Blocks the ledger has already archived are fetched from the archive
+    canisters, in pages of at most `length`, before the ledger's own blocks.
+    """
+    response = canister.get_transactions(start, length)
+    transactions = []
+    for archived in sorted(
+        response["archived_transactions"], key=lambda a: a["start"]
+    ):
+        archived_start = archived["start"]
+        archived_end = archived_start + archived["length"]
+        while archived_start < archived_end:
+            page = canister.get_archived_transactions(
+                archived["callback"],
+                archived_start,
+                min(length, archived_end - archived_start),
+            )
+            if not page:
+                break
+            transactions.extend(page)
+            archived_start = page[-1]["index"] + 1
+    transactions.extend(response["transactions"])
+    return transactions, response["log_length"]
+
+
+def _contiguous(transactions, start: int) -> list:
+    """The leading run of `transactions` with indices `start, start + 1, ...`."""
+    run = []
+    for tx in transactions:
+        if tx["index"] != start + len(run):
+            break
+        run.append(tx)
+    return run
+
+
+def sync_canister(
+    canister_id: str, page_size: int = LEDGER_PAGE_SIZE, max_pages=None
+):
+    """
+    Copies the canister's new ledger blocks into `LedgerTransaction`, starting
+    at its high-water mark. Every page is inserted and the mark advanced in one
+    transaction, so an interrupted sync resumes where it stopped. Returns the
+    number of blocks copied.
+
+    The mark only moves over blocks that follow on from it. When a page has a
+    gap, e.g. an archive returned fewer blocks than it holds, the blocks up to
+    the gap are saved and `LedgerGap` is raised; the next sync retries from
+    there.
+    """
+    canister = get_ledger_canister(canister_id)
+    state, _ = LedgerSyncState.objects.get_or_create(canister_id=canister_id)
+    next_index = int(state.next_index)
+    copied = pages = 0
+
+    while max_pages is None or pages < max_pages:
+        transactions, log_length = fetch_transactions(
+            canister, next_index, page_size
+        )
+        fetched = [tx for tx in transactions if tx["index"] >= next_index]
+        transactions = _contiguous(fetched, next_index)
+        pages += 1
+        if transactions:
+            next_index = transactions[-1]["index"] + 1
+        rows = [transaction_row(canister_id, tx) for tx in transactions]
+
+        with transaction.atomic():
+            LedgerTransaction.objects.bulk_create(
+                rows, batch_size=LEDGER_INSERT_BATCH_SIZE, ignore_conflicts=True
+            )
+            LedgerSyncState.objects.filter(pk=state.pk).update(
+                next_index=next_index,
+                log_length=log_length,
+                updated_at=timezone.now(),
+            )
+        copied += len(rows)
+
+        if len(transactions) < len(fetched):
+            raise LedgerGap(
+                f"{canister_id}: expected block {next_index}, got "
+                f"{fetched[len(transactions)]['index']}"
+            )
+        if not transactions or next_index >= log_length:
+            break
+
+    logger.info(
+        "Indexed %s block(s) of %s up to %s", copied, canister_id, next_index
+    )
+    return copied
+
+
+def sync_all(page_size: int = LEDGER_PAGE_SIZE, max_pages=None) -> dict:
+    """Runs `sync_canister` for every deployed coin, see `sync_canister`."""
+    canister_ids = (
+        Coin.objects.exclude(canister_id="")
+        .order_by()
+        .values_list("canister_id", flat=True)
+        .distinct()
+    )
+    copied = {}
+    for canister_id in canister_ids:
+        try:
+            copied[canister_id] = sync_canister(canister_id, page_size, max_pages)
+        except Exception:  # noqa: B902
+            logger.exception("Ledger sync of %s failed", canister_id)
+    return copied
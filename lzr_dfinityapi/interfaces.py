@@ -0,0 +1,168 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import namedtuple
+
+from antlr4 import CommonTokenStream, ParseTreeWalker
+from antlr4.InputStream import InputStream
+from ic.canister import Canister, CaniterMethod, CaniterMethodAsync
+from ic.parser.DIDEmitter import DIDEmitter, DIDLexer, DIDParser
+
+from . import config
+from .config import CANDID_PRECOMPILED_FOLDER
+
+PRECOMPILED_SUFFIX = ".didc"
+
+CandidInterface = namedtuple(
+    "CandidInterface", ["name", "path", "mtime_ns", "size", "sha256", "actor"]
+)
+
+
+def parse_candid(source: str) -> dict:
+    """Parses a Candid service description into an ic-py actor dict."""
+    lexer = DIDLexer(InputStream(source))
+    parser = DIDParser(CommonTokenStream(lexer))
+    emitter = DIDEmitter()
+    ParseTreeWalker().walk(emitter, parser.program())
+    return emitter.getActor()
+
+
+def read_did(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as did_file:
+        return did_file.read()
+
+
+def precompiled_path(candid_name: str, folder: str) -> str:
+    return os.path.join(folder, f"{candid_name}{PRECOMPILED_SUFFIX}")
+
+
+class InterfaceCache:
+    """
+    Process-wide cache of parsed Candid interfaces.
+
+    Entries are validated against the `.did` file's mtime and size on every
+    lookup and re-parsed (or re-loaded from a precompiled `.didc` file) when the
+    file changes, so redeployed interfaces are picked up without a restart.
+    """
+
+    def __init__(self, precompiled_folder: str = CANDID_PRECOMPILED_FOLDER):
+        self.precompiled_folder = precompiled_folder
+        self._interfaces = {}
+        self._lock = threading.Lock()
+
+    def get(self, candid_name: str, folder: str = None) -> CandidInterface:
+        path = os.path.join(folder or config.CANDID_FOLDER, f"{candid_name}.did")
+        stat = os.stat(path)
+        interface = self._interfaces.get(path)
+        if (
+            interface is not None
+            and interface.mtime_ns == stat.st_mtime_ns
+            and interface.size == stat.st_size
+        ):
+            return interface
+
+        with self._lock:
+            interface = self._interfaces.get(path)
+            if (
+                interface is None
+                or interface.mtime_ns != stat.st_mtime_ns
+                or interface.size != stat.st_size
+            ):
+                interface = self._load(candid_name, path, stat)
+                self._interfaces[path] = interface
+            return interface
+
+    def _load(self, candid_name, path, stat) -> CandidInterface:
+        source = read_did(path)
+        sha256 = hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+        # an unchanged file that was only touched keeps its parsed actor
+        previous = self._interfaces.get(path)
+        if previous is not None and previous.sha256 == sha256:
+            actor = previous.actor
+        else:
+            actor = self._load_precompiled(candid_name, sha256) or parse_candid(
+                source
+            )
+
+        return CandidInterface(
+            candid_name, path, stat.st_mtime_ns, stat.st_size, sha256, actor
+        )
+
+    def _load_precompiled(self, candid_name, sha256):
+        if not self.precompiled_folder:
+            return None
+        try:
+            with open(
+                precompiled_path(candid_name, self.precompiled_folder), "rb"
+            ) as f:
+                compiled = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if compiled.get("sha256") != sha256:
+            return None
+        return compiled["actor"]
+
+    def warm(self, folder: str = None):
+        """Parses every `.did` file in `folder` ahead of the first request."""
+        folder = folder or config.CANDID_FOLDER
+        names = [
+            file_name[: -len(".did")]
+            for file_name in sorted(os.listdir(folder))
+            if file_name.endswith(".did")
+        ]
+        return [self.get(name, folder) for name in names]
+
+    def precompile(self, folder: str = None, output_folder: str = None):
+        """
+        Serializes the parsed interfaces of `folder` into `.didc` files so that
+        workers can skip parsing on startup. Returns the written paths.
+        """
+        folder = folder or config.CANDID_FOLDER
+        output_folder = output_folder or self.precompiled_folder or folder
+        os.makedirs(output_folder, exist_ok=True)
+        written = []
+        for interface in self.warm(folder):
+            path = precompiled_path(interface.name, output_folder)
+            with open(path, "wb") as f:
+                pickle.dump(
+                    {"sha256": interface.sha256, "actor": interface.actor}, f
+                )
+            written.append(path)
+        return written
+
+    def clear(self):
+        with self._lock:
+            self._interfaces.clear()
+
+
+class InterfaceCanister(Canister):
+    """`ic.canister.Canister` built from an already parsed actor."""
+
+    def __init__(self, agent, canister_id, interface: CandidInterface):
+        self.agent = agent
+        self.canister_id = canister_id
+        self.candid = None
+        self.interface = interface
+        self.actor = interface.actor
+
+        for name, method in self.actor["methods"].items():
+            anno = None if len(method.annotations) == 0 else method.annotations[0]
+            setattr(
+                self,
+                name,
+                CaniterMethod(
+                    agent, canister_id, name, method.argTypes, method.retTypes, anno
+                ),
+            )
+            setattr(
+                self,
+                name + "_async",
+                CaniterMethodAsync(
+                    agent, canister_id, name, method.argTypes, method.retTypes, anno
+                ),
+            )
+
+
+interface_cache = InterfaceCache()
@@ -1,15 +1,30 @@
-import boto3
+import threading
+
 from decouple import config
 
 
 class KMSClient:
     def __init__(self, region_name, aws_access_key_id, aws_secret_access_key):
-        self.kms_client = boto3.client(
-            "kms",
-            region_name=region_name,
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-        )
+        self.region_name = region_name
+        self.aws_access_key_id = aws_access_key_id
+        self.aws_secret_access_key = aws_secret_access_key
+        self._kms_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def kms_client(self):
+        """The boto3 client, built on first use since boto3 is slow to import."""
+        with self._lock:
+            if self._kms_client is None:
+                import boto3
+
+                self._kms_client = boto3.client(
+                    "kms",
+                    region_name=self.region_name,
+                    aws_access_key_id=self.aws_access_key_id,
+                    aws_secret_access_key=self.aws_secret_access_key,
+                )
+            return self._kms_client
 
     def encrypt_with_kms(self, ethereum_private_key, key_id):
         response = self.kms_client.encrypt(
@@ -21,10 +36,33 @@ class KMSClient:
         response = self.kms_client.decrypt(CiphertextBlob=encrypted_private_key)
         return response["Plaintext"]
 
+    def generate_data_key(self, key_id):
+        """Returns a fresh AES-256 data key and its KMS-wrapped form."""
+        response = self.kms_client.generate_data_key(KeyId=key_id, KeySpec="AES_256")
+        return response["Plaintext"], response["CiphertextBlob"]
+
 
-AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
-AWS_KMS_KEY_ID = config("AWS_KMS_KEY_ID")
 AWS_REGION = "eu-central-1"
 
-kms_client = KMSClient(AWS_REGION, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
+# resolved on first access through the module __getattr__, so importing this
+# module needs neither boto3 nor the AWS settings
+_LAZY = {
+    "AWS_ACCESS_KEY_ID": lambda: config("AWS_ACCESS_KEY_ID"),
+    "AWS_SECRET_ACCESS_KEY": lambda: config("AWS_SECRET_ACCESS_KEY"),
+    "AWS_KMS_KEY_ID": lambda: config("AWS_KMS_KEY_ID"),
+    "kms_client": lambda: KMSClient(
+        AWS_REGION,
+        __getattr__("AWS_ACCESS_KEY_ID"),
+        __getattr__("AWS_SECRET_ACCESS_KEY"),
+    ),
+}
+_lazy_lock = threading.RLock()
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = _LAZY[name]()
+    return globals()[name]
@@ -3,6 +3,8 @@ from base64 import b64decode, b64encode
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 
+from ..config import KEY_ENCRYPTION_MODE
+
 BLOCK_SIZE = 16
 
 
@@ -54,11 +56,21 @@ def encrypt_private_key(private_key):
 
 
 def encrypt_private_key_as_string(private_key):
+    if KEY_ENCRYPTION_MODE == "envelope":
+        from . import envelope
+
+        return envelope.encrypt(private_key)
+
     encryption_key, encrypted_private_key = encrypt_private_key(private_key)
     return f'{b64encode(encryption_key).decode("utf-8")}::{encrypted_private_key}'
 
 
 def decrypt_from_cipher_string(key_string):
+    from . import envelope
+
+    if envelope.is_envelope(key_string):
+        return envelope.decrypt(key_string)
+
     try:
         encryption_key, encrypted_private_key = key_string.split("::")
     except ValueError:
@@ -67,3 +79,38 @@ def decrypt_from_cipher_string(key_string):
     cipher = AESCipher(b64decode(encryption_key))
     private_key = cipher.decrypt(encrypted_private_key)
     return private_key
+
+
+def zeroize(buffer: bytearray):
+    """Overwrites a mutable secret buffer in place."""
+    buffer[:] = bytes(len(buffer))
+
+
+def decrypt_into_buffer(encryption_key, encrypted_private_key):
+    ciphertext = b64decode(encrypted_private_key)
+    iv = ciphertext[: AES.block_size]
+    ciphertext = ciphertext[AES.block_size :]  # noqa: E203
+    cipher = AES.new(encryption_key, AES.MODE_CBC, iv)
+    buffer = bytearray(len(ciphertext))
+    cipher.decrypt(ciphertext, output=buffer)
+    padding_length = buffer[-1] if buffer else 0
+    del buffer[len(buffer) - padding_length :]  # noqa: E203
+    return buffer
+
+
+def decrypt_to_buffer(key_string):
+    """
+    `decrypt_from_cipher_string` into a `bytearray` the caller can `zeroize`
+    once done, instead of an immutable string that lingers until collected.
+    """
+    from . import envelope
+
+    if envelope.is_envelope(key_string):
+        return envelope.decrypt_to_buffer(key_string)
+
+    try:
+        encryption_key, encrypted_private_key = key_string.split("::")
+    except ValueError:
+        return None
+
+    return decrypt_into_buffer(b64decode(encryption_key), encrypted_private_key)
@@ -0,0 +1,224 @@
+"""
+Envelope encryption of private keys.
+
+A data key generated by KMS encrypts many private keys locally; only its
+KMS-wrapped form is stored, next to each ciphertext:
+
+    env1::<base64 wrapped data key>::<base64 iv + AES-CBC ciphertext>
+
+The plaintext data key is reused for `ENVELOPE_DATA_KEY_TTL` seconds or
+`ENVELOPE_DATA_KEY_MAX_USES` encryptions, and unwrapped data keys are cached
+for decryption, so bulk work costs a handful of KMS calls instead of one per
+key.
+"""
+import threading
+import time
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from ..config import (
+    ENVELOPE_DATA_KEY_MAX_USES,
+    ENVELOPE_DATA_KEY_TTL,
+    ENVELOPE_DECRYPT_CACHE_SIZE,
+    ENVELOPE_KMS,
+    ENVELOPE_KMS_KEY_ID,
+    ENVELOPE_LOCAL_EPHEMERAL,
+    ENVELOPE_LOCAL_MASTER_KEY,
+)
+from .encryption import AESCipher, decrypt_into_buffer, zeroize
+
+ENVELOPE_PREFIX = "env1"
+SEPARATOR = "::"
+
+
+def is_envelope(key_string: str) -> bool:
+    return key_string.startswith(ENVELOPE_PREFIX + SEPARATOR)
+
+
+class LocalKMSClient:
+    """
+    In-process stand-in for `KMSClient` for tests and development. Data keys
+    are wrapped with AES-GCM under `master_key`, a random one by default, so
+    anything encrypted without a configured master key is lost on restart.
+    `get_kms_client` only allows that with ENVELOPE_LOCAL_EPHEMERAL.
+    """
+
+    def __init__(self, master_key: bytes = None):
+        self.master_key = master_key or get_random_bytes(32)
+        self.calls = 0
+
+    def encrypt_with_kms(self, plaintext, key_id):
+        self.calls += 1
+        cipher = AES.new(self.master_key, AES.MODE_GCM)
+        ciphertext, tag = cipher.encrypt_and_digest(bytes(plaintext))
+        return cipher.nonce + tag + ciphertext
+
+    def decrypt_with_kms(self, encrypted):
+        self.calls += 1
+        nonce, tag, ciphertext = encrypted[:16], encrypted[16:32], encrypted[32:]
+        cipher = AES.new(self.master_key, AES.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(ciphertext, tag)
+
+    def generate_data_key(self, key_id):
+        plaintext = get_random_bytes(32)
+        return plaintext, self.encrypt_with_kms(plaintext, key_id)
+
+
+def get_kms_client():
+    if ENVELOPE_KMS == "local":
+        master_key = ENVELOPE_LOCAL_MASTER_KEY
+        if not master_key and not ENVELOPE_LOCAL_EPHEMERAL:
+            # other workers, and this one after a restart, could never decrypt
+            raise ValueError(
+                "ENVELOPE_KMS=local requires ENVELOPE_LOCAL_MASTER_KEY; set "
+                "ENVELOPE_LOCAL_EPHEMERAL for a throwaway key in tests"
+            )
+        return LocalKMSClient(b64decode(master_key) if master_key else None)
+
+    from .cloud_key_management import kms_client
+
+    return kms_client
+
+
+def get_kms_key_id() -> str:
+    if ENVELOPE_KMS_KEY_ID or ENVELOPE_KMS == "local":
+        return ENVELOPE_KMS_KEY_ID
+
+    from .cloud_key_management import AWS_KMS_KEY_ID
+
+    return AWS_KMS_KEY_ID
+
+
+class DataKeyCache:
+    """
+    The current encryption data key plus an LRU of unwrapped data keys.
+
+    Plaintext data keys are held in `bytearray`s and wiped when they are
+    rotated out or evicted.
+    """
+
+    def __init__(
+        self,
+        kms_client=None,
+        key_id: str = None,
+        ttl: float = ENVELOPE_DATA_KEY_TTL,
+        max_uses: int = ENVELOPE_DATA_KEY_MAX_USES,
+        maxsize: int = ENVELOPE_DECRYPT_CACHE_SIZE,
+    ):
+        self._kms_client = kms_client
+        self._key_id = key_id
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.maxsize = maxsize
+        self.kms_calls = 0
+        self.hits = 0
+        self._current = None
+        self._unwrapped = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def kms_client(self):
+        if self._kms_client is None:
+            self._kms_client = get_kms_client()
+        return self._kms_client
+
+    @property
+    def key_id(self) -> str:
+        if self._key_id is None:
+            self._key_id = get_kms_key_id()
+        return self._key_id
+
+    def encryption_key(self):
+        """Returns `(plaintext, wrapped)` of the data key to encrypt with."""
+        with self._lock:
+            current = self._current
+            if (
+                current is None
+                or current["expires_at"] < time.monotonic()
+                or current["uses"] >= self.max_uses
+            ):
+                plaintext, wrapped = self.kms_client.generate_data_key(self.key_id)
+                self.kms_calls += 1
+                if current is not None:
+                    zeroize(current["plaintext"])
+                current = self._current = {
+                    "plaintext": bytearray(plaintext),
+                    "wrapped": bytes(wrapped),
+                    "expires_at": time.monotonic() + self.ttl,
+                    "uses": 0,
+                }
+            current["uses"] += 1
+            return bytes(current["plaintext"]), current["wrapped"]
+
+    def decryption_key(self, wrapped: bytes) -> bytes:
+        """Unwraps a stored data key, through KMS only on a cache miss."""
+        with self._lock:
+            entry = self._unwrapped.get(wrapped)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._unwrapped.move_to_end(wrapped)
+                self.hits += 1
+                return bytes(entry[1])
+
+        plaintext = bytearray(self.kms_client.decrypt_with_kms(wrapped))
+        with self._lock:
+            self.kms_calls += 1
+            # an expired entry, or one another thread just added
+            replaced = self._unwrapped.pop(wrapped, None)
+            if replaced is not None:
+                zeroize(replaced[1])
+            self._unwrapped[wrapped] = (time.monotonic() + self.ttl, plaintext)
+            self._unwrapped.move_to_end(wrapped)
+            while len(self._unwrapped) > self.maxsize:
+                _, (_, evicted) = self._unwrapped.popitem(last=False)
+                zeroize(evicted)
+        return bytes(plaintext)
+
+    def clear(self):
+        with self._lock:
+            if self._current is not None:
+                zeroize(self._current["plaintext"])
+                self._current = None
+            for _, plaintext in self._unwrapped.values():
+                zeroize(plaintext)
+            self._unwrapped.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kms_calls": self.kms_calls,
+                "hits": self.hits,
+                "cached_keys": len(self._unwrapped),
+            }
+
+
+data_keys = DataKeyCache()
+
+
+def encrypt(private_key: str, cache: DataKeyCache = None) -> str:
+    plaintext, wrapped = (cache or data_keys).encryption_key()
+    encrypted_private_key = AESCipher(plaintext).encrypt(private_key)
+    return SEPARATOR.join(
+        [ENVELOPE_PREFIX, b64encode(wrapped).decode("utf-8"), encrypted_private_key]
+    )
+
+
+def _split(key_string: str):
+    prefix, wrapped, encrypted_private_key = key_string.split(SEPARATOR)
+    if prefix != ENVELOPE_PREFIX:
+        raise ValueError("Not an envelope-encrypted key")
+    return b64decode(wrapped), encrypted_private_key
+
+
+def decrypt(key_string: str, cache: DataKeyCache = None) -> str:
+    wrapped, encrypted_private_key = _split(key_string)
+    data_key = (cache or data_keys).decryption_key(wrapped)
+    return AESCipher(data_key).decrypt(encrypted_private_key)
+
+
+def decrypt_to_buffer(key_string: str, cache: DataKeyCache = None) -> bytearray:
+    wrapped, encrypted_private_key = _split(key_string)
+    data_key = (cache or data_keys).decryption_key(wrapped)
+    return decrypt_into_buffer(data_key, encrypted_private_key)
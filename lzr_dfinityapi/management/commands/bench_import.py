@@ -0,0 +1,70 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MODULES = [
+    "lzr_dfinityapi.api",
+    "lzr_dfinityapi.account",
+    "lzr_dfinityapi.outbox",
+]
+
+
+def parse_importtime(stderr: str) -> dict:
+    """`{module: (self_us, cumulative_us)}` from `python -X importtime` output."""
+    timings = {}
+    for line in stderr.splitlines():
+        prefix, _, fields = line.partition(":")
+        if prefix != "import time" or "[us]" in fields:
+            continue
+        self_us, cumulative_us, name = fields.split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold-start cost of importing the app in fresh interpreters, "
+        "with the slowest imports"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+
+    def handle(self, *args, **options):
+        imports = "; ".join(f"import {module}" for module in options["modules"])
+        code = f"import django; django.setup(); {imports}"
+        command = [sys.executable, "-X", "importtime", "-c", code]
+
+        walls = []
+        slowest = {}
+        for _ in range(options["runs"]):
+            started = time.perf_counter()
+            result = subprocess.run(
+                command, capture_output=True, text=True, env=os.environ.copy()
+            )
+            walls.append(time.perf_counter() - started)
+            if result.returncode:
+                raise CommandError(result.stderr.strip().splitlines()[-1])
+            for name, (self_us, _) in parse_importtime(result.stderr).items():
+                slowest.setdefault(name, []).append(self_us)
+
+        self.stdout.write(
+            f"{len(walls)} cold start(s): median {statistics.median(walls):.3f}s, "
+            f"min {min(walls):.3f}s, max {max(walls):.3f}s"
+        )
+        ranked = sorted(
+            (
+                (statistics.median(samples), name)
+                for name, samples in slowest.items()
+            ),
+            reverse=True,
+        )
+        self.stdout.write("Slowest imports by self time (median):")
+        for self_us, name in ranked[: options["top"]]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms  {name}")
@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lzr_dfinityapi.benchmarks import (
+    compare,
+    run_suites,
+    stub_environment,
+    SUITES,
+)
+from lzr_dfinityapi.stub_replica import StubReplica
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the curve, Candid, trade and mixed-workload benchmarks against a "
+        "local stub replica and report throughput and p50/p99 latency. Creates "
+        "and deletes its own coins and users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", choices=SUITES, action="append")
+        parser.add_argument(
+            "--iterations", type=int, default=2000, help="Per micro-benchmark"
+        )
+        parser.add_argument("--trades", type=int, default=50, help="Per trader")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--amount", type=float, default=0.01, help="LZR per buy")
+        parser.add_argument(
+            "--sell-amount", type=float, default=0.01, help="Coins per sell"
+        )
+        parser.add_argument("--sell-ratio", type=float, default=0.3)
+        parser.add_argument(
+            "--latency", type=float, default=0.0, help="Update latency, seconds"
+        )
+        parser.add_argument(
+            "--query-latency", type=float, default=0.0, help="Query latency, seconds"
+        )
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--seed", type=int)
+        parser.add_argument(
+            "--http",
+            action="store_true",
+            help="Reach the stub over loopback HTTP instead of in process",
+        )
+        parser.add_argument("--json", help="Write the results to this file")
+        parser.add_argument(
+            "--baseline", help="Fail on regressions against this --json file"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown against the baseline, a fraction",
+        )
+
+    def handle(self, *args, **options):
+        replica = StubReplica(
+            latency=options["latency"],
+            query_latency=options["query_latency"],
+            failure_rate=options["failure_rate"],
+            seed=options["seed"],
+        )
+        with stub_environment(replica, http=options["http"]) as env:
+            results = run_suites(env, options["suite"] or SUITES, **options)
+
+        for name, report in results.items():
+            self.stdout.write(
+                f"{name:>36}: {report['count']} op(s), {report['errors']} "
+                f"error(s), {report['throughput']:.1f}/s, "
+                f"p50 {report['p50'] * 1000:.3f}ms, "
+                f"p99 {report['p99'] * 1000:.3f}ms"
+            )
+
+        if options["json"]:
+            with open(options["json"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        if options["baseline"]:
+            with open(options["baseline"], "r", encoding="utf-8") as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options["tolerance"]
+                )
+            for name, metric, previous, current in regressions:
+                self.stderr.write(
+                    f"{name}: {metric} {previous:.6g} -> {current:.6g}"
+                )
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} regression(s) beyond "
+                    f"{options['tolerance']:.0%} of the baseline"
+                )
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from lzr_dfinityapi import api
+from lzr_dfinityapi.models import Coin
+from lzr_dfinityapi.stats import LatencyRecorder
+
+MODES = ("lock", "cas")
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one coin with concurrent deferred buys and report throughput and "
+        "latency per trade concurrency mode. Creates and deletes its own coin "
+        "and users; meaningful on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--trades", type=int, default=50, help="Per thread")
+        parser.add_argument("--amount", type=float, default=0.5, help="LZR per buy")
+        parser.add_argument("--mode", choices=MODES, action="append")
+        parser.add_argument(
+            "--no-serialize",
+            action="store_true",
+            help="Skip the in-process per-coin queue",
+        )
+
+    def handle(self, *args, **options):
+        modes = options["mode"] or MODES
+        serialize = not options["no_serialize"]
+        for mode in modes:
+            report = self._run(mode, serialize, options)
+            self.stdout.write(
+                f"{mode:>4} serialize={serialize}: {report['count']} trades, "
+                f"{report['errors']} error(s), {report['throughput']:.1f}/s, "
+                f"p50 {report['p50'] * 1000:.2f}ms, "
+                f"p99 {report['p99'] * 1000:.2f}ms"
+            )
+
+    def _run(self, mode, serialize, options):
+        User = get_user_model()
+        users = [
+            User.objects.create(username=f"bench-trades-{mode}-{i}")
+            for i in range(options["threads"])
+        ]
+        for user in users:
+            if not getattr(user, "account_principal", None):
+                user.account_principal = "aaaaa-aa"
+        coin = Coin.objects.create(
+            name=f"bench-trades-{mode}",
+            symbol="BENCH",
+            creator=users[0],
+            total_supply=2 * 10**18,
+            reserve_balance=10**18,
+        )
+
+        previous = api.TRADE_CONCURRENCY_MODE, api.TRADE_SERIALIZE_PER_COIN
+        api.TRADE_CONCURRENCY_MODE, api.TRADE_SERIALIZE_PER_COIN = mode, serialize
+        recorder = LatencyRecorder()
+        errors = []
+
+        def worker(user):
+            try:
+                trader_coin = Coin.objects.get(pk=coin.pk)
+                for _ in range(options["trades"]):
+                    started = time.perf_counter()
+                    try:
+                        api.buy_coin(
+                            user, trader_coin, options["amount"], defer=True
+                        )
+                    except Exception as e:  # noqa: B902
+                        errors.append(e)
+                        recorder.record(time.perf_counter() - started, error=True)
+                    else:
+                        recorder.record(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            api.TRADE_CONCURRENCY_MODE, api.TRADE_SERIALIZE_PER_COIN = previous
+            close_old_connections()
+            coin.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        for error in errors[:5]:
+            self.stderr.write(f"{type(error).__name__}: {error}")
+        return recorder.report()
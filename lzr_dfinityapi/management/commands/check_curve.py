@@ -0,0 +1,156 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from lzr_dfinityapi.curve import (
+    ContinuosToken,
+    random_state,
+    reference_purchase_return,
+    reference_sale_return,
+    WEI,
+)
+from lzr_dfinityapi.units import from_wei, to_wei
+
+
+class Command(BaseCommand):
+    help = (
+        "Differential check of the fixed-point bonding curve against a "
+        "high-precision Decimal reference, plus a timing comparison"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--vectorized",
+            action="store_true",
+            help="Also compare the NumPy quote API with the scalar float functions",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=Decimal,
+            default=Decimal("1e-27"),
+            help=(
+                "Maximum shortfall against the reference, relative to the size "
+                "of the curve state (supply + reserve + result)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        tolerance = options["tolerance"]
+        failures = []
+        worst = Decimal(0)
+        cases = []
+
+        for _ in range(options["samples"]):
+            x, rb, p = random_state(rng)
+            cases.append((x, rb, p))
+            checks = [
+                (
+                    "purchase",
+                    (x, rb, p),
+                    ContinuosToken.calc_purchase_return_wei(x, rb, p),
+                    reference_purchase_return(x, rb, p),
+                ),
+                (
+                    "polynomial",
+                    (0, 0, p),
+                    ContinuosToken.calc_purchase_return_wei(0, 0, p),
+                    reference_purchase_return(0, 0, p),
+                ),
+            ]
+            sale_amount = min(p, x)
+            checks.append(
+                (
+                    "sale",
+                    (x, rb, sale_amount),
+                    ContinuosToken.calc_sale_return_wei(x, rb, sale_amount),
+                    reference_sale_return(x, rb, sale_amount),
+                )
+            )
+
+            for name, inputs, result, reference in checks:
+                # results are floored, anything above the reference overpays
+                if result > reference:
+                    failures.append((name, inputs, result, reference))
+                    continue
+                shortfall = reference - result
+                if shortfall <= 2:
+                    continue
+                # the fixed-point error scales with the magnitude of the state
+                relative = shortfall / (reference + inputs[0] + inputs[1])
+                worst = max(worst, relative)
+                if relative > tolerance:
+                    failures.append((name, inputs, result, reference))
+
+        for name, inputs, result, reference in failures[:20]:
+            self.stderr.write(f"{name}{inputs}: got {result}, reference {reference}")
+
+        self.stdout.write(
+            f"{len(cases) * 3} comparisons, {len(failures)} failure(s), "
+            f"worst relative shortfall {worst:.3e}"
+        )
+        self._report_timings(cases)
+
+        if failures:
+            raise CommandError("Fixed-point curve disagrees with the reference")
+
+        if options["vectorized"]:
+            self._check_vectorized(cases)
+
+    def _check_vectorized(self, cases):
+        from lzr_dfinityapi.quotes import quote_curve
+
+        x, rb, p = (
+            np.array(values, dtype=np.float64) / WEI for values in zip(*cases)
+        )
+        p = np.minimum(p, x)
+        quotes = quote_curve(x, rb, p)
+        expected_purchase = np.array(
+            [ContinuosToken.calc_purchase_return(*args) for args in zip(x, rb, p)]
+        )
+        expected_sale = np.array(
+            [ContinuosToken.calc_sale_return(*args) for args in zip(x, rb, p)]
+        )
+        # float cancellation error scales with the curve state, as above
+        scale = np.abs(expected_purchase) + x + rb
+        if not (
+            np.all(
+                np.abs(quotes.purchase_return - expected_purchase) <= 1e-12 * scale
+            )
+            and np.all(np.abs(quotes.sale_return - expected_sale) <= 1e-12 * scale)
+        ):
+            raise CommandError(
+                "Vectorized quotes disagree with the scalar functions"
+            )
+        self.stdout.write(
+            f"{len(cases)} vectorized quotes agree with the scalar ones"
+        )
+
+    def _report_timings(self, cases):
+        cases = [(x, rb, min(p, x)) for x, rb, p in cases]
+
+        start = time.perf_counter()
+        for x, rb, p in cases:
+            ContinuosToken.calc_purchase_return_wei(x, rb, p)
+            ContinuosToken.calc_sale_return_wei(x, rb, p)
+        fixed_point = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for x, rb, p in cases:
+            x_ether = float(from_wei(x))
+            rb_ether = float(from_wei(rb))
+            p_ether = float(from_wei(p))
+            to_wei(ContinuosToken.calc_purchase_return(x_ether, rb_ether, p_ether))
+            to_wei(ContinuosToken.calc_sale_return(x_ether, rb_ether, p_ether))
+        floating_point = time.perf_counter() - start
+
+        per_trade = 1e6 / len(cases) if cases else 0
+        self.stdout.write(
+            f"fixed-point: {fixed_point * per_trade:.1f} us per buy+sell quote, "
+            f"float with wei conversions: {floating_point * per_trade:.1f} us"
+        )
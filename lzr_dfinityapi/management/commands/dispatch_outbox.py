@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lzr_dfinityapi import metrics
+from lzr_dfinityapi.batching import CanisterBatcher
+from lzr_dfinityapi.config import BATCH_MAX_IN_FLIGHT, OUTBOX_BATCH_SIZE
+from lzr_dfinityapi.outbox import OutboxDispatcher
+from lzr_dfinityapi.pipeline import StatusPoller
+
+
+class Command(BaseCommand):
+    help = "Drain pending canister mint/burn operations from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--max-in-flight",
+            type=int,
+            default=BATCH_MAX_IN_FLIGHT,
+            help="Concurrent calls per canister, 0 dispatches serially",
+        )
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            help="Submit each batch at once and poll the replies together",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Dispatch one batch and exit"
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help='Serve /metrics on this port, needs METRICS_SINK "prometheus"',
+        )
+
+    def handle(self, *args, **options):
+        if options["metrics_port"]:
+            if not hasattr(metrics.sink, "render"):
+                raise CommandError('--metrics-port needs METRICS_SINK "prometheus"')
+            metrics.start_http_server(options["metrics_port"])
+
+        batcher = poller = None
+        if options["pipeline"]:
+            poller = StatusPoller()
+        elif options["max_in_flight"] > 0:
+            batcher = CanisterBatcher(
+                window=0,
+                max_batch_size=options["batch_size"],
+                max_in_flight=options["max_in_flight"],
+            )
+        dispatcher = OutboxDispatcher(
+            options["batch_size"], options["poll_interval"], batcher, poller
+        )
+        try:
+            if options["once"]:
+                count = dispatcher.run_once()
+                self.stdout.write(f"Dispatched {count} operation(s)")
+            else:
+                dispatcher.run()
+        except KeyboardInterrupt:
+            dispatcher.stop()
+        finally:
+            if poller is not None:
+                poller.close()
+                self.stdout.write(f"Status reads: {poller.read_states}")
+            if batcher is not None:
+                batcher.close()
+                self.stdout.write(f"Batcher report: {batcher.report()}")
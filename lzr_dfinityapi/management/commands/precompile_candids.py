@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from lzr_dfinityapi.interfaces import interface_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse the Candid interfaces once and write them as precompiled .didc files"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--candid-folder", default=None, help="Defaults to CANDID_FOLDER"
+        )
+        parser.add_argument(
+            "--output-folder",
+            default=None,
+            help="Defaults to CANDID_PRECOMPILED_FOLDER, then to the candid folder",
+        )
+
+    def handle(self, *args, **options):
+        written = interface_cache.precompile(
+            options["candid_folder"], options["output_folder"]
+        )
+        for path in written:
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,85 @@
+import json
+import time
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lzr_dfinityapi.account import Account
+from lzr_dfinityapi.config import PROVISION_BATCH_SIZE, PROVISION_WORKERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-create custodial accounts in bulk, either into a model through "
+        "bulk_create or as JSON lines"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int)
+        parser.add_argument("--batch-size", type=int, default=PROVISION_BATCH_SIZE)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=PROVISION_WORKERS,
+            help="Key generation processes, 0 for one per core",
+        )
+        parser.add_argument(
+            "--model", help="app_label.ModelName to bulk_create into"
+        )
+        parser.add_argument("--principal-field", default="principal")
+        parser.add_argument("--key-field", default="encrypted_key")
+        parser.add_argument("--output", help="JSON lines file, used without --model")
+
+    def _get_model(self, options):
+        try:
+            model = apps.get_model(options["model"])
+            model._meta.get_field(options["principal_field"])
+            model._meta.get_field(options["key_field"])
+        except (LookupError, ValueError, FieldDoesNotExist) as e:
+            raise CommandError(e)
+        return model
+
+    def handle(self, *args, **options):
+        model = self._get_model(options) if options["model"] else None
+        if model is None and not options["output"]:
+            raise CommandError("Pass --model or --output")
+        output = None if model else open(options["output"], "w")
+
+        started = time.perf_counter()
+        created = 0
+        try:
+            for batch in Account.create_many(
+                options["count"], options["batch_size"], options["workers"]
+            ):
+                if model:
+                    with transaction.atomic():
+                        model.objects.bulk_create(
+                            model(
+                                **{
+                                    options["principal_field"]: account.principal,
+                                    options["key_field"]: account.encrypted_key,
+                                }
+                            )
+                            for account in batch
+                        )
+                else:
+                    output.writelines(
+                        json.dumps(account._asdict()) + "\n" for account in batch
+                    )
+                created += len(batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{created}/{options['count']} accounts, "
+                    f"{created / elapsed:.0f}/s"
+                )
+        finally:
+            if output:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Provisioned {created} account(s) in {elapsed:.1f}s "
+            f"({created / elapsed if elapsed else 0:.0f}/s)"
+        )
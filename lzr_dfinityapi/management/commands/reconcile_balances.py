@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from lzr_dfinityapi.config import (
+    CANISTER_CONCURRENCY_LIMIT,
+    RECONCILE_CHUNK_SIZE,
+    RECONCILE_COIN_CONCURRENCY,
+    RECONCILE_CONCURRENCY,
+)
+from lzr_dfinityapi.reconcile import reconcile, Reconciler
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare coin supplies and holder balances with the coin canisters and "
+        "write a JSON lines drift report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("report", help="Drift report path")
+        parser.add_argument(
+            "--checkpoint",
+            help="Resume file; coins recorded in it are skipped and appended to",
+        )
+        parser.add_argument("--coin", type=int, action="append", dest="coin_ids")
+        parser.add_argument("--concurrency", type=int, default=RECONCILE_CONCURRENCY)
+        parser.add_argument(
+            "--per-canister", type=int, default=CANISTER_CONCURRENCY_LIMIT
+        )
+        parser.add_argument(
+            "--coin-concurrency", type=int, default=RECONCILE_COIN_CONCURRENCY
+        )
+        parser.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        reconciler = Reconciler(
+            concurrency=options["concurrency"],
+            per_canister=options["per_canister"],
+            chunk_size=options["chunk_size"],
+            coin_concurrency=options["coin_concurrency"],
+        )
+        summary = reconcile(
+            options["report"], options["checkpoint"], options["coin_ids"], reconciler
+        )
+        self.stdout.write(
+            f"{summary['coins']} coin(s) reconciled, {summary['skipped']} skipped "
+            f"from checkpoint: {summary['supply']} supply and "
+            f"{summary['balance']} balance drift(s)"
+        )
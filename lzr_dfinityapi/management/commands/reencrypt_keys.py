@@ -0,0 +1,77 @@
+import binascii
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lzr_dfinityapi.key_management import envelope
+from lzr_dfinityapi.key_management.encryption import decrypt_from_cipher_string
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt stored 'key::cipher' private keys with envelope encryption, "
+        "in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", required=True, help="app_label.ModelName")
+        parser.add_argument("--field", required=True)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Decrypt and count only"
+        )
+
+    def handle(self, *args, **options):
+        field = options["field"]
+        try:
+            model = apps.get_model(options["model"])
+            model._meta.get_field(field)
+        except (LookupError, ValueError, FieldDoesNotExist) as e:
+            raise CommandError(e)
+
+        pending = (
+            model.objects.exclude(
+                **{
+                    f"{field}__startswith": envelope.ENVELOPE_PREFIX
+                    + envelope.SEPARATOR
+                }
+            )
+            .exclude(**{field: ""})
+            .exclude(**{f"{field}__isnull": True})
+            .order_by("pk")
+        )
+        last_pk = None
+        migrated = failed = 0
+        while True:
+            batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+            rows = list(batch.only("pk", field)[: options["batch_size"]])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+
+            changed = []
+            for row in rows:
+                try:
+                    private_key = decrypt_from_cipher_string(getattr(row, field))
+                except (binascii.Error, UnicodeDecodeError, ValueError):
+                    private_key = None
+                if not private_key:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {row.pk}: cannot decrypt")
+                    continue
+                setattr(row, field, envelope.encrypt(private_key))
+                changed.append(row)
+
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, [field])
+            migrated += len(changed)
+            self.stdout.write(f"{migrated} re-encrypted, up to pk {last_pk}")
+
+        verb = "Would re-encrypt" if options["dry_run"] else "Re-encrypted"
+        self.stdout.write(
+            f"{verb} {migrated} key(s), {failed} failure(s); "
+            f"data keys: {envelope.data_keys.stats()}"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from lzr_dfinityapi import coin_stats
+from lzr_dfinityapi.config import COIN_STATS_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute coin stats from holders, coins and trade logs and report "
+        "drift from the incrementally maintained values"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "coin_ids", nargs="*", type=int, help="Defaults to every coin"
+        )
+        parser.add_argument("--batch-size", type=int, default=COIN_STATS_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report drift only"
+        )
+
+    def handle(self, *args, **options):
+        drifts = coin_stats.refresh(
+            options["coin_ids"] or None,
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        for drift in drifts:
+            if drift.field == "volume_24h":
+                # expected as trades leave the window
+                continue
+            self.stderr.write(
+                f"coin {drift.coin_id} {drift.field}: "
+                f"stored {drift.stored}, actual {drift.actual}"
+            )
+        verb = "Found" if options["dry_run"] else "Corrected"
+        self.stdout.write(
+            f"{verb} {len(drifts)} drifted figure(s) in "
+            f"{len({drift.coin_id for drift in drifts})} coin(s)"
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from lzr_dfinityapi import candles
+
+
+class Command(BaseCommand):
+    help = "Rebuild the price candles of coins from their trade logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "coin_ids", nargs="*", type=int, help="Defaults to every traded coin"
+        )
+        parser.add_argument(
+            "--since",
+            help="ISO datetime; rebuilds from the start of its day instead of "
+            "from the first trade",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError(f"Invalid datetime {options['since']!r}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        written = candles.rebuild(options["coin_ids"] or None, since)
+        self.stdout.write(f"Wrote {written} candle(s)")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from lzr_dfinityapi import indexer
+from lzr_dfinityapi.config import LEDGER_PAGE_SIZE
+
+
+class Command(BaseCommand):
+    help = "Copy new ledger transactions of coin canisters into the local index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "canister_ids", nargs="*", help="Defaults to every deployed coin"
+        )
+        parser.add_argument("--page-size", type=int, default=LEDGER_PAGE_SIZE)
+        parser.add_argument(
+            "--max-pages", type=int, default=None, help="Per canister and run"
+        )
+
+    def handle(self, *args, **options):
+        if options["canister_ids"]:
+            copied = {
+                canister_id: indexer.sync_canister(
+                    canister_id, options["page_size"], options["max_pages"]
+                )
+                for canister_id in options["canister_ids"]
+            }
+        else:
+            copied = indexer.sync_all(options["page_size"], options["max_pages"])
+
+        for canister_id, count in copied.items():
+            self.stdout.write(f"{canister_id}: {count} transaction(s)")
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (
+    METADATA_CACHE_BACKEND,
+    METADATA_CACHE_TTL,
+    METADATA_FEE_TTL,
+    METADATA_FETCH_WORKERS,
+)
+from .quote_cache import BACKENDS, LRUBackend
+
+FIELD_TTLS = {
+    "icrc1_symbol": METADATA_CACHE_TTL,
+    "icrc1_name": METADATA_CACHE_TTL,
+    "icrc1_decimals": METADATA_CACHE_TTL,
+    "icrc1_supported_standards": METADATA_CACHE_TTL,
+    "icrc1_minting_account": METADATA_CACHE_TTL,
+    "icrc1_fee": METADATA_FEE_TTL,
+    "icrc1_metadata": METADATA_FEE_TTL,
+}
+
+
+class MetadataCache:
+    """
+    Per-canister cache of ICRC-1 metadata queries with a TTL per field.
+
+    Values are stored wrapped in a tuple so that empty answers such as an
+    unset minting account are cached too. A rejected query raises and is
+    never stored.
+    """
+
+    def __init__(self, backend=None, ttls: dict = None, workers: int = None):
+        self.backend = backend or LRUBackend()
+        self.ttls = dict(FIELD_TTLS, **(ttls or {}))
+        self.workers = workers or METADATA_FETCH_WORKERS
+        self.hits = 0
+        self.misses = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        return cls(BACKENDS[METADATA_CACHE_BACKEND]())
+
+    @staticmethod
+    def key(canister_id, field: str) -> str:
+        return f"lzr:metadata:{canister_id}:{field}"
+
+    def _cached(self, canister_id, fields):
+        found = {}
+        for field in fields:
+            entry = self.backend.get(self.key(canister_id, field))
+            if entry is not None:
+                found[field] = entry[0]
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(fields) - len(found)
+        return found
+
+    def _store(self, canister_id, field: str, value):
+        self.backend.set(self.key(canister_id, field), (value,), self.ttls[field])
+
+    def get(self, canister, field: str):
+        """`field` of a `TokenCanister`, queried only when not cached."""
+        found = self._cached(canister.canister_id, [field])
+        if field in found:
+            return found[field]
+        value = canister.query_metadata(field)
+        self._store(canister.canister_id, field, value)
+        return value
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="icrc1-metadata"
+                )
+            return self._executor
+
+    def fetch(self, canister, fields=None) -> dict:
+        """
+        All metadata `fields` of a `TokenCanister` as a dict. The uncached ones
+        are queried concurrently.
+        """
+        fields = list(fields or self.ttls)
+        found = self._cached(canister.canister_id, fields)
+        missing = [field for field in fields if field not in found]
+        if len(missing) == 1:
+            found[missing[0]] = canister.query_metadata(missing[0])
+        elif missing:
+            executor = self._get_executor()
+            futures = {
+                field: executor.submit(canister.query_metadata, field)
+                for field in missing
+            }
+            for field, future in futures.items():
+                found[field] = future.result()
+        for field in missing:
+            self._store(canister.canister_id, field, found[field])
+        return found
+
+    async def fetch_async(self, canister, fields=None) -> dict:
+        """Async variant of `fetch`, querying through the async agent."""
+        fields = list(fields or self.ttls)
+        found = self._cached(canister.canister_id, fields)
+        missing = [field for field in fields if field not in found]
+        values = await asyncio.gather(
+            *(canister.query_metadata_async(field) for field in missing)
+        )
+        for field, value in zip(missing, values):
+            found[field] = value
+            self._store(canister.canister_id, field, value)
+        return found
+
+    def invalidate(self, canister_id, fields=None):
+        for field in fields or self.ttls:
+            self.backend.delete(self.key(canister_id, field))
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+metadata_cache = MetadataCache.from_config()
@@ -0,0 +1,313 @@
+"""
+Trade and canister call instrumentation behind a pluggable sink.
+
+    with metrics.span("coin_state"):
+        ...
+    metrics.increment("lzr_transfer_errors_total", variant="BadFee")
+
+Spans record their duration in the `lzr_phase_seconds` histogram and their
+outcome in `lzr_phases_total`; canister calls made through `AsyncAgent` are
+recorded in `lzr_canister_call_seconds` and `lzr_canister_calls_total` per
+canister and method.
+
+The sink is chosen by METRICS_SINK: "noop" (default) returns a shared null
+context from `span` and drops everything else, "prometheus" keeps the
+metrics in process for `render` / `start_http_server`, and "otel" forwards
+them to the OpenTelemetry API, which must be installed and configured by the
+host application.
+"""
+import inspect
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import METRICS_BUCKETS, METRICS_SINK
+
+PHASE_SECONDS = "lzr_phase_seconds"
+PHASES_TOTAL = "lzr_phases_total"
+CALL_SECONDS = "lzr_canister_call_seconds"
+CALLS_TOTAL = "lzr_canister_calls_total"
+TRANSFER_ERRORS_TOTAL = "lzr_transfer_errors_total"
+ENDPOINT_FAILURES_TOTAL = "lzr_endpoint_failures_total"
+ENDPOINT_EJECTIONS_TOTAL = "lzr_endpoint_ejections_total"
+HEDGED_QUERIES_TOTAL = "lzr_hedged_queries_total"
+
+_NULL = nullcontext()
+
+
+class _Timer:
+    """Times a block into `histogram` and counts it in `counter` by status."""
+
+    __slots__ = ("sink", "histogram", "counter", "labels", "started")
+
+    def __init__(self, sink, histogram: str, counter: str, labels: dict):
+        self.sink = sink
+        self.histogram = histogram
+        self.counter = counter
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sink.observe(
+            self.histogram, time.perf_counter() - self.started, self.labels
+        )
+        status = "ok" if exc_type is None else "error"
+        self.sink.increment(self.counter, 1, {**self.labels, "status": status})
+        return False
+
+
+class NoopSink:
+    def span(self, name: str, labels: dict):
+        return _NULL
+
+    def call(self, canister_id: str, method: str):
+        return _NULL
+
+    def increment(self, name: str, value: float, labels: dict):
+        pass
+
+    def observe(self, name: str, value: float, labels: dict):
+        pass
+
+
+class _RecordingSink:
+    def span(self, name: str, labels: dict):
+        return _Timer(self, PHASE_SECONDS, PHASES_TOTAL, {"phase": name, **labels})
+
+    def call(self, canister_id: str, method: str):
+        labels = {"canister": str(canister_id), "method": method}
+        return _Timer(self, CALL_SECONDS, CALLS_TOTAL, labels)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in key
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class PrometheusSink(_RecordingSink):
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float, labels: dict):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: dict):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                # per-bucket counts, made cumulative when rendered, sum, count
+                histogram = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            counters = {
+                name: dict(series) for name, series in self._counters.items()
+            }
+            histograms = {
+                name: {key: (list(h[0]), h[1], h[2]) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        lines = []
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(key, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class OpenTelemetrySink(_RecordingSink):
+    """
+    Forwards counters and histograms to an OpenTelemetry meter and opens a
+    tracer span for every `span`. Exporters are configured by the host
+    application through the OpenTelemetry SDK.
+    """
+
+    def __init__(self, meter=None, tracer=None):
+        if meter is None or tracer is None:
+            try:
+                from opentelemetry import metrics as otel_metrics
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    'METRICS_SINK "otel" requires the opentelemetry-api package'
+                ) from e
+            meter = meter or otel_metrics.get_meter(__name__)
+            tracer = tracer or trace.get_tracer(__name__)
+
+        self.meter = meter
+        self.tracer = tracer
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _instrument(self, instruments: dict, name: str, create):
+        instrument = instruments.get(name)
+        if instrument is None:
+            with self._lock:
+                instrument = instruments.get(name)
+                if instrument is None:
+                    instrument = instruments[name] = create(name)
+        return instrument
+
+    def span(self, name: str, labels: dict):
+        return _OpenTelemetrySpan(self, name, labels)
+
+    def increment(self, name: str, value: float, labels: dict):
+        counter = self._instrument(self._counters, name, self.meter.create_counter)
+        counter.add(value, labels)
+
+    def observe(self, name: str, value: float, labels: dict):
+        histogram = self._instrument(
+            self._histograms, name, self.meter.create_histogram
+        )
+        histogram.record(value, labels)
+
+
+class _OpenTelemetrySpan:
+    __slots__ = ("timer", "span")
+
+    def __init__(self, sink: OpenTelemetrySink, name: str, labels: dict):
+        self.timer = _Timer(
+            sink, PHASE_SECONDS, PHASES_TOTAL, {"phase": name, **labels}
+        )
+        self.span = sink.tracer.start_as_current_span(name, attributes=labels)
+
+    def __enter__(self):
+        self.span.__enter__()
+        return self.timer.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.__exit__(exc_type, exc, tb)
+        return self.span.__exit__(exc_type, exc, tb)
+
+
+SINKS = {
+    "noop": NoopSink,
+    "prometheus": PrometheusSink,
+    "otel": OpenTelemetrySink,
+}
+
+sink = SINKS[METRICS_SINK]()
+
+
+def set_sink(new_sink):
+    """Replaces the sink, e.g. `set_sink(PrometheusSink())` in tests or tools."""
+    global sink
+    sink = new_sink
+
+
+def span(name: str, **labels):
+    """Context manager timing one phase of a trade or call."""
+    return sink.span(name, labels)
+
+
+def timed(name: str, **labels):
+    """Decorator running a function or coroutine function in `span(name)`."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with sink.span(name, labels):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with sink.span(name, labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def canister_call(canister_id, method: str):
+    """Context manager timing and counting one call to a canister method."""
+    return sink.call(canister_id, method)
+
+
+def increment(name: str, value: float = 1, **labels):
+    sink.increment(name, value, labels)
+
+
+def observe(name: str, value: float, **labels):
+    sink.observe(name, value, labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        if self.path.split("?")[0] != "/metrics" or not hasattr(sink, "render"):
+            self.send_error(404)
+            return
+        body = sink.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+def start_http_server(port: int, addr: str = "") -> ThreadingHTTPServer:
+    """
+    Serves the Prometheus sink on `http://addr:port/metrics` from a daemon
+    thread and returns the server; call `shutdown()` on it to stop.
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "lzr_dfinityapi",
+            "0007_alter_coin_reserve_balance_alter_coin_total_supply_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CanisterOperation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "idempotency_key",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("canister_id", models.CharField(max_length=300)),
+                (
+                    "method",
+                    models.CharField(
+                        choices=[("MINT", "MINT"), ("BURN", "BURN")], max_length=10
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=0, max_digits=50)),
+                ("principal", models.CharField(blank=True, max_length=100)),
+                ("signer_key", models.TextField(blank=True)),
+                ("created_at_time", models.PositiveBigIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "PENDING"),
+                            ("IN_FLIGHT", "IN_FLIGHT"),
+                            ("DONE", "DONE"),
+                            ("FAILED", "FAILED"),
+                        ],
+                        default="PENDING",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "block_index",
+                    models.DecimalField(
+                        blank=True, decimal_places=0, max_digits=50, null=True
+                    ),
+                ),
+                (
+                    "log",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="lzr_dfinityapi.log",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-created_at",),
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="canister_op_status_next_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0008_canisteroperation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coin",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
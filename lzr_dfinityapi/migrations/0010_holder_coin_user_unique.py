@@ -0,0 +1,57 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:52
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_holders(apps, schema_editor):
+    """Folds duplicate (coin, user) holders into the oldest row."""
+    Holder = apps.get_model("lzr_dfinityapi", "Holder")
+    duplicates = (
+        Holder.objects.values("coin", "user")
+        .annotate(rows=Count("id"), total=Sum("balance"))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = Holder.objects.filter(
+            coin=duplicate["coin"], user=duplicate["user"]
+        ).order_by("created_at", "id")
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        rows.filter(pk=keep.pk).update(balance=duplicate["total"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0009_coin_version"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="coin",
+            name="holders",
+        ),
+        migrations.RunPython(merge_duplicate_holders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="holder",
+            index=models.Index(
+                condition=models.Q(("balance__gt", 0)),
+                fields=["coin", "user"],
+                name="holder_coin_positive_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="holder",
+            index=models.Index(
+                condition=models.Q(("balance__gt", 0)),
+                fields=["user", "coin"],
+                name="holder_user_positive_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="holder",
+            constraint=models.UniqueConstraint(
+                fields=("coin", "user"), name="holder_coin_user_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0010_holder_coin_user_unique"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="holder",
+            name="holder_coin_positive_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="holder",
+            name="holder_user_positive_idx",
+        ),
+        migrations.AddIndex(
+            model_name="holder",
+            index=models.Index(
+                condition=models.Q(("balance__gt", 0)),
+                fields=["coin", "-balance", "-id"],
+                name="holder_coin_balance_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="holder",
+            index=models.Index(
+                condition=models.Q(("balance__gt", 0)),
+                fields=["coin", "-created_at", "-id"],
+                name="holder_coin_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="holder",
+            index=models.Index(
+                condition=models.Q(("balance__gt", 0)),
+                fields=["user", "-created_at", "-id"],
+                name="holder_user_recent_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0011_holder_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerSyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("canister_id", models.CharField(max_length=300, unique=True)),
+                (
+                    "next_index",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+                (
+                    "log_length",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+            ],
+            options={
+                "ordering": ("-created_at",),
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerTransaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("canister_id", models.CharField(max_length=300)),
+                ("index", models.DecimalField(decimal_places=0, max_digits=50)),
+                ("kind", models.CharField(max_length=20)),
+                ("amount", models.DecimalField(decimal_places=0, max_digits=50)),
+                (
+                    "from_owner",
+                    models.CharField(blank=True, db_index=True, max_length=100),
+                ),
+                (
+                    "to_owner",
+                    models.CharField(blank=True, db_index=True, max_length=100),
+                ),
+                (
+                    "fee",
+                    models.DecimalField(
+                        blank=True, decimal_places=0, max_digits=50, null=True
+                    ),
+                ),
+                ("memo", models.BinaryField(blank=True, null=True)),
+                (
+                    "created_at_time",
+                    models.PositiveBigIntegerField(blank=True, null=True),
+                ),
+                ("timestamp", models.PositiveBigIntegerField()),
+            ],
+            options={
+                "ordering": ("canister_id", "index"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ledgertransaction",
+            constraint=models.UniqueConstraint(
+                fields=("canister_id", "index"), name="ledger_tx_canister_index_uniq"
+            ),
+        ),
+    ]
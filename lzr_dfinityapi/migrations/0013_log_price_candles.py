@@ -0,0 +1,83 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0012_ledger_transactions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="log",
+            name="price",
+            field=models.DecimalField(
+                blank=True, decimal_places=18, max_digits=50, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="log",
+            name="reserve_amount",
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=50),
+        ),
+        migrations.CreateModel(
+            name="Candle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "interval",
+                    models.CharField(
+                        choices=[("1m", "1m"), ("1h", "1h"), ("1d", "1d")],
+                        max_length=2,
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                ("open", models.DecimalField(decimal_places=18, max_digits=50)),
+                ("high", models.DecimalField(decimal_places=18, max_digits=50)),
+                ("low", models.DecimalField(decimal_places=18, max_digits=50)),
+                ("close", models.DecimalField(decimal_places=18, max_digits=50)),
+                (
+                    "volume",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+                (
+                    "reserve_volume",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+                ("trades", models.PositiveIntegerField(default=0)),
+                (
+                    "coin",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="lzr_dfinityapi.coin",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("start",),
+                "abstract": False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="candle",
+            constraint=models.UniqueConstraint(
+                fields=("coin", "interval", "start"),
+                name="candle_coin_interval_uniq",
+            ),
+        ),
+    ]
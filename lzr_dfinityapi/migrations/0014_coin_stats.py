@@ -0,0 +1,62 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0013_log_price_candles"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoinStats",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "coin",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="lzr_dfinityapi.coin",
+                    ),
+                ),
+                ("holder_count", models.PositiveIntegerField(default=0)),
+                (
+                    "spot_price",
+                    models.DecimalField(decimal_places=18, default=0, max_digits=50),
+                ),
+                (
+                    "market_cap",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+                (
+                    "volume_24h",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=50),
+                ),
+            ],
+            options={
+                "ordering": ("-created_at",),
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["-market_cap", "-coin"], name="coinstats_cap_idx"
+                    ),
+                    models.Index(
+                        fields=["-holder_count", "-coin"],
+                        name="coinstats_holders_idx",
+                    ),
+                    models.Index(
+                        fields=["-volume_24h", "-coin"], name="coinstats_volume_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
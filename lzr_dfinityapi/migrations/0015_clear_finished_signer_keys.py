@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:12
+
+from django.db import migrations
+
+
+def clear_finished_signer_keys(apps, schema_editor):
+    """Drops the signer keys that finished operations kept."""
+    CanisterOperation = apps.get_model("lzr_dfinityapi", "CanisterOperation")
+    CanisterOperation.objects.filter(status__in=["DONE", "FAILED"]).exclude(
+        signer_key=""
+    ).update(signer_key="")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lzr_dfinityapi", "0014_coin_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_finished_signer_keys, migrations.RunPython.noop),
+    ]
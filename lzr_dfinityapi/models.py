@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 USER_MODEL = getattr(settings, "AUTH_USER_MODEL", None) or "auth.User"
@@ -27,7 +30,12 @@ class Coin(BaseModelMixin):
     reserve_balance = models.DecimalField(max_digits=50, decimal_places=0, default=0)
     symbol = models.CharField(max_length=10)
     name = models.CharField(max_length=50)
-    holders = models.ManyToManyField("Holder", related_name="coin_holders")
+    # bumped by every trade, identifies the supply/reserve state for caches
+    version = models.PositiveBigIntegerField(default=0)
+
+    @property
+    def holders(self):
+        return self.holder_set.filter(balance__gt=0)
 
 
 class Holder(BaseModelMixin):
@@ -35,9 +43,195 @@ class Holder(BaseModelMixin):
     balance = models.DecimalField(max_digits=50, decimal_places=0, default=0)
     coin = models.ForeignKey(Coin, on_delete=models.CASCADE)
 
+    class Meta(BaseModelMixin.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coin", "user"], name="holder_coin_user_uniq"
+            ),
+        ]
+        indexes = [
+            # only current holders are ever listed; orderings match
+            # api.HOLDER_ORDERINGS for keyset pagination
+            models.Index(
+                fields=["coin", "-balance", "-id"],
+                condition=models.Q(balance__gt=0),
+                name="holder_coin_balance_idx",
+            ),
+            models.Index(
+                fields=["coin", "-created_at", "-id"],
+                condition=models.Q(balance__gt=0),
+                name="holder_coin_recent_idx",
+            ),
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                condition=models.Q(balance__gt=0),
+                name="holder_user_recent_idx",
+            ),
+        ]
+
 
 class Log(BaseModelMixin):
     user = models.ForeignKey(USER_MODEL, on_delete=models.CASCADE)
     coin = models.ForeignKey(Coin, on_delete=models.CASCADE)
     tx_type = models.CharField(max_length=100, choices=TX_TYPE_CHOICES)
     amount = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    # LZR paid for a buy or returned for a sale, in wei
+    reserve_amount = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    # execution price, LZR per coin
+    price = models.DecimalField(
+        max_digits=50, decimal_places=18, null=True, blank=True
+    )
+
+
+MINT = "MINT"
+BURN = "BURN"
+OPERATION_METHOD_CHOICES = [
+    (MINT, MINT),
+    (BURN, BURN),
+]
+
+PENDING = "PENDING"
+IN_FLIGHT = "IN_FLIGHT"
+DONE = "DONE"
+FAILED = "FAILED"
+OPERATION_STATUS_CHOICES = [
+    (PENDING, PENDING),
+    (IN_FLIGHT, IN_FLIGHT),
+    (DONE, DONE),
+    (FAILED, FAILED),
+]
+
+
+class CanisterOperation(BaseModelMixin):
+    """
+    Outbox row for a canister update call that must happen because of a trade.
+
+    Written in the same transaction as the trade's `Log`/`Holder` changes and
+    drained by `lzr_dfinityapi.outbox.OutboxDispatcher`.
+    """
+
+    idempotency_key = models.UUIDField(
+        default=uuid.uuid4, unique=True, editable=False
+    )
+    canister_id = models.CharField(max_length=300)
+    method = models.CharField(max_length=10, choices=OPERATION_METHOD_CHOICES)
+    amount = models.DecimalField(max_digits=50, decimal_places=0)
+    principal = models.CharField(max_length=100, blank=True)
+    # encrypted private key of the signer, empty for the oracle identity and
+    # once the operation is DONE or FAILED
+    signer_key = models.TextField(blank=True)
+    created_at_time = models.PositiveBigIntegerField()
+    log = models.ForeignKey(Log, null=True, blank=True, on_delete=models.SET_NULL)
+    status = models.CharField(
+        max_length=10, choices=OPERATION_STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    block_index = models.DecimalField(
+        max_digits=50, decimal_places=0, null=True, blank=True
+    )
+
+    class Meta(BaseModelMixin.Meta):
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="canister_op_status_next_idx",
+            ),
+        ]
+
+
+class LedgerTransaction(BaseModelMixin):
+    """A block of a coin canister's ledger, copied by `lzr_dfinityapi.indexer`."""
+
+    canister_id = models.CharField(max_length=300)
+    index = models.DecimalField(max_digits=50, decimal_places=0)
+    kind = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=50, decimal_places=0)
+    from_owner = models.CharField(max_length=100, blank=True, db_index=True)
+    to_owner = models.CharField(max_length=100, blank=True, db_index=True)
+    fee = models.DecimalField(max_digits=50, decimal_places=0, null=True, blank=True)
+    memo = models.BinaryField(null=True, blank=True)
+    # nanoseconds since the epoch, as reported by the ledger
+    created_at_time = models.PositiveBigIntegerField(null=True, blank=True)
+    timestamp = models.PositiveBigIntegerField()
+
+    class Meta:
+        ordering = ("canister_id", "index")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["canister_id", "index"], name="ledger_tx_canister_index_uniq"
+            ),
+        ]
+
+
+class LedgerSyncState(BaseModelMixin):
+    """Per-canister high-water mark of the ledger indexer."""
+
+    canister_id = models.CharField(max_length=300, unique=True)
+    next_index = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    log_length = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+
+
+CANDLE_1M = "1m"
+CANDLE_1H = "1h"
+CANDLE_1D = "1d"
+CANDLE_INTERVAL_CHOICES = [
+    (CANDLE_1M, CANDLE_1M),
+    (CANDLE_1H, CANDLE_1H),
+    (CANDLE_1D, CANDLE_1D),
+]
+
+
+class Candle(BaseModelMixin):
+    """OHLCV of a coin's trades over one interval, see `lzr_dfinityapi.candles`."""
+
+    coin = models.ForeignKey(Coin, on_delete=models.CASCADE)
+    interval = models.CharField(max_length=2, choices=CANDLE_INTERVAL_CHOICES)
+    start = models.DateTimeField()
+    open = models.DecimalField(max_digits=50, decimal_places=18)
+    high = models.DecimalField(max_digits=50, decimal_places=18)
+    low = models.DecimalField(max_digits=50, decimal_places=18)
+    close = models.DecimalField(max_digits=50, decimal_places=18)
+    # coins traded and LZR paid or returned, in wei
+    volume = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    reserve_volume = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    trades = models.PositiveIntegerField(default=0)
+
+    class Meta(BaseModelMixin.Meta):
+        ordering = ("start",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coin", "interval", "start"],
+                name="candle_coin_interval_uniq",
+            ),
+        ]
+
+
+class CoinStats(BaseModelMixin):
+    """
+    Denormalized listing figures of a coin, maintained by trades and
+    recomputed by `lzr_dfinityapi.coin_stats.refresh`.
+    """
+
+    coin = models.OneToOneField(
+        Coin, primary_key=True, related_name="stats", on_delete=models.CASCADE
+    )
+    holder_count = models.PositiveIntegerField(default=0)
+    # LZR per coin
+    spot_price = models.DecimalField(max_digits=50, decimal_places=18, default=0)
+    # LZR wei
+    market_cap = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+    volume_24h = models.DecimalField(max_digits=50, decimal_places=0, default=0)
+
+    class Meta(BaseModelMixin.Meta):
+        indexes = [
+            # orderings match api.COIN_ORDERINGS for keyset pagination
+            models.Index(fields=["-market_cap", "-coin"], name="coinstats_cap_idx"),
+            models.Index(
+                fields=["-holder_count", "-coin"], name="coinstats_holders_idx"
+            ),
+            models.Index(
+                fields=["-volume_24h", "-coin"], name="coinstats_volume_idx"
+            ),
+        ]
@@ -0,0 +1,325 @@
+import logging
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from functools import partial
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import config, registry
+from .aio import NotSubmitted
+from .config import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE_TIMEOUT,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_RETRY_DELAY,
+    OUTBOX_RETRY_DELAY,
+)
+from .key_management.encryption import (
+    decrypt_from_cipher_string,
+    encrypt_private_key_as_string,
+)
+from .models import (
+    BURN,
+    CanisterOperation,
+    DONE,
+    FAILED,
+    IN_FLIGHT,
+    MINT,
+    PENDING,
+)
+from .providers import (
+    CreatorTokenCanister,
+    TransferError,
+    unwrap_transfer_result,
+)
+
+logger = logging.getLogger(__name__)
+
+# ledger errors that may succeed when the same call is retried later
+RETRYABLE_TRANSFER_ERRORS = ("TemporarilyUnavailable",)
+
+
+def enqueue_mint(coin, amount: int, principal: str, log=None) -> CanisterOperation:
+    """Records a pending mint. Call inside the trade's transaction."""
+    return CanisterOperation.objects.create(
+        canister_id=coin.canister_id,
+        method=MINT,
+        amount=int(amount),
+        principal=str(principal),
+        created_at_time=time.time_ns(),
+        log=log,
+    )
+
+
+def enqueue_burn(coin, amount: int, identity, log=None) -> CanisterOperation:
+    """
+    Records a pending burn signed by `identity`. The key is stored encrypted so
+    that the dispatcher can sign on the user's behalf, and cleared once the
+    burn is done or has failed for good.
+    """
+    return CanisterOperation.objects.create(
+        canister_id=coin.canister_id,
+        method=BURN,
+        amount=int(amount),
+        signer_key=encrypt_private_key_as_string(identity.privkey),
+        created_at_time=time.time_ns(),
+        log=log,
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    delay = min(
+        OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0), OUTBOX_MAX_RETRY_DELAY
+    )
+    return timedelta(seconds=delay)
+
+
+def claim(limit: int = OUTBOX_BATCH_SIZE):
+    """
+    Moves up to `limit` due operations to IN_FLIGHT and returns them. Rows
+    locked by another dispatcher are skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = CanisterOperation.objects.filter(
+            status=PENDING, next_attempt_at__lte=now
+        ).order_by("next_attempt_at", "pk")
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        operations = list(queryset[:limit])
+        for operation in operations:
+            operation.status = IN_FLIGHT
+            operation.attempts += 1
+            # bulk_update() doesn't apply auto_now, the lease starts here
+            operation.updated_at = now
+        CanisterOperation.objects.bulk_update(
+            operations, ["status", "attempts", "updated_at"]
+        )
+    return operations
+
+
+def recover_expired_leases(lease_timeout: float = OUTBOX_LEASE_TIMEOUT) -> int:
+    """
+    Requeues burns left IN_FLIGHT by a crashed dispatcher; the ledger dedupes
+    them by `created_at_time`/memo. Mints are marked FAILED instead because
+    `mint` takes no memo and a resubmission could mint twice.
+    """
+    expired = CanisterOperation.objects.filter(
+        status=IN_FLIGHT,
+        updated_at__lt=timezone.now() - timedelta(seconds=lease_timeout),
+    )
+    requeued = expired.filter(method=BURN).update(
+        status=PENDING, next_attempt_at=timezone.now(), updated_at=timezone.now()
+    )
+    with transaction.atomic():
+        for operation in expired.filter(method=MINT).select_for_update():
+            _give_up(operation, "Dispatcher lease expired, mint outcome unknown")
+    return requeued
+
+
+def get_operation_canister(operation: CanisterOperation) -> CreatorTokenCanister:
+    if operation.signer_key:
+        identity = decrypt_from_cipher_string(operation.signer_key)
+    else:
+        identity = config.ORACLE_IDENTITY
+    return registry.get_canister(
+        CreatorTokenCanister,
+        identity,
+        operation.canister_id,
+        config.RPC_URL,
+        creator_coin="lzr_founder_coin_backend",
+    )
+
+
+def execute(operation: CanisterOperation) -> int:
+    """Performs the canister call of `operation` and returns its block index."""
+    coin_canister = get_operation_canister(operation)
+    if operation.method == MINT:
+        result = coin_canister.mint(int(operation.amount), operation.principal)
+    else:
+        result = coin_canister.burn(
+            int(operation.amount),
+            created_at_time=operation.created_at_time,
+            memo=operation.idempotency_key.bytes,
+        )
+    return unwrap_transfer_result(result)
+
+
+def submit(operation: CanisterOperation, poller):
+    """
+    Submits the canister call of `operation` through `poller` and returns the
+    future of its `TransferResult`.
+    """
+    coin_canister = get_operation_canister(operation)
+    if operation.method == MINT:
+        return coin_canister.submit_mint(
+            int(operation.amount), operation.principal, poller=poller
+        )
+    return coin_canister.submit_burn(
+        int(operation.amount),
+        created_at_time=operation.created_at_time,
+        memo=operation.idempotency_key.bytes,
+        poller=poller,
+    )
+
+
+def _block_index(future: Future) -> int:
+    return unwrap_transfer_result(future.result())
+
+
+def mark_done(operation: CanisterOperation, block_index: int):
+    operation.status = DONE
+    operation.block_index = block_index
+    operation.last_error = ""
+    operation.signer_key = ""
+    operation.save(
+        update_fields=[
+            "status",
+            "block_index",
+            "last_error",
+            "signer_key",
+            "updated_at",
+        ]
+    )
+
+
+def _give_up(operation: CanisterOperation, error: str):
+    """
+    Marks `operation` FAILED and reverts the trade it belongs to. A mint of
+    unknown outcome is reverted too: if it landed after all, reconciliation
+    reports the ledger balance the database no longer has.
+    """
+    # api enqueues through this module
+    from .api import revert_trade
+
+    with transaction.atomic():
+        if operation.log_id is not None:
+            revert_trade(operation.log)
+            operation.log = None
+        operation.status = FAILED
+        operation.last_error = error
+        # a failed operation is never signed again, don't keep the user's key
+        operation.signer_key = ""
+        operation.save(
+            update_fields=[
+                "status",
+                "last_error",
+                "signer_key",
+                "log",
+                "updated_at",
+            ]
+        )
+
+
+def mark_failed(operation: CanisterOperation, error: Exception, retryable: bool):
+    if not retryable or operation.attempts >= OUTBOX_MAX_ATTEMPTS:
+        _give_up(operation, str(error))
+        return
+    operation.status = PENDING
+    operation.last_error = str(error)
+    operation.next_attempt_at = timezone.now() + retry_delay(operation.attempts)
+    operation.save(
+        update_fields=["status", "next_attempt_at", "last_error", "updated_at"]
+    )
+
+
+def complete(operation: CanisterOperation, call):
+    """Runs `call()` for `operation` and records the outcome."""
+    try:
+        block_index = call()
+    except TransferError as e:
+        if e.variant == "Duplicate":
+            # an earlier attempt already landed on the ledger
+            mark_done(operation, e.details["duplicate_of"])
+        else:
+            mark_failed(operation, e, e.variant in RETRYABLE_TRANSFER_ERRORS)
+    except NotSubmitted as e:
+        logger.warning("Canister operation %s not submitted: %s", operation.pk, e)
+        mark_failed(operation, e, retryable=True)
+    except Exception as e:  # noqa: B902
+        logger.warning("Canister operation %s failed: %s", operation.pk, e)
+        # the call may have executed, e.g. pipeline.UpdateExecuted or
+        # UpdateOutcomeUnknown: only burns are deduplicated by the ledger, a
+        # mint of unknown outcome is not resubmitted, see `_give_up`
+        mark_failed(operation, e, retryable=operation.method == BURN)
+    else:
+        mark_done(operation, block_index)
+    return operation
+
+
+def dispatch(operation: CanisterOperation) -> CanisterOperation:
+    return complete(operation, lambda: execute(operation))
+
+
+def dispatch_pending(
+    limit: int = OUTBOX_BATCH_SIZE, batcher=None, poller=None
+) -> int:
+    """
+    Claims and executes one batch of due operations, returns the batch size.
+
+    With a `batching.CanisterBatcher` the canister calls of the batch run
+    concurrently (bounded per canister); with a `pipeline.StatusPoller` they
+    are all submitted first and awaited together. Outcomes are still recorded
+    from the calling thread.
+    """
+    operations = claim(limit)
+    if poller is not None:
+        futures = []
+        for operation in operations:
+            try:
+                future = submit(operation, poller)
+            except Exception as e:  # noqa: B902
+                future = Future()
+                future.set_exception(e)
+            futures.append((operation, future))
+        for operation, future in futures:
+            complete(operation, partial(_block_index, future))
+        return len(operations)
+
+    if batcher is None:
+        for operation in operations:
+            dispatch(operation)
+        return len(operations)
+
+    futures = [
+        (
+            operation,
+            batcher.submit(operation.canister_id, partial(execute, operation)),
+        )
+        for operation in operations
+    ]
+    for operation, future in futures:
+        complete(operation, future.result)
+    return len(operations)
+
+
+class OutboxDispatcher:
+    """Background loop draining `CanisterOperation` rows."""
+
+    def __init__(
+        self,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = 1.0,
+        batcher=None,
+        poller=None,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.batcher = batcher
+        self.poller = poller
+        self._running = False
+
+    def run_once(self) -> int:
+        recover_expired_leases()
+        return dispatch_pending(self.batch_size, self.batcher, self.poller)
+
+    def run(self):
+        self._running = True
+        while self._running:
+            if not self.run_once():
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+from django.db.models import Q
+
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def encode_cursor(values) -> str:
+    payload = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _after(fields, values) -> Q:
+    """Rows strictly after `values` in descending `fields` order."""
+    condition = Q()
+    for i, field in enumerate(fields):
+        equal = Q(**dict(zip(fields[:i], values[:i])))
+        condition |= equal & Q(**{f"{field}__lt": values[i]})
+    # redundant, but the OR above gives the planner no range to start an
+    # index scan from; this bound does, so deep pages don't scan from the top
+    return Q(**{f"{fields[0]}__lte": values[0]}) & condition
+
+
+def keyset_page(queryset, fields, cursor: str = None, limit: int = 50) -> Page:
+    """
+    One page of `queryset` ordered by `fields` descending, continuing after
+    `cursor`. Unlike OFFSET the cost does not grow with the page number as long
+    as an index matches the ordering; the last field must be unique.
+    """
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    if cursor:
+        queryset = queryset.filter(
+            _after(fields, decode_cursor(cursor, len(fields)))
+        )
+
+    items = list(queryset.order_by(*(f"-{field}" for field in fields))[: limit + 1])
+    if len(items) <= limit:
+        return Page(items, None)
+
+    items = items[:limit]
+    last = items[-1]
+    return Page(items, encode_cursor(getattr(last, field) for field in fields))
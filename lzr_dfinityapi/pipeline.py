@@ -0,0 +1,227 @@
+"""
+Split-phase update calls: ingress messages are submitted back to back and
+their replies collected later through futures.
+
+    futures = [
+        coin_canister.submit_mint(amount, principal) for amount, principal in mints
+    ]
+    results = [future.result() for future in futures]
+
+A `StatusPoller` resolves the futures from one background thread. Every
+PIPELINE_POLL_INTERVAL it reads the status of all pending requests. The
+requests are grouped by agent and canister into `read_state` calls of up to
+PIPELINE_MAX_PATHS request ids, and the groups are read concurrently. The
+grouping is by agent because only the sender of a request may read its
+status.
+
+A future resolves to the decoded reply, as `update_raw` returns it. It fails
+with `UpdateRejected` when the canister rejects the call, with
+`UpdateExecuted` when the call ran but its reply has already been pruned,
+and with `UpdateOutcomeUnknown` when there is still no answer after
+PIPELINE_TIMEOUT. Only a rejected call certainly did not execute.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_all
+
+from ic.candid import decode
+
+from . import metrics
+from .config import (
+    PIPELINE_MAX_PATHS,
+    PIPELINE_POLL_INTERVAL,
+    PIPELINE_POLL_WORKERS,
+    PIPELINE_TIMEOUT,
+)
+
+
+class UpdateRejected(Exception):
+    """An update call rejected by the canister or the replica."""
+
+
+class UpdateExecuted(Exception):
+    """An update call that executed, but whose reply is no longer available."""
+
+
+class UpdateOutcomeUnknown(TimeoutError):
+    """An update call without a final status in time; it may still execute."""
+
+
+class _PendingUpdate:
+    __slots__ = ("req_id", "return_type", "unwrap", "future", "submitted_at")
+
+    def __init__(self, req_id: bytes, return_type, unwrap: bool):
+        self.req_id = req_id
+        self.return_type = return_type
+        self.unwrap = unwrap
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class StatusPoller:
+    """Resolves the futures of submitted update calls, see the module docstring."""
+
+    def __init__(
+        self,
+        interval: float = PIPELINE_POLL_INTERVAL,
+        max_paths: int = PIPELINE_MAX_PATHS,
+        timeout: float = PIPELINE_TIMEOUT,
+        max_workers: int = PIPELINE_POLL_WORKERS,
+    ):
+        self.interval = interval
+        self.max_paths = max_paths
+        self.timeout = timeout
+        self.read_states = 0
+
+        # (agent, canister_id) -> {req_id: _PendingUpdate}
+        self._groups = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="status-poller"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="status-poller", daemon=True
+        )
+        self._thread.start()
+
+    def track(
+        self, agent, canister_id: str, req_id: bytes, return_type=None, unwrap=False
+    ) -> Future:
+        """
+        Future of an update call `agent` already submitted to `canister_id`.
+        With `unwrap` it resolves to the first return value only, as the
+        providers' `mint` and `burn` return it.
+        """
+        pending = _PendingUpdate(req_id, return_type, unwrap)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Status poller is closed")
+            idle = not self._groups
+            self._groups.setdefault((agent, str(canister_id)), {})[req_id] = pending
+            if idle:
+                self._cond.notify_all()
+        return pending.future
+
+    def submit(
+        self, agent, canister_id: str, method_name: str, arg: bytes, **kwargs
+    ) -> Future:
+        """Submits an update call and returns its future, see `track`."""
+        req_id = agent.submit_update(canister_id, method_name, arg)
+        return self.track(agent, canister_id, req_id, **kwargs)
+
+    async def submit_async(
+        self, agent, canister_id: str, method_name: str, arg: bytes, **kwargs
+    ) -> asyncio.Future:
+        """`submit` for event loops; the returned future can be awaited."""
+        req_id = await agent.submit_update_async(canister_id, method_name, arg)
+        return asyncio.wrap_future(self.track(agent, canister_id, req_id, **kwargs))
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(group) for group in self._groups.values())
+
+    def close(self):
+        """Waits for every tracked call to resolve, then stops the poller."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._groups and not self._closed:
+                    self._cond.wait()
+                if not self._groups:
+                    return
+                # give the calls submitted with this one a round to land
+                self._cond.wait(self.interval)
+                chunks = []
+                for (agent, canister_id), group in self._groups.items():
+                    updates = list(group.values())
+                    for start in range(0, len(updates), self.max_paths):
+                        chunk = updates[start : start + self.max_paths]  # noqa: E203
+                        chunks.append((agent, canister_id, chunk))
+                self.read_states += len(chunks)
+
+            wait_all([self._executor.submit(self._poll, *chunk) for chunk in chunks])
+
+    def _poll(self, agent, canister_id: str, updates: list):
+        try:
+            statuses = agent.request_statuses_raw(
+                canister_id, [pending.req_id for pending in updates]
+            )
+            error = None
+        except Exception as e:  # noqa: B902
+            # transient read failures are retried on the next round
+            statuses, error = {}, e
+
+        now = time.monotonic()
+        for pending in updates:
+            status, value = statuses.get(pending.req_id, (None, None))
+            if status == "replied":
+                self._resolve(agent, canister_id, pending, reply=value)
+            elif status == "rejected":
+                self._resolve(
+                    agent,
+                    canister_id,
+                    pending,
+                    error=UpdateRejected("Rejected: " + value.decode()),
+                )
+            elif status == "done":
+                self._resolve(
+                    agent,
+                    canister_id,
+                    pending,
+                    error=UpdateExecuted("Reply of the call is no longer available"),
+                )
+            elif now - pending.submitted_at >= self.timeout:
+                reason = f"current status: {status}"
+                if error is not None:
+                    reason = f"last error: {error}"
+                self._resolve(
+                    agent,
+                    canister_id,
+                    pending,
+                    error=UpdateOutcomeUnknown(f"Timeout to poll result, {reason}"),
+                )
+
+    def _resolve(self, agent, canister_id, pending, reply=None, error=None):
+        with self._cond:
+            group = self._groups[(agent, canister_id)]
+            del group[pending.req_id]
+            if not group:
+                del self._groups[(agent, canister_id)]
+
+        metrics.observe(
+            metrics.PHASE_SECONDS,
+            time.monotonic() - pending.submitted_at,
+            phase="ic_poll",
+        )
+        if error is not None:
+            pending.future.set_exception(error)
+            return
+        try:
+            result = decode(reply, pending.return_type)
+        except Exception as e:  # noqa: B902
+            pending.future.set_exception(e)
+        else:
+            pending.future.set_result(result[0] if pending.unwrap else result)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller() -> StatusPoller:
+    """The process-wide `StatusPoller`, started on first use."""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = StatusPoller()
+    return _poller
@@ -4,30 +4,76 @@ from typing import Type
 from ic.agent import Agent
 from ic.identity import Identity
 from ic.canister import Canister
-from ic.candid import Types
-from ic.candid import encode
+from ic.candid import RecClass
 
-from .config import CANDID_FOLDER
+from . import config, encoders, metrics, pipeline
+from .aio import AsyncAgent
+from .interfaces import CandidInterface, InterfaceCanister, interface_cache, read_did
+from .metadata_cache import metadata_cache
+
+
+class TransferError(Exception):
+    """An `Err` branch of a ledger `TransferResult`."""
+
+    def __init__(self, variant: str, details=None):
+        self.variant = variant
+        self.details = details
+        super().__init__(f"{variant}: {details}" if details else variant)
+
+
+def unwrap_transfer_result(result) -> int:
+    """Returns the block index of a decoded `TransferResult` or raises."""
+    value = result["value"] if "value" in result else result
+    if "Ok" in value:
+        return value["Ok"]
+    variant, details = next(iter(value["Err"].items()))
+    metrics.increment(metrics.TRANSFER_ERRORS_TOTAL, variant=variant)
+    raise TransferError(variant, details)
+
+
+def query_reply(result):
+    """The decoded value of a query reply; ic-py returns rejections as text."""
+    if isinstance(result, str):
+        raise ValueError(f"Query rejected: {result}")
+    return result[0]["value"]
+
+
+def _resolve(candid_type):
+    while isinstance(candid_type, RecClass):
+        candid_type = candid_type._type
+    return candid_type
 
 
 class CanisterProvider:
     def __init__(self, agent: Agent):
         self._agent = agent
 
-    def load_did(self, candid_name, abi_folder=CANDID_FOLDER):
-        abi_path = os.path.join(abi_folder, f"{candid_name}.did")
-        return open(abi_path, "r").read()
+    def load_did(self, candid_name, abi_folder=None):
+        abi_path = os.path.join(
+            abi_folder or config.CANDID_FOLDER, f"{candid_name}.did"
+        )
+        return read_did(abi_path)
+
+    def load_interface(self, candid_name, abi_folder=None) -> CandidInterface:
+        return interface_cache.get(candid_name, abi_folder)
 
     def get_canister(self, canister_id, candid_name) -> Type[Canister]:
-        candid = self.load_did(candid_name)
-        return Canister(agent=self._agent, canister_id=canister_id, candid=candid)
+        interface = self.load_interface(candid_name)
+        return InterfaceCanister(
+            agent=self._agent, canister_id=canister_id, interface=interface
+        )
 
 
 class BaseCanister(CanisterProvider):
     def __init__(
-        self, candid_name: str, canister_id: str, identity: Identity, client=None
+        self,
+        candid_name: str,
+        canister_id: str,
+        identity: Identity,
+        client=None,
+        agent: Agent = None,
     ):
-        self.agent = Agent(identity=identity, client=client)
+        self.agent = agent or AsyncAgent(identity=identity, client=client)
         super().__init__(self.agent)
         self.canister_id = canister_id
         self.canister = self.get_canister(canister_id, candid_name)
@@ -40,50 +86,133 @@ class TokenCanister(BaseCanister):
         canister_id: str,
         client=None,
         candid_name="token_ledger",
+        agent: Agent = None,
     ):
         super().__init__(
             identity=identity,
             candid_name=candid_name,
             canister_id=canister_id,
             client=client,
+            agent=agent,
+        )
+
+    def query_metadata(self, field: str):
+        """Uncached metadata query, see `metadata_cache`. Raises if rejected."""
+        res = self.agent.query_raw(
+            self.canister_id,
+            field,
+            encoders.NO_ARGS.encode(),
+            getattr(self.canister, field).rets,
         )
+        return query_reply(res)
+
+    async def query_metadata_async(self, field: str):
+        res = await self.agent.query_raw_async(
+            self.canister_id,
+            field,
+            encoders.NO_ARGS.encode(),
+            getattr(self.canister, field).rets,
+        )
+        return query_reply(res)
+
+    def fetch_metadata(self, fields=None) -> dict:
+        """Every cached ICRC-1 metadata field, querying the missing ones at once."""
+        return metadata_cache.fetch(self, fields)
+
+    async def fetch_metadata_async(self, fields=None) -> dict:
+        return await metadata_cache.fetch_async(self, fields)
+
+    def invalidate_metadata(self, fields=None):
+        metadata_cache.invalidate(self.canister_id, fields)
 
     def icrc1_symbol(self):
-        res = self.canister.icrc1_symbol()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_symbol")
 
     def icrc1_metadata(self):
-        res = self.canister.icrc1_metadata()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_metadata")
 
     def icrc1_decimals(self):
-        res = self.canister.icrc1_decimals()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_decimals")
 
     def icrc1_fee(self):
-        res = self.canister.icrc1_fee()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_fee")
 
     def icrc1_minting_account(self):
-        res = self.canister.icrc1_minting_account()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_minting_account")
 
     def icrc1_name(self):
-        res = self.canister.icrc1_name()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_name")
 
-    def icrc1_balance_of(self, principal: str):
-        account = {"owner": principal, "subaccount": None}
-        res = self.canister.icrc1_balance_of(account)
-        return res[0]
+    def icrc1_balance_of(self, principal: str) -> int:
+        res = self.agent.query_raw(
+            self.canister_id,
+            "icrc1_balance_of",
+            encoders.ACCOUNT_ARGS.encode(encoders.account(principal)),
+            self.canister.icrc1_balance_of.rets,
+        )
+        return query_reply(res)
+
+    async def icrc1_balance_of_async(self, principal: str) -> int:
+        res = await self.agent.query_raw_async(
+            self.canister_id,
+            "icrc1_balance_of",
+            encoders.ACCOUNT_ARGS.encode(encoders.account(principal)),
+            self.canister.icrc1_balance_of.rets,
+        )
+        return query_reply(res)
 
     def icrc1_supported_standards(self):
-        res = self.canister.icrc1_supported_standards()
-        return res[0]
+        return metadata_cache.get(self, "icrc1_supported_standards")
 
-    def icrc1_total_supply(self):
-        res = self.canister.icrc1_total_supply()
-        return res[0]
+    def icrc1_total_supply(self) -> int:
+        res = self.agent.query_raw(
+            self.canister_id,
+            "icrc1_total_supply",
+            encoders.NO_ARGS.encode(),
+            self.canister.icrc1_total_supply.rets,
+        )
+        return query_reply(res)
+
+    async def icrc1_total_supply_async(self) -> int:
+        res = await self.agent.query_raw_async(
+            self.canister_id,
+            "icrc1_total_supply",
+            encoders.NO_ARGS.encode(),
+            self.canister.icrc1_total_supply.rets,
+        )
+        return query_reply(res)
+
+    def get_transactions(self, start: int, length: int):
+        """
+        A `GetTransactionsResponse` for blocks `[start, start + length)`. Blocks
+        the ledger has moved to archives come back as `archived_transactions`
+        ranges, see `get_archived_transactions`.
+        """
+        res = self.agent.query_raw(
+            self.canister_id,
+            "get_transactions",
+            encoders.GET_TRANSACTIONS_ARGS.encode(
+                {"start": start, "length": length}
+            ),
+            self.canister.get_transactions.rets,
+        )
+        return query_reply(res)
+
+    def get_archived_transactions(self, callback, start: int, length: int):
+        """Transactions of an archived range, queried through its `callback`."""
+        archive_id, method_name = callback
+        response_type = _resolve(self.canister.get_transactions.rets[0])
+        archived_type = _resolve(response_type._fields["archived_transactions"])
+        callback_type = _resolve(_resolve(archived_type._type)._fields["callback"])
+        res = self.agent.query_raw(
+            archive_id.to_str(),
+            method_name,
+            encoders.GET_TRANSACTIONS_ARGS.encode(
+                {"start": start, "length": length}
+            ),
+            callback_type.retTypes,
+        )
+        return query_reply(res)["transactions"]
 
     def icrc2_allowance(self, spender_principal: int, principal: str):
         account = {"owner": principal, "subaccount": None}
@@ -91,9 +220,23 @@ class TokenCanister(BaseCanister):
         res = self.canister.icrc2_allowance(spender=spender, account=account)
         return res[0]
 
-    def icrc1_transfer(self, amount: int, principal: str):
-        to = {"owner": principal, "subaccount": None}
-        res = self.canister.icrc1_transfer(amount=amount, to=to)
+    def icrc1_transfer(
+        self,
+        amount: int,
+        principal: str,
+        fee: int = None,
+        created_at_time: int = None,
+        memo: bytes = None,
+    ):
+        args = encoders.transfer_args(amount, principal, fee, created_at_time, memo)
+        with metrics.span("candid_encode"):
+            arg = encoders.TRANSFER_ARGS.encode(args)
+        res = self.agent.update_raw(
+            self.canister_id,
+            "icrc1_transfer",
+            arg,
+            self.canister.icrc1_transfer.rets,
+        )
         return res[0]
 
     def icrc2_approve(self, amount: int, principal: str):
@@ -102,7 +245,9 @@ class TokenCanister(BaseCanister):
         print("Helloooo:::: ", res)
         # return res[0]
 
-    def icrc2_transfer_from(self, amount: int, from_principal: str, to_principal: str):
+    def icrc2_transfer_from(
+        self, amount: int, from_principal: str, to_principal: str
+    ):
         from_account = {"owner": from_principal, "subaccount": None}
         to_account = {"owner": to_principal, "subaccount": None}
         args = {"amount": amount, "from": from_account, "to": to_account}
@@ -113,38 +258,129 @@ class TokenCanister(BaseCanister):
 
 class CreatorTokenCanister(TokenCanister):
     def __init__(
-        self, identity: Identity, canister_id: str, creator_coin: str, client=None
+        self,
+        identity: Identity,
+        canister_id: str,
+        creator_coin: str,
+        client=None,
+        agent: Agent = None,
     ):
-        super().__init__(identity, canister_id, client, creator_coin)
+        super().__init__(identity, canister_id, client, creator_coin, agent)
 
     def mint(self, amount: int, principal: str):
-        params = [
-            {'type': Types.Principal, 'value': principal},
-            {'type': Types.Nat, 'value': amount}
-        ]
+        method_name = "mint"
+        with metrics.span("candid_encode"):
+            arg = encoders.MINT_ARGS.encode(principal, amount)
+        res = self.agent.update_raw(
+            self.canister_id, method_name, arg, self.canister.mint.rets
+        )
+        return res[0]
 
+    async def mint_async(self, amount: int, principal: str):
         method_name = "mint"
-        res = self.agent.update_raw(self.canister_id, method_name, encode(params))
+        with metrics.span("candid_encode"):
+            arg = encoders.MINT_ARGS.encode(principal, amount)
+        res = await self.agent.update_raw_async(
+            self.canister_id, method_name, arg, self.canister.mint.rets
+        )
         return res[0]
 
-    def burn(self, amount: int):
-        types = Types.Record(
-            {
-                "amount": Types.Nat,
-                "created_at_time": Types.Null,
-                "from_subaccount": Types.Null,
-                "meme": Types.Null,
-            }
-        )
-        vals = {
-            "amount": amount,
-            "created_at_time": None,
-            "from_subaccount": None,
-            "meme": None,
-        }
-        params = [{"type": types, "value": vals}]
+    def burn(self, amount: int, created_at_time: int = None, memo: bytes = None):
+        """
+        `created_at_time` (ns) and `memo` make the burn idempotent: the ledger
+        answers a resubmission with a `Duplicate` error instead of burning twice.
+        """
+        method_name = "burn"
+        with metrics.span("candid_encode"):
+            arg = encoders.BURN_ARGS.encode(
+                encoders.burn_args(amount, created_at_time, memo)
+            )
+        res = self.agent.update_raw(
+            self.canister_id, method_name, arg, self.canister.burn.rets
+        )
 
+        return res[0]
+
+    async def burn_async(
+        self, amount: int, created_at_time: int = None, memo: bytes = None
+    ):
         method_name = "burn"
-        res = self.agent.update_raw(self.canister_id, method_name, encode(params))
+        with metrics.span("candid_encode"):
+            arg = encoders.BURN_ARGS.encode(
+                encoders.burn_args(amount, created_at_time, memo)
+            )
+        res = await self.agent.update_raw_async(
+            self.canister_id, method_name, arg, self.canister.burn.rets
+        )
 
         return res[0]
+
+    def submit_mint(self, amount: int, principal: str, poller=None):
+        """
+        Submits a mint without waiting for consensus and returns a future of
+        what `mint` returns, resolved by `poller` or the shared
+        `pipeline.StatusPoller`.
+        """
+        with metrics.span("candid_encode"):
+            arg = encoders.MINT_ARGS.encode(principal, amount)
+        return (poller or pipeline.get_poller()).submit(
+            self.agent,
+            self.canister_id,
+            "mint",
+            arg,
+            return_type=self.canister.mint.rets,
+            unwrap=True,
+        )
+
+    async def submit_mint_async(self, amount: int, principal: str, poller=None):
+        with metrics.span("candid_encode"):
+            arg = encoders.MINT_ARGS.encode(principal, amount)
+        return await (poller or pipeline.get_poller()).submit_async(
+            self.agent,
+            self.canister_id,
+            "mint",
+            arg,
+            return_type=self.canister.mint.rets,
+            unwrap=True,
+        )
+
+    def submit_burn(
+        self,
+        amount: int,
+        created_at_time: int = None,
+        memo: bytes = None,
+        poller=None,
+    ):
+        """`burn` counterpart of `submit_mint`."""
+        with metrics.span("candid_encode"):
+            arg = encoders.BURN_ARGS.encode(
+                encoders.burn_args(amount, created_at_time, memo)
+            )
+        return (poller or pipeline.get_poller()).submit(
+            self.agent,
+            self.canister_id,
+            "burn",
+            arg,
+            return_type=self.canister.burn.rets,
+            unwrap=True,
+        )
+
+    async def submit_burn_async(
+        self,
+        amount: int,
+        created_at_time: int = None,
+        memo: bytes = None,
+        poller=None,
+    ):
+        with metrics.span("candid_encode"):
+            arg = encoders.BURN_ARGS.encode(
+                encoders.burn_args(amount, created_at_time, memo)
+            )
+        return await (poller or pipeline.get_poller()).submit_async(
+            self.agent,
+            self.canister_id,
+            "burn",
+            arg,
+            return_type=self.canister.burn.rets,
+            unwrap=True,
+        )
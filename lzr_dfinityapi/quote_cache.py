@@ -0,0 +1,232 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .config import (
+    QUOTE_AMOUNT_BUCKET_WEI,
+    QUOTE_CACHE_ALIAS,
+    QUOTE_CACHE_BACKEND,
+    QUOTE_CACHE_SIZE,
+    QUOTE_CACHE_TTL,
+)
+from .curve import ContinuosToken
+from .models import Coin
+
+_MISSING = object()
+
+
+class LRUBackend:
+    """
+    In-process, size-bounded cache with per-entry expiry; a `ttl` of None
+    never expires.
+    """
+
+    def __init__(self, maxsize: int = QUOTE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def _set(self, key, value, ttl):
+        expires_at = float("inf") if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key, value, ttl: float) -> bool:
+        """Sets `key` unless it holds an unexpired value; returns whether it did."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Adapter for a Django cache alias, shared between processes."""
+
+    def __init__(self, alias: str = QUOTE_CACHE_ALIAS):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    def get_many(self, keys) -> dict:
+        return self.cache.get_many(keys)
+
+    def set(self, key, value, ttl: float):
+        self.cache.set(key, value, ttl)
+
+    def add(self, key, value, ttl: float) -> bool:
+        return self.cache.add(key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+BACKENDS = {
+    "locmem": LRUBackend,
+    "django": DjangoCacheBackend,
+}
+
+
+class QuoteCache:
+    """
+    Read-through cache of bonding-curve quotes.
+
+    Quotes are keyed on (coin_id, coin version, amount bucket), so a cached
+    quote is never wrong for its version. The current version and curve state
+    of a coin are cached too, stamped with the coin's generation token.
+    `invalidate`, which trades call once their transaction commits, replaces
+    the token, and a state stamped with an older token is a miss. A reader
+    takes the token before it reads the coin row, so a state it read before
+    a trade committed can't outlive that trade's invalidation.
+
+    Workers only see each other's invalidations through a shared backend,
+    the "django" one with QUOTE_CACHE_ALIAS pointing at e.g. Redis.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttl: float = QUOTE_CACHE_TTL,
+        amount_bucket: int = QUOTE_AMOUNT_BUCKET_WEI,
+    ):
+        self.backend = backend or LRUBackend()
+        self.ttl = ttl
+        self.amount_bucket = max(amount_bucket, 1)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        return cls(BACKENDS[QUOTE_CACHE_BACKEND]())
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def token_key(coin_id) -> str:
+        return f"lzr:quote:token:{coin_id}"
+
+    @staticmethod
+    def state_key(coin_id) -> str:
+        return f"lzr:quote:state:{coin_id}"
+
+    @staticmethod
+    def quote_key(coin_id, version, side, bucket) -> str:
+        return f"lzr:quote:{coin_id}:{version}:{side}:{bucket}"
+
+    def coin_state(self, coin_id):
+        """Returns `(version, total_supply, reserve_balance)` of a coin."""
+        token_key, state_key = self.token_key(coin_id), self.state_key(coin_id)
+        cached = self.backend.get_many([token_key, state_key])
+        token, state = cached.get(token_key), cached.get(state_key)
+        if token is None:
+            self.backend.add(token_key, uuid.uuid4().hex, None)
+            token = self.backend.get(token_key)
+        elif state is not None and state[0] == token:
+            return state[1:]
+
+        version, total_supply, reserve_balance = Coin.objects.values_list(
+            "version", "total_supply", "reserve_balance"
+        ).get(pk=coin_id)
+        state = (version, int(total_supply), int(reserve_balance))
+        if token is not None:
+            self.backend.set(state_key, (token, *state), self.ttl)
+        return state
+
+    def _quote(self, coin_id, side, amount_wei, calculate):
+        version, total_supply, reserve_balance = self.coin_state(coin_id)
+        bucket = int(amount_wei) // self.amount_bucket
+        key = self.quote_key(coin_id, version, side, bucket)
+        quote = self.backend.get(key)
+        # one hit or miss per quote, whether or not the state was cached
+        self._count(quote is not None)
+        if quote is None:
+            quote = calculate(
+                total_supply, reserve_balance, bucket * self.amount_bucket
+            )
+            self.backend.set(key, quote, self.ttl)
+        return quote
+
+    def purchase_quote(self, coin_id, lzr_amount_wei: int) -> int:
+        """
+        Coins minted for `lzr_amount_wei`, rounded down to the amount bucket.
+        """
+        return self._quote(
+            coin_id, "buy", lzr_amount_wei, ContinuosToken.calc_purchase_return_wei
+        )
+
+    def sale_quote(self, coin_id, coin_amount_wei: int) -> int:
+        """LZR returned for `coin_amount_wei`, rounded down to the amount bucket."""
+        return self._quote(
+            coin_id, "sell", coin_amount_wei, ContinuosToken.calc_sale_return_wei
+        )
+
+    def invalidate(self, coin_id):
+        with self._lock:
+            self.invalidations += 1
+        self.backend.set(self.token_key(coin_id), uuid.uuid4().hex, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+quote_cache = QuoteCache.from_config()
@@ -0,0 +1,89 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .curve import WEI, ContinuosToken
+
+Quotes = namedtuple(
+    "Quotes",
+    [
+        "amount",
+        "total_supply",
+        "reserve_balance",
+        "purchase_return",
+        "sale_return",
+        "spot_price",
+        "purchase_price_impact",
+        "sale_price_impact",
+    ],
+)
+
+
+def _purchase_return(x, rb, p):
+    r = ContinuosToken.r
+    # polynomial branch for an empty supply, see ContinuosToken.calc_purchase_return
+    polynomial = (
+        ContinuosToken.polynomial_factor * p + x**ContinuosToken.increment_rate
+    ) ** r - x
+    # same operation order as the scalar functions so results agree to the ulp
+    bancor = ((p + rb) / rb) ** r * x - x
+    result = np.where(x == 0, polynomial, bancor)
+    invalid = (x != 0) & ((x < 1) | (rb < 1))
+    result = np.where(p == 0, 0.0, result)
+    return np.where(invalid, np.nan, result)
+
+
+def _sale_return(x, rb, p):
+    result = rb * (1 - (1 - p / x) ** (1 / ContinuosToken.r))
+    result = np.where(p == x, rb, result)
+    result = np.where(p == 0, 0.0, result)
+    invalid = (x < 1) | (rb < 1) | (p > x)
+    return np.where(invalid, np.nan, result)
+
+
+def _spot_price(x, rb):
+    """Marginal price in reserve tokens per coin."""
+    bancor = rb / (ContinuosToken.r * x)
+    # d(reserve)/d(supply) of the polynomial curve, m * x ^ n
+    polynomial = ContinuosToken.m * x ** (ContinuosToken.increment_rate - 1)
+    return np.where(x == 0, polynomial, bancor)
+
+
+def quote_curve(total_supply, reserve_balance, amounts) -> Quotes:
+    """
+    Evaluates the bonding curve for every point of the broadcast of
+    `total_supply`, `reserve_balance` and `amounts` (all in ether) in one pass.
+
+    `amount` is spent on a purchase and sold on a sale. Points outside of the
+    domain of the scalar `ContinuosToken` functions, where those raise
+    `ValueError`, are NaN.
+    """
+    x, rb, p = np.broadcast_arrays(
+        np.asarray(total_supply, dtype=np.float64),
+        np.asarray(reserve_balance, dtype=np.float64),
+        np.asarray(amounts, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        purchase_return = _purchase_return(x, rb, p)
+        sale_return = _sale_return(x, rb, p)
+        spot_price = _spot_price(x, rb)
+        purchase_price_impact = (p / purchase_return) / spot_price - 1
+        sale_price_impact = 1 - (sale_return / p) / spot_price
+
+    return Quotes(
+        p,
+        x,
+        rb,
+        purchase_return,
+        sale_return,
+        spot_price,
+        purchase_price_impact,
+        sale_price_impact,
+    )
+
+
+def quote_coin(coin, amounts) -> Quotes:
+    """`quote_curve` for the current state of a `Coin`, amounts in ether."""
+    return quote_curve(
+        int(coin.total_supply) / WEI, int(coin.reserve_balance) / WEI, amounts
+    )
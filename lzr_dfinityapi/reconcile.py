@@ -0,0 +1,215 @@
+"""
+Compares `Coin.total_supply` and `Holder.balance` with what the coin canisters
+report and writes every difference to a JSON lines drift report.
+
+Query calls fan out on one event loop, bounded globally and per canister
+(`aio.canister_limit`). Holders are read and diffed in id-ordered chunks, and
+finished coins are recorded in a checkpoint file so an interrupted run resumes
+without repeating them.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+
+from . import config, registry
+from .aio import canister_limit
+from .config import (
+    CANISTER_CONCURRENCY_LIMIT,
+    RECONCILE_CHUNK_SIZE,
+    RECONCILE_COIN_CONCURRENCY,
+    RECONCILE_CONCURRENCY,
+)
+from .models import Coin, Holder
+from .providers import CreatorTokenCanister
+
+logger = logging.getLogger(__name__)
+
+SUPPLY = "supply"
+BALANCE = "balance"
+
+Drift = namedtuple(
+    "Drift",
+    [
+        "kind",
+        "coin_id",
+        "canister_id",
+        "holder_id",
+        "principal",
+        "db_value",
+        "chain_value",
+        "error",
+    ],
+    defaults=(None, None, None, None, ""),
+)
+
+
+def get_query_canister(canister_id: str) -> CreatorTokenCanister:
+    return registry.get_canister(
+        CreatorTokenCanister,
+        config.ORACLE_IDENTITY,
+        canister_id,
+        config.RPC_URL,
+        creator_coin="lzr_founder_coin_backend",
+    )
+
+
+class Checkpoint:
+    """Ids of reconciled coins, persisted as JSON after every coin."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = set(json.load(f)["done"])
+
+    def add(self, coin_id: int):
+        self.done.add(coin_id)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _holder_chunk(coin_id: int, after_id: int, size: int):
+    holders = (
+        Holder.objects.filter(coin=coin_id, id__gt=after_id)
+        .select_related("user")
+        .order_by("id")[:size]
+    )
+    return [
+        (holder.pk, getattr(holder.user, "account_principal", None), holder.balance)
+        for holder in holders
+    ]
+
+
+class Reconciler:
+    def __init__(
+        self,
+        concurrency: int = RECONCILE_CONCURRENCY,
+        per_canister: int = CANISTER_CONCURRENCY_LIMIT,
+        chunk_size: int = RECONCILE_CHUNK_SIZE,
+        coin_concurrency: int = RECONCILE_COIN_CONCURRENCY,
+    ):
+        self.concurrency = concurrency
+        self.per_canister = per_canister
+        self.chunk_size = chunk_size
+        self.coin_concurrency = coin_concurrency
+
+    async def _query(self, canister_id: str, call, *args):
+        async with self._limit, canister_limit(canister_id, self.per_canister):
+            return await call(*args)
+
+    async def reconcile_coin(self, coin_id: int, canister_id: str, total_supply):
+        """Returns the `Drift`s of one coin."""
+        canister = get_query_canister(canister_id)
+        drifts = []
+
+        def drift(kind, **fields):
+            drifts.append(Drift(kind, coin_id, canister_id, **fields))
+
+        try:
+            supply = await self._query(
+                canister_id, canister.icrc1_total_supply_async
+            )
+        except Exception as e:  # noqa: B902
+            drift(SUPPLY, db_value=total_supply, error=repr(e))
+        else:
+            if supply != total_supply:
+                drift(SUPPLY, db_value=total_supply, chain_value=supply)
+
+        after_id = 0
+        while True:
+            chunk = await sync_to_async(_holder_chunk)(
+                coin_id, after_id, self.chunk_size
+            )
+            if not chunk:
+                break
+            after_id = chunk[-1][0]
+
+            balances = await asyncio.gather(
+                *(
+                    self._query(
+                        canister_id, canister.icrc1_balance_of_async, principal
+                    )
+                    for _, principal, _ in chunk
+                    if principal
+                ),
+                return_exceptions=True,
+            )
+            balances = iter(balances)
+            for holder_id, principal, balance in chunk:
+                fields = {"holder_id": holder_id, "principal": principal}
+                if not principal:
+                    drift(BALANCE, db_value=balance, error="no principal", **fields)
+                    continue
+                chain = next(balances)
+                if isinstance(chain, Exception):
+                    drift(BALANCE, db_value=balance, error=repr(chain), **fields)
+                elif chain != balance:
+                    drift(BALANCE, db_value=balance, chain_value=chain, **fields)
+
+        return drifts
+
+    async def run(self, coins, on_coin):
+        """
+        Reconciles `(coin_id, canister_id, total_supply)` tuples, at most
+        `coin_concurrency` coins at a time, calling `on_coin(coin_id, drifts)`
+        as each one finishes.
+        """
+        self._limit = asyncio.Semaphore(self.concurrency)
+        coin_limit = asyncio.Semaphore(self.coin_concurrency)
+
+        async def reconcile(coin):
+            async with coin_limit:
+                drifts = await self.reconcile_coin(*coin)
+            on_coin(coin[0], drifts)
+
+        await asyncio.gather(*(reconcile(coin) for coin in coins))
+
+
+def reconcile(
+    report_path: str,
+    checkpoint_path: str = None,
+    coin_ids=None,
+    reconciler: Reconciler = None,
+) -> dict:
+    """
+    Reconciles every deployed coin, or `coin_ids`, not yet in the checkpoint and
+    appends their drifts to `report_path`. Returns a summary.
+    """
+    reconciler = reconciler or Reconciler()
+    checkpoint = Checkpoint(checkpoint_path)
+    selected = Coin.objects.exclude(canister_id="")
+    if coin_ids:
+        selected = selected.filter(pk__in=coin_ids)
+    # the checkpoint may hold coins of an earlier, wider run
+    skipped = selected.filter(pk__in=checkpoint.done).count()
+    coins = list(
+        selected.exclude(pk__in=checkpoint.done)
+        .order_by("pk")
+        .values_list("pk", "canister_id", "total_supply")
+    )
+
+    summary = {"coins": 0, "skipped": skipped, SUPPLY: 0, BALANCE: 0}
+    mode = "a" if checkpoint.done else "w"
+    with open(report_path, mode) as report:
+
+        def on_coin(coin_id, drifts):
+            for drift in drifts:
+                report.write(json.dumps(drift._asdict(), default=str) + "\n")
+                summary[drift.kind] += 1
+            report.flush()
+            checkpoint.add(coin_id)
+            summary["coins"] += 1
+
+        asyncio.run(reconciler.run(coins, on_coin))
+
+    logger.info("Reconciliation finished: %s", summary)
+    return summary
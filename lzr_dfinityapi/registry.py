@@ -0,0 +1,150 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ic.identity import Identity
+
+from . import config
+from .aio import AsyncAgent
+from .client import PooledClient
+from .config import AGENT_REGISTRY_SIZE, RPC_ENDPOINTS
+from .routing import MultiEndpointClient
+
+
+class LRURegistry:
+    """
+    Thread-safe, size-bounded mapping that evicts the least recently used entry.
+
+    Values are built by a factory outside of the lock so that slow constructors
+    (key derivation, Candid parsing) don't serialize unrelated lookups.
+    """
+
+    def __init__(self, maxsize: int = AGENT_REGISTRY_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = factory()
+
+        with self._lock:
+            if key in self._entries:
+                # another thread won the race, keep a single shared instance
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_clients = LRURegistry()
+_identities = LRURegistry()
+_agents = LRURegistry()
+_canisters = LRURegistry()
+
+
+def identity_key(identity) -> str:
+    """Stable, non-secret cache key for a private key string or an `Identity`."""
+    privkey = identity if isinstance(identity, str) else identity.privkey
+    return hashlib.sha256(privkey.encode("utf-8")).hexdigest()
+
+
+def _new_client(url: str):
+    if url == config.RPC_URL and RPC_ENDPOINTS:
+        return MultiEndpointClient(RPC_ENDPOINTS)
+    return PooledClient(url=url)
+
+
+def get_client(url: str = None) -> PooledClient:
+    """
+    The shared client of `url` (default RPC_URL); a `MultiEndpointClient` over
+    RPC_ENDPOINTS for RPC_URL when those are configured.
+    """
+    url = url or config.RPC_URL
+    return _clients.get_or_create(url, lambda: _new_client(url))
+
+
+def register_client(url: str, client):
+    """
+    Uses `client` for every agent of `url` created from now on, e.g. a
+    `stub_replica.StubClient` in benchmarks. Call `clear()` first to drop
+    agents and canisters already built for `url`.
+    """
+    _clients.pop(url)
+    _clients.get_or_create(url, lambda: client)
+
+
+def get_identity(identity) -> Identity:
+    """Accepts a hex private key or an `Identity` and returns a shared `Identity`."""
+    if isinstance(identity, Identity):
+        return _identities.get_or_create(identity_key(identity), lambda: identity)
+    return _identities.get_or_create(
+        identity_key(identity), lambda: Identity(privkey=identity)
+    )
+
+
+def get_agent(identity, url: str = None) -> AsyncAgent:
+    url = url or config.RPC_URL
+    key = (url, identity_key(identity))
+    return _agents.get_or_create(
+        key,
+        lambda: AsyncAgent(identity=get_identity(identity), client=get_client(url)),
+    )
+
+
+def get_canister(
+    canister_cls, identity, canister_id: str, url: str = None, **kwargs
+):
+    """
+    Returns a long-lived `canister_cls` instance for (url, identity, canister_id).
+
+    Extra keyword arguments (e.g. `creator_coin`) are forwarded to the canister
+    constructor and are part of the cache key.
+    """
+    url = url or config.RPC_URL
+    key = (
+        url,
+        identity_key(identity),
+        canister_id,
+        canister_cls,
+        tuple(sorted(kwargs.items())),
+    )
+
+    def factory():
+        agent = get_agent(identity, url)
+        return canister_cls(
+            identity=agent.identity,
+            canister_id=canister_id,
+            client=agent.client,
+            agent=agent,
+            **kwargs,
+        )
+
+    return _canisters.get_or_create(key, factory)
+
+
+def clear():
+    for registry in (_canisters, _agents, _identities, _clients):
+        registry.clear()
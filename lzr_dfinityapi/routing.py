@@ -0,0 +1,404 @@
+"""
+Routing of replica requests over several IC boundary nodes.
+
+`MultiEndpointClient` is a drop-in `PooledClient` for a list of boundary node
+URLs. Every request goes to the available node with the lowest median
+latency over its last ROUTING_LATENCY_WINDOW requests, and moves on to the
+next one when a node cannot be reached or answers with a 429 or 5xx status.
+The same signed envelope is sent again, so a resubmitted update call keeps
+its request id and the IC still executes it once.
+
+Queries of ROUTING_HEDGED_METHODS are hedged: when the first node has not
+answered within its ROUTING_HEDGE_PERCENTILE latency, the query is sent to
+the second node as well and the first answer wins.
+
+Each node has a circuit breaker. ROUTING_FAILURE_THRESHOLD consecutive
+failures open it and keep the node out of rotation for ROUTING_OPEN_SECONDS.
+After that a single trial request is let through: if it succeeds the breaker
+closes, and if it fails the breaker opens again. When every breaker is open,
+the nodes ejected longest ago take one trial request each ahead of time, so
+that a full outage is probed rather than waited out.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cbor2
+import httpx
+from ic.client import Client
+
+from . import metrics
+from .client import NOT_SENT_ERRORS, PooledClient
+from .config import (
+    ROUTING_FAILURE_THRESHOLD,
+    ROUTING_HEDGE_MIN_DELAY,
+    ROUTING_HEDGE_PERCENTILE,
+    ROUTING_HEDGE_WORKERS,
+    ROUTING_HEDGED_METHODS,
+    ROUTING_LATENCY_WINDOW,
+    ROUTING_OPEN_SECONDS,
+)
+from .stats import percentile
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class EndpointError(Exception):
+    """
+    A boundary node failed a request: unreachable, throttled or erroring.
+    `sent` is False when the request certainly did not get past the node.
+    """
+
+    def __init__(self, url: str, reason: str, sent: bool = True):
+        self.url = url
+        self.reason = reason
+        self.sent = sent
+        super().__init__(f"{url}: {reason}")
+
+
+class Endpoint:
+    """A boundary node with its recent latencies and circuit breaker."""
+
+    def __init__(
+        self,
+        url: str,
+        client=None,
+        window: int = ROUTING_LATENCY_WINDOW,
+        failure_threshold: int = ROUTING_FAILURE_THRESHOLD,
+        open_seconds: float = ROUTING_OPEN_SECONDS,
+    ):
+        self.url = url
+        self.client = client or PooledClient(url=url)
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.open_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    def eligible(self) -> bool:
+        """Whether the breaker would let a request through now."""
+        state = self.state
+        return state == CLOSED or state == HALF_OPEN and not self._trial
+
+    def acquire(self, force: bool = False) -> bool:
+        """
+        Claims a request slot, the single trial one when half open. `force`
+        claims the trial slot of an open breaker before its time is up.
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if self._trial or state == OPEN and not force:
+                return False
+            self._trial = True
+            return True
+
+    def release(self):
+        """Gives back a trial slot whose request was abandoned."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            tripped = (
+                self.opened_at is None and self.failures >= self.failure_threshold
+            )
+            if self._trial or tripped:
+                self.opened_at = time.monotonic()
+                metrics.increment(
+                    metrics.ENDPOINT_EJECTIONS_TOTAL, endpoint=self.url
+                )
+            self._trial = False
+        metrics.increment(metrics.ENDPOINT_FAILURES_TOTAL, endpoint=self.url)
+
+    def latency(self, q: float = 50) -> float:
+        """The `q` percentile of recent request latencies, 0 before any."""
+        with self._lock:
+            samples = list(self._latencies)
+        return percentile(samples, q)
+
+
+def _method_name(data: bytes):
+    try:
+        return cbor2.loads(data)["content"].get("method_name")
+    except Exception:  # noqa: B902
+        return None
+
+
+def _check(endpoint: Endpoint, response: httpx.Response) -> httpx.Response:
+    status = response.status_code
+    if status == 429:
+        raise EndpointError(endpoint.url, f"HTTP {status}", sent=False)
+    if status >= 500:
+        raise EndpointError(endpoint.url, f"HTTP {status}")
+    return response
+
+
+def _worst(error: EndpointError, new_error: EndpointError) -> EndpointError:
+    """Of two failed attempts, the one whose request may have been delivered."""
+    if error is not None and error.sent:
+        return error
+    return new_error
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    ROUTING_HEDGE_WORKERS, thread_name_prefix="hedged-query"
+                )
+    return _executor
+
+
+class MultiEndpointClient(Client):
+    """
+    `PooledClient` over several boundary nodes, see the module docstring.
+    `clients` optionally maps URLs to prebuilt clients, e.g. in benchmarks.
+    """
+
+    def __init__(
+        self,
+        urls,
+        clients: dict = None,
+        hedged_methods=ROUTING_HEDGED_METHODS,
+        hedge_percentile: float = ROUTING_HEDGE_PERCENTILE,
+        hedge_min_delay: float = ROUTING_HEDGE_MIN_DELAY,
+        **endpoint_options,
+    ):
+        if not urls:
+            raise ValueError("MultiEndpointClient needs at least one endpoint")
+        super().__init__(url=urls[0])
+        clients = clients or {}
+        self.endpoints = [
+            Endpoint(url, clients.get(url), **endpoint_options) for url in urls
+        ]
+        self.hedged_methods = frozenset(hedged_methods)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+
+    def ranked(self) -> list:
+        """Endpoints with a closed or half open breaker, fastest first."""
+        available = [endpoint for endpoint in self.endpoints if endpoint.eligible()]
+        return sorted(available, key=lambda endpoint: endpoint.latency())
+
+    def _route(self):
+        endpoints = self.ranked()
+        if endpoints:
+            return endpoints, False
+        # every breaker is open: probe the nodes ejected longest ago first
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.opened_at), True
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        return max(endpoint.latency(self.hedge_percentile), self.hedge_min_delay)
+
+    def _hedged(self, data: bytes) -> bool:
+        return len(self.endpoints) > 1 and _method_name(data) in self.hedged_methods
+
+    def _attempt(self, endpoint: Endpoint, request, force=False) -> httpx.Response:
+        if not endpoint.acquire(force):
+            raise EndpointError(
+                endpoint.url, f"circuit {endpoint.state}", sent=False
+            )
+        started = time.perf_counter()
+        try:
+            response = _check(endpoint, request(endpoint.client))
+        except (httpx.TransportError, EndpointError) as e:
+            endpoint.record_failure()
+            if isinstance(e, EndpointError):
+                raise
+            raise EndpointError(
+                endpoint.url,
+                type(e).__name__,
+                sent=not isinstance(e, NOT_SENT_ERRORS),
+            ) from e
+        except BaseException:  # noqa: B902
+            endpoint.release()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return response
+
+    def _send(self, request, endpoints=None, force=False) -> httpx.Response:
+        if endpoints is None:
+            endpoints, force = self._route()
+        error = None
+        for endpoint in endpoints:
+            try:
+                return self._attempt(endpoint, request, force)
+            except EndpointError as e:
+                error = _worst(error, e)
+        raise error
+
+    def _send_hedged(self, request) -> httpx.Response:
+        endpoints, force = self._route()
+        if force or len(endpoints) < 2:
+            return self._send(request, endpoints, force)
+
+        executor = _hedge_executor()
+        pending = {executor.submit(self._attempt, endpoints[0], request)}
+        done, _ = wait(pending, timeout=self.hedge_delay(endpoints[0]))
+        asked = 1
+        if not done:
+            metrics.increment(metrics.HEDGED_QUERIES_TOTAL)
+            pending.add(executor.submit(self._attempt, endpoints[1], request))
+            asked = 2
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+        if len(endpoints) > asked:
+            return self._send(request, endpoints[asked:])
+        raise error
+
+    def query(self, canister_id, data):
+        def request(client):
+            return client._post(canister_id, "query", data)
+
+        if self._hedged(data):
+            return self._send_hedged(request).content
+        return self._send(request).content
+
+    def call(self, canister_id, req_id, data):
+        self._send(lambda client: client._post(canister_id, "call", data))
+        return req_id
+
+    def read_state(self, canister_id, data):
+        return self._send(
+            lambda client: client._post(canister_id, "read_state", data)
+        ).content
+
+    def status(self):
+        return self._send(lambda client: client._get_status()).content
+
+    async def _attempt_async(
+        self, endpoint: Endpoint, request, force=False
+    ) -> httpx.Response:
+        if not endpoint.acquire(force):
+            raise EndpointError(
+                endpoint.url, f"circuit {endpoint.state}", sent=False
+            )
+        started = time.perf_counter()
+        try:
+            response = _check(endpoint, await request(endpoint.client))
+        except (httpx.TransportError, EndpointError) as e:
+            endpoint.record_failure()
+            if isinstance(e, EndpointError):
+                raise
+            raise EndpointError(
+                endpoint.url,
+                type(e).__name__,
+                sent=not isinstance(e, NOT_SENT_ERRORS),
+            ) from e
+        except BaseException:  # noqa: B902
+            # includes the cancellation of a hedged request that lost
+            endpoint.release()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return response
+
+    async def _send_async(self, request, endpoints=None, force=False):
+        if endpoints is None:
+            endpoints, force = self._route()
+        error = None
+        for endpoint in endpoints:
+            try:
+                return await self._attempt_async(endpoint, request, force)
+            except EndpointError as e:
+                error = _worst(error, e)
+        raise error
+
+    async def _send_hedged_async(self, request) -> httpx.Response:
+        endpoints, force = self._route()
+        if force or len(endpoints) < 2:
+            return await self._send_async(request, endpoints, force)
+
+        pending = {asyncio.ensure_future(self._attempt_async(endpoints[0], request))}
+        done, _ = await asyncio.wait(pending, timeout=self.hedge_delay(endpoints[0]))
+        asked = 1
+        if not done:
+            metrics.increment(metrics.HEDGED_QUERIES_TOTAL)
+            pending.add(
+                asyncio.ensure_future(self._attempt_async(endpoints[1], request))
+            )
+            asked = 2
+
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        if len(endpoints) > asked:
+            return await self._send_async(request, endpoints[asked:])
+        raise error
+
+    async def query_async(self, canister_id, data):
+        def request(client):
+            return client._post_async(canister_id, "query", data)
+
+        if self._hedged(data):
+            return (await self._send_hedged_async(request)).content
+        return (await self._send_async(request)).content
+
+    async def call_async(self, canister_id, req_id, data):
+        await self._send_async(
+            lambda client: client._post_async(canister_id, "call", data)
+        )
+        return req_id
+
+    async def read_state_async(self, canister_id, data):
+        response = await self._send_async(
+            lambda client: client._post_async(canister_id, "read_state", data)
+        )
+        return response.content
+
+    async def status_async(self):
+        response = await self._send_async(lambda client: client._get_status_async())
+        return response.content
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    async def aclose(self):
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
@@ -0,0 +1,45 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of `values` for `q` in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyRecorder:
+    """Thread-safe counters plus a bounded window of latency samples."""
+
+    def __init__(self, max_samples: int = 10000):
+        self.started_at = time.monotonic()
+        self.count = 0
+        self.errors = 0
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.count += 1
+            self.errors += int(error)
+            self._samples.append(seconds)
+
+    def report(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            count, errors = self.count, self.errors
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "count": count,
+            "errors": errors,
+            "elapsed": elapsed,
+            "throughput": count / elapsed if elapsed else 0.0,
+            "p50": percentile(samples, 50),
+            "p99": percentile(samples, 99),
+            "max": max(samples, default=0.0),
+        }
@@ -0,0 +1,572 @@
+"""
+Local stand-in for an IC replica running the coin factory and coin ledgers.
+
+`StubReplica` speaks the replica's HTTP API v2 envelopes: CBOR-encoded,
+Candid-argument `query`, `call` and `read_state` requests, answered with
+uncertified (unsigned) certificates, which ic-py does not verify. It
+implements `factory_backend.did` (`new_token`) and the
+`lzr_founder_coin_backend.did` ledger (`mint`, `burn`, `icrc1_*`,
+`get_transactions`) in memory.
+
+Reach it in process through `StubClient`, a drop-in `PooledClient`, or over
+loopback HTTP with `serve`; `registry.register_client(RPC_URL, client)` makes
+`api` and the providers use either one:
+
+    replica = StubReplica(latency=0.2, failure_rate=0.01)
+    registry.register_client(RPC_URL, StubClient(replica))
+
+Update calls take effect when submitted and report "processing" to
+`read_state` for `latency` seconds before their reply; queries are delayed by
+`query_latency`. Failures are injected at random with `failure_rate` or
+scripted with `fail_next`.
+"""
+import asyncio
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cbor2
+from ic.candid import decode, encode, Types
+from ic.principal import Principal
+from ic.utils import to_request_id
+
+from .encoders import (
+    ACCOUNT,
+    BLOB,
+    BURN_ARG,
+    GET_TRANSACTIONS_REQUEST,
+    TRANSFER_ARG,
+)
+
+TRANSFER_ERROR = Types.Variant(
+    {
+        "BadBurn": Types.Record({"min_burn_amount": Types.Nat}),
+        "BadFee": Types.Record({"expected_fee": Types.Nat}),
+        "CreatedInFuture": Types.Record({"ledger_time": Types.Nat64}),
+        "Duplicate": Types.Record({"duplicate_of": Types.Nat}),
+        "GenericError": Types.Record(
+            {"error_code": Types.Nat, "message": Types.Text}
+        ),
+        "InsufficientFunds": Types.Record({"balance": Types.Nat}),
+        "TemporarilyUnavailable": Types.Null,
+        "TooOld": Types.Null,
+    }
+)
+TRANSFER_RESULT = Types.Variant({"Ok": Types.Nat, "Err": TRANSFER_ERROR})
+VALUE = Types.Variant(
+    {"Blob": BLOB, "Int": Types.Int, "Nat": Types.Nat, "Text": Types.Text}
+)
+METADATA = Types.Vec(Types.Tuple(Types.Text, VALUE))
+STANDARDS = Types.Vec(Types.Record({"name": Types.Text, "url": Types.Text}))
+TRANSACTION = Types.Record(
+    {
+        "burn": Types.Opt(
+            Types.Record(
+                {
+                    "amount": Types.Nat,
+                    "created_at_time": Types.Opt(Types.Nat64),
+                    "from": ACCOUNT,
+                    "memo": Types.Opt(BLOB),
+                }
+            )
+        ),
+        "index": Types.Nat,
+        "kind": Types.Text,
+        "mint": Types.Opt(
+            Types.Record(
+                {
+                    "amount": Types.Nat,
+                    "created_at_time": Types.Opt(Types.Nat64),
+                    "memo": Types.Opt(BLOB),
+                    "to": ACCOUNT,
+                }
+            )
+        ),
+        "timestamp": Types.Nat64,
+        "transfer": Types.Opt(
+            Types.Record(
+                {
+                    "amount": Types.Nat,
+                    "created_at_time": Types.Opt(Types.Nat64),
+                    "fee": Types.Opt(Types.Nat),
+                    "from": ACCOUNT,
+                    "memo": Types.Opt(BLOB),
+                    "to": ACCOUNT,
+                }
+            )
+        ),
+    }
+)
+TRANSACTIONS_RESPONSE = Types.Record(
+    {
+        "archived_transactions": Types.Vec(
+            Types.Record(
+                {
+                    "callback": Types.Func(
+                        [GET_TRANSACTIONS_REQUEST],
+                        [Types.Record({"transactions": Types.Vec(TRANSACTION)})],
+                        ["query"],
+                    ),
+                    "length": Types.Nat,
+                    "start": Types.Nat,
+                }
+            )
+        ),
+        "first_index": Types.Nat,
+        "log_length": Types.Nat,
+        "transactions": Types.Vec(TRANSACTION),
+    }
+)
+
+REJECT_DESTINATION_INVALID = 3
+REJECT_CANISTER_ERROR = 5
+
+
+class Reject(Exception):
+    """A call rejected by the stub replica."""
+
+    def __init__(self, message: str, code: int = REJECT_CANISTER_ERROR):
+        self.code = code
+        super().__init__(message)
+
+
+def _account(owner: Principal, subaccount=None) -> dict:
+    # ic-py encodes principals from their text form only
+    return {
+        "owner": owner.to_str(),
+        "subaccount": [] if subaccount is None else [subaccount],
+    }
+
+
+def _optional(values: list):
+    return values[0] if values else None
+
+
+class StubLedger:
+    """In-memory ICRC-1 coin ledger with the minting methods of the coin backend."""
+
+    # spec default window for `created_at_time` deduplication
+    TX_WINDOW = 24 * 60 * 60 * 10**9
+
+    def __init__(self, name: str, symbol: str, minting_account: Principal):
+        self.name = name
+        self.symbol = symbol
+        self.decimals = 18
+        self.fee = 0
+        self.minting_account = minting_account
+        self.balances = {}
+        self.total_supply = 0
+        self.transactions = []
+        self._deduplication = {}
+
+    def _append(self, kind: str, **fields) -> int:
+        index = len(self.transactions)
+        transaction = {
+            "burn": [],
+            "index": index,
+            "kind": kind,
+            "mint": [],
+            "timestamp": time.time_ns(),
+            "transfer": [],
+        }
+        transaction[kind] = [fields]
+        self.transactions.append(transaction)
+        return index
+
+    def _deduplicate(self, caller: Principal, args: dict):
+        created_at_time = _optional(args.get("created_at_time", []))
+        if created_at_time is None:
+            return None, None
+        now = time.time_ns()
+        if created_at_time < now - self.TX_WINDOW:
+            return None, {"TooOld": None}
+        if created_at_time > now + 60 * 10**9:
+            return None, {"CreatedInFuture": {"ledger_time": now}}
+        key = (caller.to_str(), repr(sorted(args.items())))
+        if key in self._deduplication:
+            return key, {"Duplicate": {"duplicate_of": self._deduplication[key]}}
+        return key, None
+
+    def mint(self, caller: Principal, to: Principal, amount: int) -> dict:
+        owner = to.to_str()
+        self.balances[owner] = self.balances.get(owner, 0) + amount
+        self.total_supply += amount
+        index = self._append(
+            "mint",
+            amount=amount,
+            created_at_time=[],
+            memo=[],
+            to=_account(to),
+        )
+        return {"Ok": index}
+
+    def burn(self, caller: Principal, args: dict) -> dict:
+        key, error = self._deduplicate(caller, args)
+        if error is not None:
+            return {"Err": error}
+        owner, amount = caller.to_str(), args["amount"]
+        balance = self.balances.get(owner, 0)
+        if balance < amount:
+            return {"Err": {"InsufficientFunds": {"balance": balance}}}
+        self.balances[owner] = balance - amount
+        self.total_supply -= amount
+        index = self._append(
+            "burn",
+            amount=amount,
+            created_at_time=args["created_at_time"],
+            memo=args["memo"],
+            **{"from": _account(caller)},
+        )
+        if key is not None:
+            self._deduplication[key] = index
+        return {"Ok": index}
+
+    def icrc1_transfer(self, caller: Principal, args: dict) -> dict:
+        key, error = self._deduplicate(caller, args)
+        if error is not None:
+            return {"Err": error}
+        source, target = caller.to_str(), args["to"]["owner"].to_str()
+        amount = args["amount"]
+        balance = self.balances.get(source, 0)
+        if balance < amount + self.fee:
+            return {"Err": {"InsufficientFunds": {"balance": balance}}}
+        self.balances[source] = balance - amount - self.fee
+        self.balances[target] = self.balances.get(target, 0) + amount
+        self.total_supply -= self.fee
+        index = self._append(
+            "transfer",
+            amount=amount,
+            created_at_time=args["created_at_time"],
+            fee=args["fee"],
+            memo=args["memo"],
+            to=_account(args["to"]["owner"], _optional(args["to"]["subaccount"])),
+            **{"from": _account(caller)},
+        )
+        if key is not None:
+            self._deduplication[key] = index
+        return {"Ok": index}
+
+    def icrc1_balance_of(self, account: dict) -> int:
+        return self.balances.get(account["owner"].to_str(), 0)
+
+    def icrc1_metadata(self) -> list:
+        return [
+            ("icrc1:decimals", {"Nat": self.decimals}),
+            ("icrc1:fee", {"Nat": self.fee}),
+            ("icrc1:name", {"Text": self.name}),
+            ("icrc1:symbol", {"Text": self.symbol}),
+        ]
+
+    def get_transactions(self, request: dict) -> dict:
+        start, length = request["start"], request["length"]
+        return {
+            "archived_transactions": [],
+            "first_index": start,
+            "log_length": len(self.transactions),
+            "transactions": self.transactions[start : start + length],  # noqa: E203
+        }
+
+
+# method -> (argument types, reply type, update)
+LEDGER_METHODS = {
+    "mint": ([Types.Principal, Types.Nat], TRANSFER_RESULT, True),
+    "burn": ([BURN_ARG], TRANSFER_RESULT, True),
+    "icrc1_transfer": ([TRANSFER_ARG], TRANSFER_RESULT, True),
+    "icrc1_balance_of": ([ACCOUNT], Types.Nat, False),
+    "icrc1_total_supply": ([], Types.Nat, False),
+    "icrc1_fee": ([], Types.Nat, False),
+    "icrc1_decimals": ([], Types.Nat8, False),
+    "icrc1_name": ([], Types.Text, False),
+    "icrc1_symbol": ([], Types.Text, False),
+    "icrc1_metadata": ([], METADATA, False),
+    "icrc1_minting_account": ([], Types.Opt(ACCOUNT), False),
+    "icrc1_supported_standards": ([], STANDARDS, False),
+    "get_transactions": ([GET_TRANSACTIONS_REQUEST], TRANSACTIONS_RESPONSE, False),
+}
+FACTORY_METHODS = {
+    "new_token": ([Types.Text, Types.Text], Types.Service({}), True),
+}
+
+
+class StubReplica:
+    """
+    The factory canister plus every coin ledger it created, behind the
+    replica's request envelopes. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        query_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = None,
+        factory_canister_id: str = None,
+    ):
+        self.latency = latency
+        self.query_latency = query_latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.ledgers = {}
+        self.calls = {}
+        self._next_canister = 1
+        self._scripted_failures = {}
+        self._requests = {}
+        self._lock = threading.RLock()
+        self.factory_canister_id = factory_canister_id or self._new_canister_id()
+
+    def _new_canister_id(self) -> str:
+        with self._lock:
+            number = self._next_canister
+            self._next_canister += 1
+        return Principal(bytes=number.to_bytes(8, "big") + b"\x01\x01").to_str()
+
+    def create_token(self, name: str, symbol: str, minter: Principal = None) -> str:
+        canister_id = self._new_canister_id()
+        minter = minter or Principal.from_str(self.factory_canister_id)
+        with self._lock:
+            self.ledgers[canister_id] = StubLedger(name, symbol, minter)
+        return canister_id
+
+    def fail_next(self, method: str, error=None, count: int = 1):
+        """
+        Fails the next `count` calls of `method`: rejected when `error` is None,
+        otherwise answered with `{"Err": error}` where `error` is a
+        `TransferError` variant name or a `{variant: details}` dict.
+        """
+        if isinstance(error, str):
+            error = {error: None}
+        with self._lock:
+            self._scripted_failures.setdefault(method, []).extend([error] * count)
+
+    def _injected_failure(self, method: str):
+        """`(True, error)` if this call of `method` must fail."""
+        with self._lock:
+            scripted = self._scripted_failures.get(method)
+            if scripted:
+                return True, scripted.pop(0)
+            if self.failure_rate and self.random.random() < self.failure_rate:
+                return True, None
+        return False, None
+
+    def _dispatch(self, canister_id: str, method: str, arg: bytes, caller, update):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if canister_id == self.factory_canister_id:
+                methods, target = FACTORY_METHODS, self
+            elif canister_id in self.ledgers:
+                methods, target = LEDGER_METHODS, self.ledgers[canister_id]
+            else:
+                raise Reject(
+                    f"Canister {canister_id} not found", REJECT_DESTINATION_INVALID
+                )
+            if method not in methods:
+                raise Reject(f"Canister {canister_id} has no method '{method}'")
+            arg_types, reply_type, is_update = methods[method]
+            if is_update and not update:
+                raise Reject(f"'{method}' is an update method, not a query")
+
+            failed, error = self._injected_failure(method)
+            if failed and error is None:
+                raise Reject("Stub replica: injected failure")
+            if failed:
+                value = {"Err": error}
+            else:
+                args = (
+                    [a["value"] for a in decode(arg, arg_types)] if arg_types else []
+                )
+                value = self._invoke(target, method, caller, args)
+            return encode([{"type": reply_type, "value": value}])
+
+    def _invoke(self, target, method: str, caller: Principal, args: list):
+        if method == "new_token":
+            name, symbol = args
+            return self.create_token(name, symbol)
+        if method in ("mint", "burn", "icrc1_transfer"):
+            return getattr(target, method)(caller, *args)
+        if method in ("icrc1_balance_of", "get_transactions"):
+            return getattr(target, method)(*args)
+        if method == "icrc1_metadata":
+            return target.icrc1_metadata()
+        if method == "icrc1_minting_account":
+            return [_account(target.minting_account)]
+        if method == "icrc1_supported_standards":
+            return [{"name": "ICRC-1", "url": "https://github.com/dfinity/ICRC-1"}]
+        return getattr(target, method.replace("icrc1_", ""))
+
+    @staticmethod
+    def _content(data: bytes) -> dict:
+        return cbor2.loads(data)["content"]
+
+    def query(self, canister_id: str, data: bytes) -> bytes:
+        content = self._content(data)
+        try:
+            reply = self._dispatch(
+                str(canister_id),
+                content["method_name"],
+                content["arg"],
+                Principal(bytes=content["sender"]),
+                update=False,
+            )
+        except Reject as e:
+            return cbor2.dumps(
+                {
+                    "status": "rejected",
+                    "reject_code": e.code,
+                    "reject_message": str(e),
+                }
+            )
+        return cbor2.dumps({"status": "replied", "reply": {"arg": reply}})
+
+    def call(self, canister_id: str, data: bytes, req_id: bytes = None) -> bytes:
+        content = self._content(data)
+        req_id = req_id or to_request_id(content)
+        try:
+            reply = self._dispatch(
+                str(canister_id),
+                content["method_name"],
+                content["arg"],
+                Principal(bytes=content["sender"]),
+                update=True,
+            )
+            outcome = {b"status": b"replied", b"reply": reply}
+        except Reject as e:
+            outcome = {
+                b"status": b"rejected",
+                b"reject_code": str(e.code).encode(),
+                b"reject_message": str(e).encode(),
+            }
+        with self._lock:
+            self._requests[req_id] = (time.monotonic() + self.latency, outcome)
+        return req_id
+
+    def read_state(self, canister_id: str, data: bytes) -> bytes:
+        content = self._content(data)
+        subtrees = []
+        now = time.monotonic()
+        for path in content["paths"]:
+            if len(path) < 2 or path[0] != b"request_status":
+                continue
+            req_id = path[1]
+            with self._lock:
+                ready_at, outcome = self._requests.get(req_id, (None, None))
+            if outcome is None:
+                continue
+            if ready_at > now:
+                outcome = {b"status": b"processing"}
+            leaves = [[2, label, [3, value]] for label, value in outcome.items()]
+            subtrees.append([2, req_id, _forks(leaves)])
+        tree = [2, b"request_status", _forks(subtrees)] if subtrees else [0]
+        certificate = cbor2.dumps({"tree": tree, "signature": b""})
+        return cbor2.dumps({"certificate": certificate})
+
+    def status(self) -> bytes:
+        return cbor2.dumps(
+            {"ic_api_version": "stub", "replica_health_status": "healthy"}
+        )
+
+
+def _forks(nodes: list) -> list:
+    if not nodes:
+        return [0]
+    tree = nodes[-1]
+    for node in reversed(nodes[:-1]):
+        tree = [1, node, tree]
+    return tree
+
+
+class StubClient:
+    """In-process `ic.client.Client` for a `StubReplica`, sync and async."""
+
+    def __init__(self, replica: StubReplica):
+        self.replica = replica
+        self.url = "stub://replica"
+
+    def query(self, canister_id, data):
+        if self.replica.query_latency:
+            time.sleep(self.replica.query_latency)
+        return self.replica.query(canister_id, data)
+
+    def call(self, canister_id, req_id, data):
+        return self.replica.call(canister_id, data, req_id)
+
+    def read_state(self, canister_id, data):
+        return self.replica.read_state(canister_id, data)
+
+    def status(self):
+        return self.replica.status()
+
+    async def query_async(self, canister_id, data):
+        if self.replica.query_latency:
+            await asyncio.sleep(self.replica.query_latency)
+        return self.replica.query(canister_id, data)
+
+    async def call_async(self, canister_id, req_id, data):
+        return self.call(canister_id, req_id, data)
+
+    async def read_state_async(self, canister_id, data):
+        return self.read_state(canister_id, data)
+
+    async def status_async(self):
+        return self.status()
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class _ReplicaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/cbor")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa: N802
+        if self.path == "/api/v2/status":
+            self._reply(200, self.server.replica.status())
+        else:
+            self._reply(404, b"")
+
+    def do_POST(self):  # noqa: N802
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 5 or parts[:3] != ["api", "v2", "canister"]:
+            self._reply(404, b"")
+            return
+        canister_id, kind = parts[3], parts[4]
+        replica = self.server.replica
+        if kind == "query":
+            if replica.query_latency:
+                time.sleep(replica.query_latency)
+            self._reply(200, replica.query(canister_id, data))
+        elif kind == "call":
+            replica.call(canister_id, data)
+            self._reply(202, b"")
+        elif kind == "read_state":
+            self._reply(200, replica.read_state(canister_id, data))
+        else:
+            self._reply(404, b"")
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+def serve(replica: StubReplica, port: int = 0, addr: str = "127.0.0.1"):
+    """
+    Serves `replica` over HTTP from a daemon thread. Returns the server; its
+    `url` attribute is the `RPC_URL` to use, `shutdown()` stops it.
+    """
+    server = ThreadingHTTPServer((addr, port), _ReplicaHandler)
+    server.daemon_threads = True
+    server.replica = replica
+    server.url = f"http://{addr}:{server.server_address[1]}"
+    threading.Thread(
+        target=server.serve_forever, name="stub-replica", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,58 @@
+"""
+Wei conversions without importing web3, which takes seconds to import.
+
+Results match `Web3.to_wei(amount, "ether")` / `Web3.from_wei(amount, "ether")`
+exactly, so amounts recorded before and after the switch agree to the wei.
+"""
+from decimal import Decimal, localcontext
+from typing import NewType, Union
+
+Wei = NewType("Wei", int)
+
+ETHER_DECIMALS = 18
+MAX_WEI = 2**256 - 1
+
+
+def to_wei(
+    amount: Union[int, float, str, Decimal], decimals: int = ETHER_DECIMALS
+) -> Wei:
+    """Same algorithm as `eth_utils.to_wei`, including its rounding."""
+    if isinstance(amount, (int, str)):
+        d_amount = Decimal(amount)
+    elif isinstance(amount, float):
+        d_amount = Decimal(str(amount))
+    elif isinstance(amount, Decimal):
+        d_amount = amount
+    else:
+        raise TypeError("Unsupported type. Must be one of integer, float, or string")
+
+    if d_amount == 0:
+        return Wei(0)
+
+    s_amount = str(amount)
+    unit_value = Decimal(10) ** decimals
+    if d_amount < 1 and "." in s_amount:
+        # eth_utils rescales amounts below one with the float's exact value
+        with localcontext() as ctx:
+            multiplier = len(s_amount) - s_amount.index(".") - 1
+            ctx.prec = multiplier
+            d_amount = Decimal(amount, context=ctx) * 10**multiplier
+        unit_value /= 10**multiplier
+
+    with localcontext() as ctx:
+        ctx.prec = 999
+        wei = int(Decimal(d_amount, context=ctx) * unit_value)
+
+    if wei < 0 or wei > MAX_WEI:
+        raise ValueError("Resulting wei value must be between 1 and 2**256 - 1")
+    return Wei(wei)
+
+
+def from_wei(amount: int, decimals: int = ETHER_DECIMALS) -> Union[int, Decimal]:
+    if amount == 0:
+        return 0
+    if amount < 0 or amount > MAX_WEI:
+        raise ValueError("value must be between 1 and 2**256 - 1")
+    with localcontext() as ctx:
+        ctx.prec = 999
+        return Decimal(amount).scaleb(-decimals)
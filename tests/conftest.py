@@ -0,0 +1,42 @@
+import os
+
+import django
+import pytest
+
+os.environ["DJANGO_SETTINGS_MODULE"] = "tests.settings"
+os.environ.setdefault("CHAIN_ENV", "development")
+os.environ.setdefault("DEVELOPMENT_RPC", "")
+os.environ.setdefault(
+    "CANDID_FOLDER",
+    os.path.join(os.path.dirname(__file__), os.pardir, "lzr_dfinityapi", "candids"),
+)
+django.setup()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from django.conf import settings
+    from django.core.management import call_command
+
+    path = settings.DATABASES["default"]["NAME"]
+    if os.path.exists(path):
+        os.remove(path)
+    call_command("migrate", verbosity=0)
+    yield
+    os.remove(path)
+
+
+@pytest.fixture
+def replica():
+    from lzr_dfinityapi.stub_replica import StubReplica
+
+    return StubReplica()
+
+
+@pytest.fixture
+def stub(replica):
+    """A `benchmarks.StubEnvironment` over `replica`."""
+    from lzr_dfinityapi.benchmarks import stub_environment
+
+    with stub_environment(replica) as environment:
+        yield environment
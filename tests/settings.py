@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+from utils.settings import *  # noqa
+
+# a file rather than ":memory:" so the async trade paths, which run their ORM
+# calls on a worker thread, see the same tables
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.gettempdir(), "lzr_dfinityapi_tests.sqlite3"),
+    }
+}
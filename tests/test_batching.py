@@ -0,0 +1,15 @@
+from lzr_dfinityapi.batching import CanisterBatcher
+
+
+def test_drained_canisters_are_forgotten():
+    batcher = CanisterBatcher(window=0.01)
+    try:
+        futures = [
+            batcher.submit(f"canister-{i % 10}", lambda i=i: i) for i in range(50)
+        ]
+        assert batcher.flush(timeout=5)
+        assert [future.result() for future in futures] == list(range(50))
+        assert not batcher._queues
+        assert not batcher._in_flight
+    finally:
+        batcher.close(timeout=5)
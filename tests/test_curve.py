@@ -0,0 +1,82 @@
+import math
+import random
+from decimal import Decimal
+
+import pytest
+
+from lzr_dfinityapi.curve import (
+    ContinuosToken,
+    random_state,
+    reference_purchase_return,
+    reference_sale_return,
+    WEI,
+)
+
+# see check_curve: shortfall relative to supply + reserve + result
+TOLERANCE = Decimal("1e-27")
+SAMPLES = 500
+
+
+def cases(seed: int):
+    rng = random.Random(seed)
+    for _ in range(SAMPLES):
+        x, rb, p = random_state(rng)
+        yield x, rb, p, min(p, x)
+
+
+def assert_floored(result: int, reference: Decimal, x: int, rb: int):
+    # results are floored, anything above the reference overpays
+    assert result <= reference
+    shortfall = reference - result
+    assert shortfall <= 2 or shortfall / (reference + x + rb) <= TOLERANCE
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fixed_point_matches_reference(seed):
+    for x, rb, p, sale in cases(seed):
+        assert_floored(
+            ContinuosToken.calc_purchase_return_wei(x, rb, p),
+            reference_purchase_return(x, rb, p),
+            x,
+            rb,
+        )
+        assert_floored(
+            ContinuosToken.calc_purchase_return_wei(0, 0, p),
+            reference_purchase_return(0, 0, p),
+            0,
+            0,
+        )
+        assert_floored(
+            ContinuosToken.calc_sale_return_wei(x, rb, sale),
+            reference_sale_return(x, rb, sale),
+            x,
+            rb,
+        )
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fixed_point_matches_float(seed):
+    for x, rb, p, sale in cases(seed):
+        x_ether, rb_ether = x / WEI, rb / WEI
+        # float cancellation error scales with the curve state
+        scale = x_ether + rb_ether
+        purchase = ContinuosToken.calc_purchase_return(x_ether, rb_ether, p / WEI)
+        assert math.isclose(
+            ContinuosToken.calc_purchase_return_wei(x, rb, p) / WEI,
+            purchase,
+            rel_tol=1e-9,
+            abs_tol=1e-12 * (scale + abs(purchase)),
+        )
+        returned = ContinuosToken.calc_sale_return(x_ether, rb_ether, sale / WEI)
+        assert math.isclose(
+            ContinuosToken.calc_sale_return_wei(x, rb, sale) / WEI,
+            returned,
+            rel_tol=1e-9,
+            abs_tol=1e-12 * (scale + abs(returned)),
+        )
+
+
+def test_selling_the_whole_supply_returns_the_reserve():
+    assert (
+        ContinuosToken.calc_sale_return_wei(10**20, 10**18, 10**20) == 10**18
+    )
@@ -0,0 +1,142 @@
+import pytest
+from django.utils import timezone
+
+from lzr_dfinityapi import api, config, outbox, pipeline, registry
+from lzr_dfinityapi.client import PooledClient
+from lzr_dfinityapi.models import (
+    CanisterOperation,
+    Coin,
+    DONE,
+    FAILED,
+    Holder,
+    Log,
+    PENDING,
+    SOLD,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox():
+    yield
+    CanisterOperation.objects.all().delete()
+
+
+@pytest.fixture
+def funded(stub):
+    """A coin and a trader holding 1 coin on its ledger."""
+    coin = stub.create_coin()
+    ((user, identity),) = stub.create_traders(1)
+    stub.canister(coin).mint(10**18, user.account_principal)
+    return coin, user, identity
+
+
+def trade_state(coin, user):
+    return (
+        Holder.objects.values_list("balance", flat=True).get(user=user, coin=coin),
+        Coin.objects.values_list("total_supply", "reserve_balance").get(pk=coin.pk),
+    )
+
+
+def dispatched(coin, poller=None):
+    outbox.dispatch_pending(10, poller=poller)
+    return list(
+        CanisterOperation.objects.filter(canister_id=coin.canister_id).order_by("pk")
+    )
+
+
+def test_done_operations_drop_the_signer_key(funded):
+    coin, user, identity = funded
+    outbox.enqueue_mint(coin, 5, user.account_principal)
+    outbox.enqueue_burn(coin, 5, identity)
+
+    mint, burn = dispatched(coin)
+
+    assert (mint.status, burn.status) == (DONE, DONE)
+    assert burn.signer_key == ""
+
+
+def test_rejected_mint_is_not_retried(replica, funded):
+    # a reject may come after the mint executed, retrying could mint twice
+    coin, user, identity = funded
+    replica.fail_next("mint")
+    replica.fail_next("burn")
+    outbox.enqueue_mint(coin, 5, user.account_principal)
+    outbox.enqueue_burn(coin, 5, identity)
+
+    mint, burn = dispatched(coin)
+
+    assert mint.status == FAILED
+    assert (burn.status, burn.attempts) == (PENDING, 1)
+    assert burn.signer_key != ""
+
+
+def test_temporarily_unavailable_mint_is_retried(replica, funded):
+    coin, user, _ = funded
+    replica.fail_next("mint", "TemporarilyUnavailable")
+    outbox.enqueue_mint(coin, 5, user.account_principal)
+
+    (mint,) = dispatched(coin)
+
+    assert (mint.status, mint.attempts) == (PENDING, 1)
+
+
+def test_unsent_mint_is_retried(funded):
+    coin, user, _ = funded
+    registry.clear()
+    # nothing listens on the discard port, the connection is refused
+    registry.register_client(config.RPC_URL, PooledClient(url="http://127.0.0.1:9"))
+    outbox.enqueue_mint(coin, 5, user.account_principal)
+
+    (mint,) = dispatched(coin)
+
+    assert (mint.status, mint.attempts) == (PENDING, 1)
+
+
+def test_failed_burn_drops_the_signer_key(replica, funded):
+    coin, _, identity = funded
+    replica.fail_next("burn", {"InsufficientFunds": {"balance": 0}})
+    outbox.enqueue_burn(coin, 5, identity)
+
+    (burn,) = dispatched(coin)
+
+    assert burn.status == FAILED
+    assert burn.signer_key == ""
+
+
+def test_unknown_pipelined_outcome_only_retries_burns(replica, funded):
+    coin, user, identity = funded
+    replica.latency = 1
+    poller = pipeline.StatusPoller(interval=0.05, timeout=0.2)
+    outbox.enqueue_mint(coin, 5, user.account_principal)
+    outbox.enqueue_burn(coin, 5, identity)
+
+    try:
+        mint, burn = dispatched(coin, poller)
+    finally:
+        poller.close()
+
+    assert mint.status == FAILED
+    assert burn.status == PENDING
+
+
+def test_burn_out_of_retries_reverts_the_sell(monkeypatch, replica, stub):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    coin = stub.create_coin()
+    ((user, identity),) = stub.create_traders(1)
+    api.buy_coin(user, coin, 0.01, False)
+    before = trade_state(coin, user)
+
+    operation = api.sell_coin(user, identity, coin, 0.001, defer=True)
+    assert operation.status == PENDING
+    replica.fail_next("burn", count=2)
+    for _ in range(2):
+        CanisterOperation.objects.filter(pk=operation.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        outbox.dispatch_pending(10)
+
+    operation.refresh_from_db()
+    assert (operation.status, operation.attempts) == (FAILED, 2)
+    assert operation.log is None
+    assert not Log.objects.filter(user=user, tx_type=SOLD).exists()
+    assert trade_state(coin, user) == before
@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+import pytest
+
+from lzr_dfinityapi.curve import ContinuosToken, random_state, WEI
+from lzr_dfinityapi.quotes import quote_curve
+
+SAMPLES = 500
+
+
+def states(seed: int):
+    rng = random.Random(seed)
+    cases = [random_state(rng) for _ in range(SAMPLES)]
+    return [(x, rb, min(p, x)) for x, rb, p in cases]
+
+
+def assert_close(quotes, expected_wei, x, rb):
+    expected = np.array(expected_wei, dtype=np.float64) / WEI
+    # float cancellation error scales with the curve state
+    tolerance = 1e-12 * (np.abs(expected) + x + rb)
+    assert np.all(np.abs(quotes - expected) <= tolerance)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_vectorized_quotes_match_wei_curve(seed):
+    cases = states(seed)
+    x, rb, p = (np.array(values, dtype=np.float64) / WEI for values in zip(*cases))
+
+    quotes = quote_curve(x, rb, p)
+
+    assert_close(
+        quotes.purchase_return,
+        [ContinuosToken.calc_purchase_return_wei(*case) for case in cases],
+        x,
+        rb,
+    )
+    assert_close(
+        quotes.sale_return,
+        [ContinuosToken.calc_sale_return_wei(*case) for case in cases],
+        x,
+        rb,
+    )
+
+
+def test_vectorized_quotes_of_an_empty_supply():
+    amounts = [10**15, 10**18, 10**21]
+
+    quotes = quote_curve(0, 0, np.array(amounts, dtype=np.float64) / WEI)
+
+    assert_close(
+        quotes.purchase_return,
+        [ContinuosToken.calc_purchase_return_wei(0, 0, p) for p in amounts],
+        0,
+        0,
+    )
+    assert np.all(np.isnan(quotes.sale_return))
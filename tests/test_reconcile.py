@@ -0,0 +1,19 @@
+import json
+
+from lzr_dfinityapi import reconcile
+
+
+def test_skipped_counts_only_selected_coins(stub, tmp_path):
+    coins = [stub.create_coin() for _ in range(3)]
+    checkpoint = tmp_path / "checkpoint.json"
+    # an earlier run over every coin finished the first two
+    checkpoint.write_text(json.dumps({"done": [coins[0].pk, coins[1].pk]}))
+
+    summary = reconcile.reconcile(
+        str(tmp_path / "report.jsonl"),
+        checkpoint_path=str(checkpoint),
+        coin_ids=[coins[1].pk, coins[2].pk],
+    )
+
+    assert summary["skipped"] == 1
+    assert summary["coins"] == 1
@@ -0,0 +1,59 @@
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from ic.identity import Identity
+
+from lzr_dfinityapi.key_management import envelope
+from lzr_dfinityapi.key_management.encryption import (
+    decrypt_from_cipher_string,
+    encrypt_private_key_as_string,
+)
+from lzr_dfinityapi.models import BURN, CanisterOperation
+
+
+@pytest.fixture
+def local_kms(monkeypatch):
+    monkeypatch.setattr(
+        envelope, "data_keys", envelope.DataKeyCache(envelope.LocalKMSClient(), "")
+    )
+
+
+def operation(signer_key: str) -> CanisterOperation:
+    return CanisterOperation.objects.create(
+        canister_id="aaaaa-aa",
+        method=BURN,
+        amount=1,
+        signer_key=signer_key,
+        created_at_time=time.time_ns(),
+    )
+
+
+def test_malformed_key_is_counted_and_skipped(local_kms):
+    keys = [Identity().privkey for _ in range(2)]
+    first = operation(encrypt_private_key_as_string(keys[0]))
+    malformed = operation("bm90IGEga2V5::@@@not-base64@@@")
+    last = operation(encrypt_private_key_as_string(keys[1]))
+    stdout, stderr = StringIO(), StringIO()
+
+    try:
+        call_command(
+            "reencrypt_keys",
+            model="lzr_dfinityapi.CanisterOperation",
+            field="signer_key",
+            batch_size=2,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        for row, key in ((first, keys[0]), (last, keys[1])):
+            row.refresh_from_db()
+            assert envelope.is_envelope(row.signer_key)
+            assert decrypt_from_cipher_string(row.signer_key) == key
+        malformed.refresh_from_db()
+        assert malformed.signer_key == "bm90IGEga2V5::@@@not-base64@@@"
+    finally:
+        CanisterOperation.objects.all().delete()
+
+    assert f"{malformed.pk}: cannot decrypt" in stderr.getvalue()
+    assert "Re-encrypted 2 key(s), 1 failure(s)" in stdout.getvalue()
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from lzr_dfinityapi import api, candles, coin_stats
+from lzr_dfinityapi.models import Candle, Coin, CoinStats, Holder, Log
+from lzr_dfinityapi.providers import TransferError
+
+
+def coin_state(coin):
+    # the async compensations bump the version, the curve state must not move
+    return Coin.objects.values_list("total_supply", "reserve_balance").get(
+        pk=coin.pk
+    )
+
+
+@pytest.fixture
+def trader(stub):
+    return stub.create_traders(1)[0]
+
+
+def test_buy_mints_and_records_holder(stub, trader):
+    coin = stub.create_coin()
+    user, _ = trader
+    api.buy_coin(user, coin, 0.01, False)
+
+    balance = Holder.objects.get(user=user, coin=coin).balance
+    assert balance > 0
+    # sqlite keeps the 50 digit balance column as a float
+    assert stub.canister(coin).icrc1_balance_of(
+        user.account_principal
+    ) == pytest.approx(int(balance), rel=1e-12)
+
+
+@pytest.mark.parametrize("buy", [api.buy_coin, api.async_buy_coin])
+def test_mint_err_rolls_back_buy(stub, replica, trader, buy):
+    coin = stub.create_coin()
+    user, _ = trader
+    before = coin_state(coin)
+    replica.fail_next("mint", "TemporarilyUnavailable")
+
+    with pytest.raises(TransferError):
+        result = buy(user, coin, 0.01, False)
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+
+    assert not Holder.objects.filter(user=user, coin=coin, balance__gt=0).exists()
+    assert not Log.objects.filter(user=user).exists()
+    assert coin_state(coin) == before
+
+
+@pytest.mark.parametrize("sell", [api.sell_coin, api.async_sell_coin])
+def test_burn_err_rolls_back_sell(stub, replica, trader, sell):
+    coin = stub.create_coin()
+    user, identity = trader
+    api.buy_coin(user, coin, 0.01, False)
+    balance = Holder.objects.get(user=user, coin=coin).balance
+    logs = Log.objects.filter(user=user).count()
+    before = coin_state(coin)
+    replica.fail_next("burn", "TemporarilyUnavailable")
+
+    with pytest.raises(TransferError):
+        result = sell(user, identity, coin, 0.001, False)
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+
+    assert Holder.objects.get(user=user, coin=coin).balance == balance
+    assert Log.objects.filter(user=user).count() == logs
+    assert coin_state(coin) == before
+
+
+def test_rejected_sell_leaves_coin_unchanged(stub):
+    coin = stub.create_coin()
+    (buyer, buyer_identity), (other, other_identity) = stub.create_traders(2)
+    api.buy_coin(buyer, coin, 0.01, False)
+    before = Coin.objects.values_list("version", flat=True).get(pk=coin.pk)
+
+    with pytest.raises(ValueError):
+        api.sell_coin(other, other_identity, coin, 0.001, False)
+    with pytest.raises(ValueError):
+        api.sell_coin(buyer, buyer_identity, coin, 10**6, False)
+
+    assert Coin.objects.values_list("version", flat=True).get(pk=coin.pk) == before
+
+
+def trade_state(coin, user):
+    return (
+        Holder.objects.values_list("balance", flat=True).get(user=user, coin=coin),
+        Coin.objects.values_list("version", "total_supply", "reserve_balance").get(
+            pk=coin.pk
+        ),
+        CoinStats.objects.values_list("holder_count", "volume_24h").get(
+            coin=coin.pk
+        ),
+    )
+
+
+def test_selling_more_than_the_balance_raises(stub, trader):
+    coin = stub.create_coin()
+    user, identity = trader
+    api.buy_coin(user, coin, 0.01, False)
+    before = trade_state(coin, user)
+
+    # well within the supply, so only the holder's balance can refuse it
+    with pytest.raises(ValueError):
+        api.sell_coin(user, identity, coin, float(before[0] * 5) / 10**18, False)
+
+    assert trade_state(coin, user) == before
+
+
+def candle_rows(coin):
+    return list(
+        Candle.objects.filter(coin=coin)
+        .order_by("interval", "start")
+        .values_list("interval", "open", "high", "low", "close", "volume", "trades")
+    )
+
+
+def test_reverted_trade_leaves_candles_and_stats_exact(monkeypatch, stub, replica):
+    monkeypatch.setattr(api, "CANDLES_IN_TRADE", True)
+    coin = stub.create_coin()
+    (first, _), (second, _) = stub.create_traders(2)
+    api.buy_coin(first, coin, 0.01, False)
+    replica.fail_next("mint", "TemporarilyUnavailable")
+
+    with pytest.raises(TransferError):
+        asyncio.run(api.async_buy_coin(second, coin, 0.02, False))
+
+    for drift in coin_stats.refresh([coin.pk], dry_run=True):
+        # sqlite stores the price figures as floats
+        assert drift.field in ("spot_price", "market_cap")
+        assert float(drift.stored) == pytest.approx(float(drift.actual), rel=1e-12)
+    reverted = candle_rows(coin)
+    candles.rebuild([coin.pk])
+    assert reverted == candle_rows(coin)
+    assert [trades for *_, trades in reverted] == [1, 1, 1]